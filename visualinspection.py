@@ -21,8 +21,8 @@
 ----------------------------
  To run the GUIs it is assumed that the following python packages are
  available (most of which should come with the default python install):
-     Tkinter, os, sys, glob, datetime, time, numpy, subprocess, pyfits, commands
-     re, scipy, matplotlib, PIL
+     Tkinter, os, sys, glob, fnmatch, datetime, time, numpy, subprocess, multiprocessing, pyfits, commands
+     re, cPickle, threading, Queue, collections, hashlib, pipes, scipy, matplotlib, PIL
 
  Also a command line version of ds9 should be available, i.e., the following
  command should open the fitsimage.fits without errors:
@@ -39,14 +39,56 @@
  import visualinspection as vi
  vi.launchgui(directory='data/clusterXXXX/',outputfile='testfile_output_GiG.txt',MASTfiles=True)
 
+ To avoid estimating the spectral coverage and contamination levels while inspecting, these
+ can be precomputed for all objects beforehand (using all CPUs) with
+ vi.precompute_specmetrics('data/clusterXXXX/')
+ vi.launchgui(directory='data/clusterXXXX/',outputfile='testfile_output_GiG.txt',specmetrics='DEFAULT')
+
+ Similarly, the contamination subtracted 2D spectra shown in DS9 can be generated beforehand with
+ vi.precompute_subtractcontam('data/clusterXXXX/')
+
+ To only resample the in-GUI images to the display size once (also across sessions), they can be kept
+ in an on-disk thumbnail cache, which can be filled beforehand with
+ vi.precompute_thumbnails('data/clusterXXXX/',GUI='GiG')
+ vi.launchgui(directory='data/clusterXXXX/',outputfile='testfile_output_GiG.txt',thumbcache='DEFAULT')
+ (the same thumbnail cache is used by launchgui_z, and by launchgui_m with GUI='GiGm')
+
+ To inspect the objects with the most significant emission line candidates first, search the 1D
+ spectra for lines and order the objects on the detection score with
+ vi.precompute_linedetections('data/clusterXXXX/')
+ vi.launchgui(directory='data/clusterXXXX/',outputfile='testfile_output_GiG.txt',linedetections='DEFAULT')
+
  --- Launch GiGz ---
  import visualinspection as vi
  vi.launchgui_z(directory='data/clusterXXXX/',outputfile='testfile_output_GiGz.txt',MASTfiles=True)
 
+ The EAZY pickles and zfit results plotted by GiGz can be converted to compact *EAZYzfit_all.npz
+ files, which are much faster to load when moving between objects, with
+ vi.precompute_zfitresults('data/clusterXXXX/')
+
+ The GiGz plots of the 1D spectra can be rendered without the GUI for all objects with
+ vi.precompute_GiGz_1Dspecplots('data/clusterXXXX/',outputfile='data/clusterXXXX/testfile_output_GiGz.txt')
+
+ To start the redshift slider at the best match between the emission lines and the spectra (and step
+ through the candidate redshifts with j/J) the redshifts can be scanned beforehand with
+ vi.precompute_zscan('data/clusterXXXX/',MASTfiles=True)
+ vi.launchgui_z(directory='data/clusterXXXX/',outputfile='testfile_output_GiGz.txt',MASTfiles=True,zscan='DEFAULT')
+
  --- Launch GiGm ---
  import visualinspection as vi
  vi.launchgui_m(pstampsdirectory='data/postagestamps/',infofile='./infofile.txt',outputfile='testfile_output_GiGm.txt')
 
+ To show the postage stamps and Halpha maps without decoding delays, the stamps of the next objects
+ can be prepared in the background while inspecting with
+ vi.launchgui_m(pstampsdirectory='data/postagestamps/',infofile='./infofile.txt',outputfile='testfile_output_GiGm.txt',prefetch=3)
+
+ For a quick first-pass morphology triage the rgb stamps of several objects (here 4x4) can be shown
+ and classified at once in a grid (see Application_m for the keyboard shortcuts) with
+ vi.launchgui_m(pstampsdirectory='data/postagestamps/',infofile='./infofile.txt',outputfile='testfile_output_GiGm.txt',gridshape=(4,4))
+ The grid stamps (gridstampsize x gridstampsize pixels, 160 by default) can be put in the thumbnail cache beforehand with
+ vi.precompute_thumbnails('data/postagestamps/',GUI='GiGm',size=(160,160))
+ vi.launchgui_m(pstampsdirectory='data/postagestamps/',infofile='./infofile.txt',outputfile='testfile_output_GiGm.txt',gridshape=(4,4),thumbcache='DEFAULT')
+
  Note the different directory used for GiGm. This contains postage stamp data. See GiG README at
  for details
 """
@@ -66,23 +108,42 @@ from Tkinter import *
 import os
 import sys
 import glob
+import fnmatch
 import datetime
 import time
 import numpy as np
 import pdb
 import subprocess
+import multiprocessing
 import pyfits
 import re
 import scipy.ndimage
 import commands
-import matplotlib.pyplot as plt
+import cPickle as pickle
+import threading
+import Queue
+import collections
+import hashlib
+import pipes
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+try:
+    from matplotlib.backends.backend_tkagg import NavigationToolbar2Tk
+except ImportError: # older versions of matplotlib
+    from matplotlib.backends.backend_tkagg import NavigationToolbar2TkAgg as NavigationToolbar2Tk
+from matplotlib.lines import Line2D
+from matplotlib.collections import LineCollection
 import visualinspection as vi
 from PIL import ImageTk, Image
 #-------------------------------------------------------------------------------------------------------------
 def launchgui(directory='/Users/kasperborelloschmidt/work/GLASS/MACS0717test/vanzellaOBJ/',
               objlist=None,verbose=True,outputfile='DEFAULT',inspectorname='John Doe',
               clobber=False,ds9xpa=False,openfitsauto=False,inGUIimage='zfit',check4duplicates=False,
-              outputcheck=False,skipempty=False,MASTfiles=False):
+              outputcheck=False,skipempty=False,MASTfiles=False,prefetch=0,specmetrics=None,
+              ds9banks=False,outputsync='flush',skipinspected=False,linedetections=None,linedetectionsort=True,
+              linedetectionmin=None,thumbcache=None,thumbcacheMB=200.0):
     """
     Launch the inspection GUI for the object inspections Application()
     """
@@ -99,7 +160,10 @@ def launchgui(directory='/Users/kasperborelloschmidt/work/GLASS/MACS0717test/van
     app = Application(dir,outfile,master=root,objlist=objlist,verbose=verbose,iname=inspectorname,
                       clobber=clobber,ds9xpa=ds9xpa,openfitsauto=openfitsauto,inGUIimage=inGUIimage,
                       check4duplicates=check4duplicates,outputcheck=outputcheck,skipempty=skipempty,
-                      MASTfiles=MASTfiles)
+                      MASTfiles=MASTfiles,prefetch=prefetch,specmetrics=specmetrics,ds9banks=ds9banks,
+                      outputsync=outputsync,skipinspected=skipinspected,linedetections=linedetections,
+                      linedetectionsort=linedetectionsort,linedetectionmin=linedetectionmin,
+                      thumbcache=thumbcache,thumbcacheMB=thumbcacheMB)
     app.mainloop()
     root.destroy()
 
@@ -107,7 +171,9 @@ def launchgui(directory='/Users/kasperborelloschmidt/work/GLASS/MACS0717test/van
 def launchgui_z(directory='IndvidualObjects/',GiGfile=None,GiGselection='emissionlineobjects',
                 objlist=None,outputfile='DEFAULT',inspectorname='John Doe',clobber=False,
                 ds9xpa=False,openfitsauto=False,check4duplicates=False,skipempty=False,inGUIimage='zfit',
-                outputcheck=False,latexplotlabel=False,autosaveplot=False,verbose=True,MASTfiles=False):
+                outputcheck=False,latexplotlabel=False,autosaveplot=False,verbose=True,MASTfiles=False,
+                prefetch=0,ds9banks=False,outputsync='flush',skipinspected=False,smoothcache=50.0,smoothladder=0,
+                zscan=False,thumbcache=None,thumbcacheMB=200.0):
     """
     Launch the inspection GUI for the redshift inspections Application_z()
     """
@@ -120,19 +186,23 @@ def launchgui_z(directory='IndvidualObjects/',GiGfile=None,GiGselection='emissio
     # setup and launch GUI
     root = Tk()
     root.title("GLASS Inspection GUI for redshift fit (GiGz)")
-    root.geometry("1000x630") # size of GUI window
+    root.geometry("1000x790") # size of GUI window (incl. the embedded 980x100 plot with title and toolbar)
     app = Application_z(dir,outfile,master=root,GiGfile=GiGfile,GiGselection=GiGselection,
                         objlist=objlist,verbose=verbose,iname=inspectorname,clobber=clobber,ds9xpa=ds9xpa,
                         openfitsauto=openfitsauto,check4duplicates=check4duplicates,outputcheck=outputcheck,
                         latexplotlabel=latexplotlabel,autosaveplot=autosaveplot,skipempty=skipempty,
-                        MASTfiles=MASTfiles,inGUIimage=inGUIimage)
+                        MASTfiles=MASTfiles,inGUIimage=inGUIimage,prefetch=prefetch,ds9banks=ds9banks,
+                        outputsync=outputsync,skipinspected=skipinspected,smoothcache=smoothcache,
+                        smoothladder=smoothladder,zscan=zscan,thumbcache=thumbcache,thumbcacheMB=thumbcacheMB)
     app.mainloop()
     root.destroy()
 #-------------------------------------------------------------------------------------------------------------
 def launchgui_m(pstampsdirectory='PostageStamps/',objlist=None,clusters=None,infofile=None,
                 outputfile='DEFAULT',inspectorname='John Doe',clobber=False,
                 ds9xpa=False,openfitsauto=False,skipempty=False,
-                outputcheck=False,openpngseperately=False,verbose=True):
+                outputcheck=False,openpngseperately=False,verbose=True,outputsync='flush',
+                skipinspected=False,stampcache=20.0,prefetch=0,thumbcache=None,thumbcacheMB=200.0,
+                gridshape=None,gridstampsize=160):
     """
     Launch the inspection GUI for the morphology inspections Application_m()
     """
@@ -145,62 +215,294 @@ def launchgui_m(pstampsdirectory='PostageStamps/',objlist=None,clusters=None,inf
     # setup and launch GUI
     root = Tk()
     root.title("GLASS Inspection GUI for morphology (GiGm)")
-    root.geometry("930x530") # size of GUI window
+    if gridshape is None:
+        root.geometry("930x530") # size of GUI window
+    else: # make room for the grid of stamps instead of the single row of stamps
+        root.geometry(str(max(930,gridshape[1]*(gridstampsize+20)))+"x"+
+                      str(290+gridshape[0]*(gridstampsize+30)))
     app = Application_m(pdir,outfile,master=root,infofile=infofile,objlist=objlist,clusters=clusters,
                         verbose=verbose,iname=inspectorname,
                         clobber=clobber,ds9xpa=ds9xpa,openfitsauto=openfitsauto,
-                        outputcheck=outputcheck,skipempty=skipempty,openpngseperately=openpngseperately)
+                        outputcheck=outputcheck,skipempty=skipempty,openpngseperately=openpngseperately,
+                        outputsync=outputsync,skipinspected=skipinspected,stampcache=stampcache,
+                        prefetch=prefetch,thumbcache=thumbcache,thumbcacheMB=thumbcacheMB,
+                        gridshape=gridshape,gridstampsize=gridstampsize)
     app.mainloop()
     root.destroy()
 #-------------------------------------------------------------------------------------------------------------
-def getPID(searchstring,verbose=False):
+class ProcessManager(object):
     """
-    Return PID of most recent process including the given search string
-    Will ignore instances containing 'grep' and with a CPU time stamp of 0 seconds
+    Keep track of the png viewers and DS9 windows launched by the GUIs directly from their Popen handles.
+
+    Every command is started as the leader of a new process group, so viewers put in the background
+    by the shell (e.g. 'gthumb ... &') are closed together with the shell that launched them.
+    Nothing has to wait for the processes to appear in the process list, i.e., starting and closing
+    never blocks the Tk event loop.
     """
-    cmd = "ps -eo pid,etime,command | grep "+searchstring
-    fileobj = os.popen(cmd)            # return file object for ps command
-    lines   = fileobj.readlines()      # read ouptu from ps command
-    Nproces = len(lines)               # number of prcesses including searchstring
-
-    PIDlist  = []
-    time     = []
-    for line in lines:
-        if 'grep' not in line: # ignore the grep command PID
-            ls       = line.split() # etime is [[dd-]hh:]mm:ss
-            tsplit   = ls[1].split(':')
-            if len(tsplit) == 2:    # if process has been running for minutes & seconds
-                timeval = float(tsplit[0])*60. + float(tsplit[1])
-            else:
-                if '-' in tsplit[0]: # if process has been running for days
-                    dayhour = tsplit[0].split('-')
-                    timeval = float(dayhour[0])*24*60.*60 + \
-                              float(dayhour[1])*60*60     + \
-                              float(tsplit[1])*60. + float(tsplit[2])
-                else:                # if process has been running for hours
-                    timeval = float(tsplit[0])*60.*60     +\
-                              float(tsplit[1])*60. + float(tsplit[2])
-
-            if timeval > 0: # ignore 0.00 s instances
-                if verbose: print 'Process:',line
-                PIDlist.append(int(ls[0]))
-                time.append(timeval)
-            else:
-                if verbose: print ' - Ignoring the following as it has a time stamp of 0s:'
-                if verbose: print '   ',line
-    if len(PIDlist) == 0:
-        if verbose: print ' - No processes with given search string ('+searchstring+') in them. Returning None'
-        return None
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,verbose=False):
+        """
+        -- INPUT --
+        verbose           Toggle verbosity.
+        """
+        self.vb    = verbose
+        self.procs = {} # name -> [Popen object, search string for detached process]
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def start(self,name,cmd,detachedsearch=None):
+        """
+        Run the shell command cmd in a new process group and register it under name
+
+        -- INPUT --
+        name              Name to refer to the process by when closing it, e.g. 'png' or 'ds9'.
+        cmd               Shell command to run.
+        detachedsearch    For commands handing the files over to an application outside the process group
+                          (e.g. 'open' on Mac OS X passing them to Preview.app) provide a string identifying the
+                          application. The most recent process matching it is looked up with pgrep when closing.
+        """
+        proc = subprocess.Popen(cmd,shell=True,executable=os.environ["SHELL"],preexec_fn=os.setsid)
+        self.procs[name] = [proc,detachedsearch]
+        return proc
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def isrunning(self,name):
+        """
+        Return True if any process of the group registered under name is still alive
+        """
+        if name not in self.procs: return False
+        try:
+            os.killpg(self.procs[name][0].pid,0)
+            return True
+        except OSError:
+            return False
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def close(self,name,killsignal=1):
+        """
+        Send killsignal (see bash> man kill) to the process group registered under name.
+        Returns True if a process was signalled.
+        """
+        if name not in self.procs: return False
+        proc, detachedsearch = self.procs.pop(name)
 
-    if verbose: print 'PIDlist:',PIDlist
-    if verbose: print 'time   :',time
+        closed = False
+        try:
+            os.killpg(proc.pid,killsignal) # the group ID equals the PID of the group leader
+            closed = True
+        except OSError:
+            pass                           # process group already gone
 
-    PID = np.array(PIDlist)[time == np.min(time)]
-    if len(PID) > 1:
-        print ' - Note multiple IDs with the same time stamp were found: ',PID
-        print '   Returning the first PID'
+        if detachedsearch is not None:
+            PIDstr = commands.getoutput('pgrep -n -f '+detachedsearch)
+            try:
+                os.kill(int(PIDstr),killsignal)
+                closed = True
+            except (ValueError,OSError):
+                if self.vb: print ' - WARNING: No process matching "'+detachedsearch+'" to close'
 
-    return PID[0]
+        proc.poll() # reap the shell if it has exited
+        return closed
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def closeall(self,killsignal=1):
+        """
+        Close all registered processes
+        """
+        for name in self.procs.keys():
+            self.close(name,killsignal=killsignal)
+#-------------------------------------------------------------------------------------------------------------
+def ds9xpaprobe(ds9name='ds9'):
+    """
+    Start 'xpaaccess ds9name' in the background to check if a DS9 window with the given XPA name accepts
+    XPA commands. Poll the returned subprocess.Popen object and read 'yes' from its stdout once finished.
+    Returns None if xpaaccess could not be run.
+    """
+    try:
+        return subprocess.Popen(['xpaaccess',ds9name],stdout=subprocess.PIPE,stderr=subprocess.STDOUT)
+    except OSError:
+        print ' - WARNING Could not run xpaaccess to check if DS9 is ready (is XPA installed?)'
+        return None
+#-------------------------------------------------------------------------------------------------------------
+class DS9XPABatch(object):
+    """
+    Collect the XPA commands for loading an object into DS9 and send them in one go.
+
+    Instead of spawning a process from python for every 'xpaset -p ds9 ...', the commands are run one
+    after the other by a single background shell (one spawn per object from the GUI). Hence, the Tk
+    event loop is not blocked while DS9 loads the files. Sending a new batch stops a batch still running,
+    so frames of consecutive objects are never mixed.
+    """
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,ds9name='ds9',verbose=False):
+        """
+        -- INPUT --
+        ds9name           XPA name of the DS9 window to send the commands to.
+        verbose           Toggle verbosity.
+        """
+        self.vb        = verbose
+        self.ds9name   = ds9name
+        self.cmds      = []
+        self.proc      = None
+        self.Nsent     = 0    # number of batches sent (identifies the current batch)
+        self.starttime = None
+        self.loadtime  = None # run time of the last finished batch
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def add(self,cmd):
+        """
+        Add command, i.e., what would follow 'xpaset -p ds9', to the batch
+        """
+        self.cmds.append(cmd)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def send(self):
+        """
+        Send the collected commands to DS9 in the background and return the number of the batch
+        """
+        self.cancel()
+        # each command is quoted as one argument, so file names with e.g. [SCI] or spaces are passed on as is
+        script = '\n'.join(['xpaset -p '+pipes.quote(self.ds9name)+' '+pipes.quote(cmd)+' > /dev/null'
+                            for cmd in self.cmds])
+        self.cmds      = []
+        self.proc      = subprocess.Popen(['/bin/sh','-c',script],preexec_fn=os.setsid)
+        self.starttime = time.time()
+        self.loadtime  = None
+        self.Nsent     = self.Nsent + 1
+        return self.Nsent
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def isdone(self):
+        """
+        Return True if the last batch has finished (and set loadtime)
+        """
+        if self.proc is None: return True
+        if self.proc.poll() is None: return False
+        if self.loadtime is None: self.loadtime = time.time()-self.starttime
+        return True
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def cancel(self):
+        """
+        Stop the batch currently running (if any). Returns True if a batch was stopped.
+        """
+        if (self.proc is not None) and (self.proc.poll() is None):
+            try:
+                os.killpg(self.proc.pid,15)
+                self.proc.wait()
+            except OSError:
+                pass
+            if self.vb: print ' - Stopped loading previous object into DS9'
+            return True
+        return False
+#-------------------------------------------------------------------------------------------------------------
+class OutputJournal(object):
+    """
+    Append-only writer for the output files of the GUIs.
+
+    Records (lines not starting with '#') are appended to the file and made persistent according to the
+    'sync' policy whenever commit() is called, i.e., once per saved object. An in-memory index of the
+    number of records per object (the first 'keycols' columns of a record) keeps track of duplicates.
+    Records superseded by newer ones (see supersede()) are only removed from the file when the journal
+    is compacted on close() or by calling compact(), so saving an object takes constant time
+    independent of the size of the output file.
+    """
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,outfile,mode='a',keycols=2,sync='flush',verbose=False):
+        """
+        -- INPUT --
+        outfile           Output file to write to.
+        mode              'a' to append to outfile or 'w' to create/overwrite it.
+        keycols           Number of leading columns identifying the object of a record (e.g. ID and PA).
+        sync              Policy for making records persistent on commit():
+                          'none'   Leave it to the buffering of the file object (written on close)
+                          'flush'  Flush to the operating system (survives crashes of the GUI; default)
+                          'fsync'  Flush and fsync to disk (also survives crashes of the machine)
+        verbose           Toggle verbosity.
+        """
+        if sync not in ['none','flush','fsync']:
+            sys.exit(' - Invalid sync policy ('+str(sync)+') for OutputJournal --> ABORTING')
+        self.outfile  = outfile
+        self.keycols  = keycols
+        self.sync     = sync
+        self.vb       = verbose
+        self.Nrecords = {}   # key -> number of records in file
+        self.Ndrop    = {}   # key -> number of (leading) records superseded by later ones
+        self.lastline = None # last (non-empty) line in file
+
+        if (mode == 'a') & os.path.isfile(outfile): # stream through existing file once to build index
+            for line in open(outfile,'r'):
+                if line.strip() == '': continue
+                key = self.recordkey(line)
+                if key is not None: self.Nrecords[key] = self.Nrecords.get(key,0) + 1
+                self.lastline = line
+        self.fout = open(outfile,mode)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def recordkey(self,line):
+        """
+        Return the key of a record line (None for comments and empty lines)
+        """
+        cols = line.split()
+        if (len(cols) == 0) or line.startswith('#') or (cols[0] == '#'): return None
+        return tuple(cols[:self.keycols])
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def write(self,text):
+        """
+        Append text (header lines or a record) to the output
+        """
+        self.fout.write(text)
+        key = self.recordkey(text)
+        if key is not None: self.Nrecords[key] = self.Nrecords.get(key,0) + 1
+        if text.strip() != '': self.lastline = text
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def commit(self):
+        """
+        Make the records written so far persistent according to the sync policy
+        """
+        if self.sync == 'none': return
+        self.fout.flush()
+        if self.sync == 'fsync': os.fsync(self.fout.fileno())
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def supersede(self,key):
+        """
+        Mark all records of key written so far as duplicates to remove when compacting.
+        Returns the number of records marked.
+        """
+        key  = tuple(key)
+        Ndup = self.Nrecords.get(key,0) - self.Ndrop.get(key,0)
+        if Ndup > 0: self.Ndrop[key] = self.Nrecords[key]
+        return Ndup
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def compact(self):
+        """
+        Rewrite the output without the superseded records (via a temporary file which is renamed)
+        Returns the number of records removed.
+        """
+        if len(self.Ndrop) == 0: return 0
+        self.fout.close()
+
+        Ndropped = 0
+        Nseen    = {}
+        tempfile = self.outfile+'.compact_tmp'
+        fcompact = open(tempfile,'w')
+        for line in open(self.outfile,'r'):
+            key = self.recordkey(line)
+            if (key is not None) and (key in self.Ndrop):
+                Nseen[key] = Nseen.get(key,0) + 1
+                if Nseen[key] <= self.Ndrop[key]:
+                    Ndropped = Ndropped + 1
+                    continue
+            fcompact.write(line)
+        fcompact.flush()
+        os.fsync(fcompact.fileno())
+        fcompact.close()
+        os.rename(tempfile,self.outfile)
+
+        for key in self.Ndrop.keys():
+            self.Nrecords[key] = self.Nrecords[key] - self.Ndrop[key]
+        self.Ndrop = {}
+        if self.vb: print ' - Removed '+str(Ndropped)+' duplicate entries from '+self.outfile
+        self.fout  = open(self.outfile,'a')
+        return Ndropped
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def close(self):
+        """
+        Compact (if duplicates were superseded) and close the output
+        """
+        self.compact()
+        self.commit()
+        self.fout.close()
 #-------------------------------------------------------------------------------------------------------------
 def getclusterz(filestring):
     """
@@ -242,49 +544,2060 @@ def getclusterz(filestring):
         redshift = 0.0
         cluster  = 'None'
 
-    return cluster, redshift
+    return cluster, redshift
+#-------------------------------------------------------------------------------------------------------------
+def get_objinfo(infofile,objid,cluster,infoindex=None):
+    """
+    Return information on object given an input file.
+    If the index of the file from load_infofile is provided as infoindex the object is looked up in that
+    instead of reading and searching the file.
+    """
+    if infofile == None:
+        returndat = None
+    elif infoindex is not None:
+        objent = infoindex['index'].get((str(cluster),int(objid)),None)
+        if objent is None:
+            returndat = None
+        else:
+            returndat = infoindex['data'][objent]
+    else:
+        infodat = np.genfromtxt(infofile,dtype=None,names=True,skip_header=0,comments='#')
+        objent  = np.where((infodat['id'] == int(objid)) & (infodat['cluster'] == cluster))[0]
+
+        if len(objent) == 0:
+            returndat = None
+        else:
+            returndat = infodat[objent]
+
+    return returndat
+#-------------------------------------------------------------------------------------------------------------
+def load_infofile(infofile,cache=True,verbose=True):
+    """
+    Load the object information file used by GiGm once and index it on (cluster,id) for get_objinfo
+
+    -- INPUT --
+    infofile          Information file to load (columns 'id' and 'cluster' are used for the index)
+    cache             Store the parsed file as infofile+'.npy' and load that instead of parsing the text file
+                      as long as it is newer than the text file.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Dictionary with the keys
+                      'file'      The infofile
+                      'data'      Structured array with the content of the file
+                      'index'     Dictionary of (cluster,id) -> array of entries in 'data'
+    """
+    cachefile = infofile+'.npy'
+    if cache and os.path.isfile(cachefile) and (os.path.getmtime(cachefile) >= os.path.getmtime(infofile)):
+        if verbose: print ' - Loading parsed info file '+cachefile
+        infodat = np.load(cachefile)
+    else:
+        infodat = np.atleast_1d(np.genfromtxt(infofile,dtype=None,names=True,skip_header=0,comments='#'))
+        if cache:
+            try:
+                tempfile = infofile+'_tmp'+str(os.getpid())+'.npy'
+                np.save(tempfile,infodat)
+                os.rename(tempfile,cachefile) # atomic on POSIX file systems
+                if verbose: print ' - Stored parsed info file as '+cachefile
+            except (IOError, OSError):
+                if verbose: print ' - WARNING Could not store parsed info file as '+cachefile
+
+    index = {}
+    for ent, (cluster, objid) in enumerate(zip(infodat['cluster'],infodat['id'])):
+        index.setdefault((str(cluster),int(objid)),[]).append(ent)
+    for key in index.keys():
+        index[key] = np.asarray(index[key])
+
+    if verbose: print ' - Indexed '+str(len(infodat))+' entries of '+infofile
+    return {'file':infofile, 'data':infodat, 'index':index}
+#-------------------------------------------------------------------------------------------------------------
+def check_idlist(idlist,dir,verbose=True,dirindex=None):
+    """
+    Checking if pngs exist for objects in idlist.
+    Returning list of ids with existing files
+
+    If a dirindex (see build_dirindex) is provided it is used instead of globbing the directory.
+    """
+    if verbose: print ' - Checking ID list to make sure data for objects exists'
+    goodids = np.array([])
+    for objid in idlist:
+        idstr = str("%.5d" % objid)
+        if dirindex is None:
+            pngs  = glob.glob(dir+'*_'+idstr+'*2D.png')
+        else:
+            pngs  = vi.glob_dirindex(dirindex,dir+'*_'+idstr+'*2D.png')
+        if len(pngs) > 0:
+            goodids = np.append(goodids,objid)
+
+    if (len(goodids) == 0):
+        if verbose: print ' - WARNING None of the IDs have data in dir=\n   '+dir
+
+    return goodids
+#-------------------------------------------------------------------------------------------------------------
+def build_dirindex(directory,indexfile='GiG_directoryindex.pickle',clobber=False,verbose=True):
+    """
+    Build an index of the files in a data directory with a single scan of the directory.
+    The index is stored (pickled) in the directory itself and re-used on the next call
+    as long as the list of files in the directory has not changed (checked with the number of
+    files and a hash of the file list, which unlike the modification time of the directory
+    also catches files added within the same second as the index was built).
+
+    -- INPUT --
+    directory         Directory to index (the 'dir' given to the GUIs; should end with '/')
+    indexfile         Name of the index file to store in 'directory'. If None the index is not stored.
+    clobber           Rebuild the index even if a valid index was found on disk.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    dirindex          Dictionary with the keys:
+                      'dir'       The indexed directory
+                      'mtime'     Modification time of the directory after the index was stored
+                      'Nfiles'    Number of files in the directory (excluding the index file)
+                      'filehash'  SHA1 hash of the sorted list of file names
+                      'files'     Sorted list of file names in the directory
+                      'idlookup'  Dictionary of 5-digit strings -> files with that string in their name
+                      'objects'   Dictionary of object ID -> 'PAs' -> PA -> grism -> file type -> path
+                                  (file types '1Dpng', '2Dpng', '1Dfits', '2Dfits') and
+                                  object ID -> 'zfit'/'stack'/'pickle' -> list of paths
+
+    Use glob_dirindex() to look up files in the index with the glob expressions used in the GUIs.
+    """
+    indexversion = 2
+    scandir      = directory
+    if scandir == '': scandir = './'
+    if indexfile is None:
+        indexpath = None
+    else:
+        indexpath = os.path.join(scandir,indexfile)
+
+    dirmtime = os.stat(scandir).st_mtime
+    files    = sorted([f for f in os.listdir(scandir) if (indexfile is None) or (not f.startswith(indexfile))])
+    filehash = hashlib.sha1('\n'.join(files)).hexdigest()
+
+    # -------- LOAD EXISTING INDEX --------
+    if (indexpath is not None) and os.path.isfile(indexpath) and (not clobber):
+        try:
+            with open(indexpath,'rb') as handle:
+                dirindex = pickle.load(handle)
+            if (dirindex['version'] == indexversion) & (dirindex['dir'] == directory) & \
+                    (dirindex['Nfiles'] == len(files)) & (dirindex['filehash'] == filehash):
+                if verbose: print ' - Loaded index of '+str(len(dirindex['files']))+' files from '+indexpath
+                dirindex['mtime'] = dirmtime
+                return dirindex
+            if verbose: print ' - The index in '+indexpath+' is outdated; rebuilding it'
+        except:
+            if verbose: print ' - WARNING Could not read the index in '+indexpath+'; rebuilding it'
+
+    # -------- SCAN DIRECTORY --------
+    if verbose: print ' - Indexing the '+str(len(files))+' files in '+scandir
+
+    idlookup = {}
+    objects  = {}
+    for fname in files:
+        for idstr in set([fname[ent:ent+5] for ent in xrange(len(fname)-4)]):
+            if idstr.isdigit():
+                idlookup.setdefault(idstr,[]).append(fname)
+
+        fnamelow = fname.lower()
+        if fnamelow.endswith('.pickle'):
+            filetype = 'pickle'
+        elif 'zfit' in fnamelow:
+            filetype = 'zfit'
+        elif 'stack' in fnamelow:
+            filetype = 'stack'
+        elif fnamelow.endswith('1d.png'):
+            filetype = '1Dpng'
+        elif fnamelow.endswith('2d.png'):
+            filetype = '2Dpng'
+        elif fnamelow.endswith('1d.fits'):
+            filetype = '1Dfits'
+        elif fnamelow.endswith('2d.fits'):
+            filetype = '2Dfits'
+        else:
+            continue
+
+        if filetype in ['zfit','stack','pickle']:
+            namematch = re.search(r'_(\d{5})[._]',fname)
+            if namematch is None: continue
+            objdic = objects.setdefault(int(namematch.group(1)),{'PAs':{}})
+            objdic.setdefault(filetype,[]).append(directory+fname)
+        else:
+            namematch = re.search(r'(\d{5})-pa(\d{3})_(g102|g141|g800l)_',fname) # MAST file names
+            if namematch is not None:
+                objid, PA, grism = int(namematch.group(1)), int(namematch.group(2)), namematch.group(3).upper()
+            else:
+                namematch = re.search(r'-(\d{3})-(G102|G141|G800L)_(\d{5})\.',fname)
+                if namematch is None: continue
+                objid, PA, grism = int(namematch.group(3)), int(namematch.group(1)), namematch.group(2)
+            objdic = objects.setdefault(objid,{'PAs':{}})
+            objdic['PAs'].setdefault(PA,{}).setdefault(grism,{})[filetype] = directory+fname
+
+    dirindex = {'version':indexversion, 'dir':directory, 'mtime':dirmtime, 'Nfiles':len(files),
+                'filehash':filehash, 'files':files, 'idlookup':idlookup, 'objects':objects}
+
+    # -------- STORE INDEX --------
+    if indexpath is not None:
+        # write to a temporary file (ignored when indexing as it starts with indexfile) and move it into
+        # place, so processes reading the index concurrently never see a partially written file
+        temppath = indexpath+'.tmp'+str(os.getpid())
+        try:
+            with open(temppath,'wb') as handle:
+                pickle.dump(dirindex,handle,pickle.HIGHEST_PROTOCOL)
+            os.rename(temppath,indexpath)
+            dirindex['mtime'] = os.stat(scandir).st_mtime
+            if verbose: print ' - Stored index of directory in '+indexpath
+        except:
+            if verbose: print ' - WARNING Could not write index to '+indexpath
+            if os.path.isfile(temppath): os.remove(temppath)
+
+    return dirindex
+#-------------------------------------------------------------------------------------------------------------
+def glob_dirindex(dirindex,globstr):
+    """
+    Return the files matching the glob expression globstr using the index from build_dirindex
+    instead of scanning the directory, i.e., a drop-in replacement of glob.glob(globstr).
+
+    Expressions not starting with the indexed directory (or pointing to sub directories)
+    are passed on to glob.glob.
+    """
+    directory = dirindex['dir']
+    if (not globstr.startswith(directory)) or ((directory != '') & (not directory.endswith('/'))):
+        return glob.glob(globstr)
+
+    pattern = globstr[len(directory):].lstrip('/')
+    if '/' in pattern:
+        return glob.glob(globstr)
+
+    idstrs = re.findall(r'\d{5}',pattern)
+    if len(idstrs) > 0:
+        candidates = dirindex['idlookup'].get(idstrs[0],[])
+    else:
+        candidates = dirindex['files']
+
+    if not pattern.startswith('.'): # ignore hidden files like glob
+        candidates = [fname for fname in candidates if not fname.startswith('.')]
+
+    return [directory+fname for fname in fnmatch.filter(candidates,pattern)]
+#-------------------------------------------------------------------------------------------------------------
+def loadGUIimage(imgname,size,thumbcache=None):
+    """
+    Load an image and resize it to size=(xsize,ysize) for displaying it in the GUIs.
+    If a vi.ThumbnailCache is provided the resized image is taken from (or stored in) that.
+    """
+    if thumbcache is not None:
+        return thumbcache.get(imgname,size)
+    img = Image.open(imgname).resize(size,Image.ANTIALIAS)
+    return img
+#-------------------------------------------------------------------------------------------------------------
+class ThumbnailCache(object):
+    """
+    On-disk cache of in-GUI images resized to the display size. The thumbnails are stored as png files named
+    by the SHA1 hash of (absolute source path, source modification time, size), so modified images are
+    resampled again and identical requests from different sessions or processes share the thumbnail.
+    The total size of the thumbnails is bounded by maxMB; the least recently used thumbnails (oldest
+    modification time, which is updated when a thumbnail is used) are removed first.
+    """
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,thumbdir,maxMB=200.0,verbose=False):
+        """
+        Setup the cache
+
+        -- INPUT --
+        thumbdir          Directory to store the thumbnails in (created if it does not exist).
+        maxMB             Maximum size in MB of the thumbnails in thumbdir. If None the size is not bounded.
+        verbose           Toggle verbosity.
+        """
+        self.vb       = verbose
+        self.thumbdir = thumbdir
+        if not self.thumbdir.endswith('/'): self.thumbdir = self.thumbdir+'/'
+        self.maxbytes = maxMB*1e6 if maxMB is not None else None
+        self.lock     = threading.Lock()
+        self.Nhits    = 0
+        self.Nmisses  = 0
+        self.Ndropped = 0
+        if not os.path.isdir(self.thumbdir):
+            try:
+                os.makedirs(self.thumbdir)
+            except OSError: # created by another process in the meantime
+                if not os.path.isdir(self.thumbdir):
+                    sys.exit(' - Could not create thumbnail directory '+self.thumbdir+' --> ABORTING')
+        self.Nbytes   = 0
+        if self.maxbytes is not None: # size only needed when bounded (evict() rescans the directory anyway)
+            self.Nbytes = np.sum([os.path.getsize(tt) for tt in glob.glob(self.thumbdir+'*.png')])
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def thumbname(self,imgname,size):
+        """
+        Return the file name of the thumbnail of imgname with size=(xsize,ysize)
+        """
+        keystr = repr((os.path.abspath(imgname),os.path.getmtime(imgname),tuple(size)))
+        return self.thumbdir+hashlib.sha1(keystr).hexdigest()+'.png'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def get(self,imgname,size):
+        """
+        Return imgname resized to size=(xsize,ysize) reading the thumbnail if it exists and
+        otherwise resampling the image and storing the thumbnail
+        """
+        thumb = self.thumbname(imgname,size)
+        try:
+            img = Image.open(thumb)
+            img.load()
+            os.utime(thumb,None) # mark as recently used
+            with self.lock: self.Nhits = self.Nhits + 1
+            return img
+        except (IOError,OSError): # thumbnail missing, unreadable or removed while reading
+            pass
+
+        img = Image.open(imgname).resize(tuple(size),Image.ANTIALIAS)
+        with self.lock: self.Nmisses = self.Nmisses + 1
+        self.store(thumb,img)
+        return img
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def store(self,thumb,img):
+        """
+        Write thumbnail (via a temporary file so readers never see partial files) and remove the
+        least recently used thumbnails if the cache is above the size limit
+        """
+        tmpname = thumb+'.'+str(os.getpid())+'_'+str(threading.current_thread().ident)+'.tmp'
+        try:
+            img.save(tmpname,'PNG')
+            os.rename(tmpname,thumb)
+        except (IOError,OSError):
+            if self.vb: print ' - WARNING ThumbnailCache could not write '+thumb
+            if os.path.exists(tmpname): os.remove(tmpname)
+            return
+        with self.lock:
+            self.Nbytes = self.Nbytes + os.path.getsize(thumb)
+            overlimit   = (self.maxbytes is not None) and (self.Nbytes > self.maxbytes)
+        if overlimit: self.evict()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def evict(self,fraction=0.9):
+        """
+        Remove the least recently used thumbnails until the cache is below fraction*maxMB
+        (going below the limit avoids scanning the directory on every new thumbnail)
+        """
+        with self.lock:
+            thumbs = []
+            for tt in glob.glob(self.thumbdir+'*.png'):
+                try:
+                    thumbs.append((os.path.getmtime(tt),os.path.getsize(tt),tt))
+                except OSError: # removed by another process
+                    pass
+            thumbs.sort()
+            self.Nbytes = np.sum([tt[1] for tt in thumbs])
+            if self.maxbytes is None: return
+            for mtime, Nbytes, tt in thumbs:
+                if self.Nbytes <= fraction*self.maxbytes: break
+                try:
+                    os.remove(tt)
+                except OSError:
+                    pass
+                self.Nbytes   = self.Nbytes - Nbytes
+                self.Ndropped = self.Ndropped + 1
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def report(self):
+        """
+        Return string summarizing the content and use of the cache
+        """
+        maxstr = str("%.1f" % (self.maxbytes/1e6)) if self.maxbytes is not None else 'unlimited'
+        return ' - ThumbnailCache: '+self.thumbdir+' using '+str("%.2f" % (self.Nbytes/1e6))+' of '+maxstr+\
+               ' MB ('+str(self.Nhits)+' hits, '+str(self.Nmisses)+' misses, '+str(self.Ndropped)+' dropped)'
+#-------------------------------------------------------------------------------------------------------------
+def thumbcache_defaultdir():
+    """
+    Return the default thumbnail directory (used for thumbcache='DEFAULT'). It is kept outside the data
+    directories, so adding thumbnails does not invalidate their build_dirindex index. As the thumbnails
+    are keyed on the absolute path of the images, one directory can be shared by all data directories.
+    """
+    return os.path.join(os.path.expanduser('~'),'.GiG_thumbnails/')
+#-------------------------------------------------------------------------------------------------------------
+thumbworkercache = None # ThumbnailCache of the precompute_thumbnails worker processes
+def thumbnail_workerinit(thumbdir):
+    """
+    Initializer for the precompute_thumbnails worker processes setting up one (unbounded) cache per process
+    """
+    global thumbworkercache
+    thumbworkercache = vi.ThumbnailCache(thumbdir,maxMB=None)
+#-------------------------------------------------------------------------------------------------------------
+def thumbnail_worker(task):
+    """
+    Worker for precompute_thumbnails. Returns True if the thumbnail was created, False if it already
+    existed and None if the image could not be resampled.
+    """
+    imgname, size = task
+    try:
+        if os.path.exists(thumbworkercache.thumbname(imgname,size)): return False
+        thumbworkercache.get(imgname,size)
+        return True
+    except:
+        return None
+#-------------------------------------------------------------------------------------------------------------
+def precompute_thumbnails(directory,GUI='GiG',imglist=None,size=None,thumbdir='DEFAULT',maxMB=200.0,
+                          Nprocesses=None,verbose=True):
+    """
+    Fill the thumbnail cache (see vi.ThumbnailCache) used by the GUIs with the thumbnail keyword
+    with the in-GUI images resized to the display size, using a pool of processes.
+
+    -- INPUT --
+    directory         Directory containing the images (as given to launchgui/launchgui_z or the
+                      pstampsdirectory given to launchgui_m)
+    GUI               The GUI to generate thumbnails for. Choices are:
+                      'GiG' or 'GiGz'   The zfit and stack pngs resized to 990x200
+                      'GiGm'            All postage stamp pngs resized to 220x220
+    imglist           List of images to generate thumbnails for instead of the ones selected by GUI
+    size              (width,height) in pixels of the thumbnails. If 'None' the default size of GUI (see above)
+                      is used. For the grid mode of GiGm (gridshape) use (gridstampsize,gridstampsize),
+                      i.e., (160,160) by default.
+    thumbdir          Thumbnail directory. Use 'DEFAULT' for vi.thumbcache_defaultdir() (as the GUIs).
+    maxMB             Maximum size in MB of the thumbnail directory (as given to the GUIs with thumbcacheMB).
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the number of thumbnails created, skipped and failed.
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    Ncreated, Nskipped, Nfailed = vi.precompute_thumbnails('data/clusterXXXX/',GUI='GiG')
+    Ncreated, Nskipped, Nfailed = vi.precompute_thumbnails('data/postagestamps/',GUI='GiGm',size=(160,160))
+
+    """
+    if thumbdir == 'DEFAULT': thumbdir = vi.thumbcache_defaultdir()
+    if GUI in ['GiG','GiGz']:
+        defaultsize = (990,200)
+        globstrs    = ['*zfitplot.png','*_stack.png','*_2dstack.png']
+    elif GUI == 'GiGm':
+        defaultsize = (220,220)
+        globstrs    = ['*.png']
+    else:
+        sys.exit(' - Invalid GUI ('+str(GUI)+') in precompute_thumbnails --> ABORTING')
+    if size is None:
+        size = defaultsize
+    else:
+        size = (int(size[0]),int(size[1]))
+
+    if imglist is None:
+        dirindex = vi.build_dirindex(directory,verbose=verbose)
+        imglist  = []
+        for globstr in globstrs:
+            imglist = imglist + vi.glob_dirindex(dirindex,directory+globstr)
+        imglist  = sorted(set(imglist))
+
+    vi.ThumbnailCache(thumbdir,maxMB=maxMB) # create the directory before starting the workers
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Generating '+str(size[0])+'x'+str(size[1])+' thumbnails for '+str(len(imglist))+\
+                      ' images using '+str(Nprocesses)+' processes'
+    tasks     = [(img,size) for img in imglist]
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool    = multiprocessing.Pool(processes=Nprocesses,initializer=vi.thumbnail_workerinit,initargs=(thumbdir,))
+        created = pool.map(vi.thumbnail_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        vi.thumbnail_workerinit(thumbdir)
+        created = [vi.thumbnail_worker(task) for task in tasks]
+    runtime = time.time()-starttime
+
+    thumbcache = vi.ThumbnailCache(thumbdir,maxMB=maxMB)
+    thumbcache.evict(fraction=1.0)
+
+    Ncreated = len([cc for cc in created if cc == True])
+    Nskipped = len([cc for cc in created if cc == False])
+    Nfailed  = len([cc for cc in created if cc is None])
+    if verbose:
+        print ' - Created '+str(Ncreated)+', skipped '+str(Nskipped)+' (cached) and failed '+\
+              str(Nfailed)+' thumbnails in '+str("%.1f" % runtime)+' seconds'
+        if thumbcache.Ndropped > 0:
+            print '   Removed '+str(thumbcache.Ndropped)+' least recently used thumbnails to stay below '+\
+                  str(maxMB)+' MB'
+        print thumbcache.report()
+
+    return Ncreated, Nskipped, Nfailed
+#-------------------------------------------------------------------------------------------------------------
+class ImagePrefetcher(object):
+    """
+    Pool of worker threads decoding and resizing in-GUI images (with loadGUIimage) in the background,
+    so the images are ready when the GUIs move on to the next object.
+    Only the PIL images are prepared by the workers; the Tk PhotoImages are created by the GUI itself.
+    """
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,Nworkers=2,Nkeep=10,thumbcache=None,verbose=False):
+        """
+        Start the worker threads
+
+        -- INPUT --
+        Nworkers          Number of worker threads decoding images.
+        Nkeep             Maximum number of prepared images to keep (least recently used are dropped first).
+        thumbcache        vi.ThumbnailCache to read/store the resized images in (passed to loadGUIimage)
+        verbose           Toggle verbosity.
+        """
+        self.vb      = verbose
+        self.thumbcache = thumbcache
+        self.Nkeep   = Nkeep
+        self.queue   = Queue.Queue()
+        self.lock    = threading.Lock()
+        self.images  = collections.OrderedDict() # (imgname,size) -> prepared PIL image
+        self.pending = {}                        # (imgname,size) -> event set when image is done
+        self.workers = []
+        for ww in xrange(Nworkers):
+            worker = threading.Thread(target=self.work)
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def work(self):
+        """
+        Loop run by the worker threads
+        """
+        while True:
+            key = self.queue.get()
+            if key is None: break
+            try:
+                img = vi.loadGUIimage(key[0],key[1],thumbcache=self.thumbcache)
+            except:
+                if self.vb: print ' - WARNING ImagePrefetcher could not load '+key[0]
+                img = None
+            with self.lock:
+                if img is not None: self.store(key,img)
+                event = self.pending.pop(key)
+            event.set()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def store(self,key,img):
+        """
+        Store prepared image dropping the least recently used ones (lock must be held)
+        """
+        self.images[key] = img
+        while len(self.images) > self.Nkeep:
+            self.images.popitem(last=False)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def request(self,imgname,size):
+        """
+        Queue image for decoding unless it is already prepared or queued
+        """
+        key = (imgname,tuple(size))
+        with self.lock:
+            if (key in self.images) or (key in self.pending): return
+            self.pending[key] = threading.Event()
+        self.queue.put(key)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def isready(self,imgname,size):
+        """
+        Return True if the image has been prepared
+        """
+        with self.lock:
+            return (imgname,tuple(size)) in self.images
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def ispending(self,imgname,size):
+        """
+        Return True if the image is queued or being decoded
+        """
+        with self.lock:
+            return (imgname,tuple(size)) in self.pending
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def get(self,imgname,size):
+        """
+        Return the prepared image. Waits for the worker if the image is being decoded and
+        decodes it directly if it was never requested.
+        """
+        key = (imgname,tuple(size))
+        with self.lock:
+            event = self.pending.get(key)
+        if event is not None: event.wait()
+
+        with self.lock:
+            img = self.images.pop(key,None)
+            if img is not None: self.images[key] = img # move to end of LRU order
+        if img is None:
+            img = vi.loadGUIimage(imgname,size,thumbcache=self.thumbcache)
+            with self.lock:
+                self.store(key,img)
+        return img
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def stop(self):
+        """
+        Stop the worker threads
+        """
+        for worker in self.workers:
+            self.queue.put(None)
+#-------------------------------------------------------------------------------------------------------------
+def spectralcoverage_file(file1D,type=1):
+    """
+    Estimating the spectral coverage from the 'etrace' column of a 1D spectrum.
+    Returns -99 if the spectrum is empty.
+    """
+    dat    = pyfits.open(file1D)[1].data
+    et     = dat['etrace']
+    Npix   = float(len(et))
+    Nzero  = float(len(et[et==0]))
+
+    if Npix == 0:
+        return -99
+
+    if type == 1:
+        SCvalue     = 1.0 - Nzero/Npix
+    else:
+        sys.exit(' - Invalid type ('+str(type)+') in estimate_spectralcoverage')
+    return SCvalue
+#-------------------------------------------------------------------------------------------------------------
+def contaminationlevel_file(file2D,cut=1e-3,type=1):
+    """
+    Estimating the contamination level from the model and contamination extensions of a 2D spectrum,
+    i.e., the fraction of the pixels in the model trace with a contamination above 'cut'.
+    Returns -99 if the model trace is empty.
+
+    The file is memory-mapped so only the MODEL and CONTAM extensions are read, and the counts
+    are done on boolean masks to avoid copying the contamination model.
+    """
+    hduimg = pyfits.open(file2D,memmap=True) # Load the FITS hdulist
+    try:
+        inmodel = hduimg[6].data != 0        # pixels in the model trace
+        contam  = hduimg[7].data
+        badpix  = contam > cut               # |contam| > cut without creating |contam|
+        badpix |= contam < -cut
+        badpix &= inmodel
+        del contam                           # release the memory-mapped data before closing
+        Nbad    = float(np.count_nonzero(badpix))
+        Npix    = float(np.count_nonzero(inmodel))
+    finally:
+        hduimg.close()
+
+    if Npix == 0:
+        return -99
+
+    if type == 1:
+        CLvalue  = Nbad/Npix
+    else:
+        sys.exit(' - Invalid type ('+str(type)+') in estimate_contaminationlevel')
+    return CLvalue
+#-------------------------------------------------------------------------------------------------------------
+def specmetrics_worker(task):
+    """
+    Worker for precompute_specmetrics() returning the metric for a single file.
+    task = (metric, filename, cut, type) where metric is 'speccov' or 'contlevel'
+    """
+    metric, filename, cut, type = task
+    try:
+        if metric == 'speccov':
+            value = vi.spectralcoverage_file(filename,type=type)
+        else:
+            value = vi.contaminationlevel_file(filename,cut=cut,type=type)
+    except Exception, err:
+        print ' - WARNING Could not estimate '+metric+' for '+filename+' ('+str(err)+')'
+        value = None
+    return value
+#-------------------------------------------------------------------------------------------------------------
+def precompute_specmetrics(directory,objlist=None,outputfile='DEFAULT',cutcontam=1e-3,speccovtype=1,
+                           contleveltype=1,Nprocesses=None,clobber=False,verbose=True):
+    """
+    Estimate the spectral coverage and contamination level GiG writes to its output for all objects
+    in a directory in one go (headless), spreading the FITS files over a pool of processes.
+    The results are written to a table with a row per ID, PA and grism, which GiG looks up
+    instead of opening the FITS files while inspecting (see the 'specmetrics' keyword of launchgui).
+
+    -- INPUT --
+    directory         Directory containing the data of the objects (as given to launchgui)
+    objlist           List of objects to estimate metrics for. If 'None' all objects in 'directory' are used.
+    outputfile        Name of table to write to 'directory'. 'DEFAULT' gives 'GiG_specmetrics.txt'
+    cutcontam         The level above which contamination is counted (has to match the GiG setup)
+    speccovtype       Type of spectral coverage estimator
+    contleveltype     Type of contamination level estimator
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    clobber           Overwrite existing table.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the path to the table.
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    tablefile = vi.precompute_specmetrics('data/clusterXXXX/',Nprocesses=8)
+    vi.launchgui(directory='data/clusterXXXX/',specmetrics='DEFAULT')
+
+    """
+    if outputfile == 'DEFAULT':
+        tablefile = directory+'GiG_specmetrics.txt'
+    else:
+        tablefile = directory+outputfile
+    if os.path.isfile(tablefile) & (clobber == False):
+        sys.exit(' - The table '+tablefile+' already exists (use clobber=True to overwrite) --> ABORTING')
+
+    dirindex = vi.build_dirindex(directory,verbose=verbose)
+    if objlist is None:
+        objlist = sorted(dirindex['objects'].keys())
+
+    # -------- COLLECT FILES (same search as in Application.estimate_*) --------
+    tasks = []
+    keys  = []
+    for objid in objlist:
+        idstr = str("%05d" % objid)
+        if int(objid) not in dirindex['objects']: continue
+        for PA in sorted(dirindex['objects'][int(objid)]['PAs'].keys()):
+            PAstr = '-'+str("%03d" % int(PA))+'-'
+            for f in vi.glob_dirindex(dirindex,directory+'*'+PAstr+'*'+idstr+'*1D.fits'):
+                tasks.append(('speccov',f,cutcontam,speccovtype))
+                keys.append((int(objid),int(PA),f))
+            for f in vi.glob_dirindex(dirindex,directory+'*'+PAstr+'*'+idstr+'*2D.fits'):
+                tasks.append(('contlevel',f,cutcontam,contleveltype))
+                keys.append((int(objid),int(PA),f))
+
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Estimating metrics from '+str(len(tasks))+' FITS files using '+\
+                      str(Nprocesses)+' processes'
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool   = multiprocessing.Pool(processes=Nprocesses)
+        values = pool.map(vi.specmetrics_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        values = [vi.specmetrics_worker(task) for task in tasks]
+
+    # -------- COMBINE AND WRITE TABLE --------
+    metrics = {}
+    for task, key, value in zip(tasks,keys,values):
+        if value is None: continue
+        objid, PA, f = key
+        if 'G102' in f:
+            grism = 'G102'
+        elif 'G141' in f:
+            grism = 'G141'
+        else:
+            continue
+        entry = metrics.setdefault((objid,PA,grism),[9.99,9.99])
+        if task[0] == 'speccov':
+            entry[0] = value
+        else:
+            entry[1] = value
+
+    fout = open(tablefile,'w')
+    fout.write('# Spectral coverage and contamination level estimates generated with '
+               'visualinspection.precompute_specmetrics() on '+
+               datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")+'\n')
+    fout.write('# directory = '+directory+'\n')
+    fout.write('# cutcontam = '+str(cutcontam)+'\n')
+    fout.write('# speccovtype = '+str(speccovtype)+'\n')
+    fout.write('# contleveltype = '+str(contleveltype)+'\n')
+    fout.write('# ID PA grism speccov contlevel\n')
+    for key in sorted(metrics.keys()):
+        fout.write(' '+str("%.5d" % key[0])+' '+str("%.3d" % key[1])+' '+key[2]+' '+
+                   str("%.5f" % metrics[key][0])+' '+str("%.5f" % metrics[key][1])+'\n')
+    fout.close()
+
+    if verbose: print ' - Wrote metrics for '+str(len(metrics))+' ID/PA/grism combinations to '+tablefile+\
+                      ' ('+str("%.1f" % (time.time()-starttime))+' seconds)'
+    return tablefile
+#-------------------------------------------------------------------------------------------------------------
+def load_specmetrics(tablefile,verbose=True):
+    """
+    Load table generated with precompute_specmetrics()
+
+    -- OUTPUT --
+    metrics           Dictionary of (ID,PA) -> grism -> [speccov,contlevel]
+    setup             Dictionary with the 'cutcontam', 'speccovtype' and 'contleveltype' used for the table
+    """
+    metrics = {}
+    setup   = {}
+    for line in open(tablefile,'r'):
+        if line.startswith('#'):
+            if ' = ' in line:
+                keyword, value = line[1:].split(' = ')
+                if keyword.strip() in ['cutcontam','speccovtype','contleveltype']:
+                    setup[keyword.strip()] = float(value)
+            continue
+        cols = line.split()
+        if len(cols) != 5: continue
+        metrics.setdefault((int(cols[0]),int(cols[1])),{})[cols[2]] = [float(cols[3]),float(cols[4])]
+
+    if verbose: print ' - Loaded metrics for '+str(len(metrics))+' ID/PA combinations from '+tablefile
+    return metrics, setup
+#-------------------------------------------------------------------------------------------------------------
+def subtractcontam_fits(twodfits,clobber=False,verbose=False):
+    """
+    Subtract the contamination model from the science frame of a 2D spectrum and store the result
+    as *_SCI-CONTAM.fits next to the 2D spectrum.
+
+    The output is only (re)generated if it does not exist, is older than the 2D spectrum or clobber=True.
+    It is written to a temporary file which is then renamed, so the GUIs never see a partial file.
+
+    -- OUTPUT --
+    output            Name of the contamination subtracted file
+    created           True if the file was (re)generated, False if an up-to-date file was found
+    """
+    filename, fileext =  os.path.splitext(twodfits)
+    output = filename+'_SCI-CONTAM'+fileext
+
+    if (not clobber) and os.path.isfile(output) and (os.path.getmtime(output) >= os.path.getmtime(twodfits)):
+        if verbose: print ' - ',output,' already exists'
+        return output, False
+
+    if verbose: print ' - Create ',output
+    hduimg  = pyfits.open(twodfits) # Load the FITS hdulist
+    try:
+        hdrsci    = hduimg['SCI'].header    # extracting science header
+        scicontam = hduimg['SCI'].data - hduimg['CONTAM'].data
+    finally:
+        hduimg.close()
+
+    tempfile = filename+'_SCI-CONTAM_tmp'+str(os.getpid())+fileext
+    pyfits.writeto(tempfile, scicontam, hdrsci, clobber=True)
+    os.rename(tempfile,output) # atomic on POSIX file systems
+
+    return output, True
+#-------------------------------------------------------------------------------------------------------------
+def subtractcontam_worker(task):
+    """
+    Worker for precompute_subtractcontam(). task = (twodfits, clobber)
+    Returns True if the file was created, False if skipped and None if it failed.
+    """
+    twodfits, clobber = task
+    try:
+        created = vi.subtractcontam_fits(twodfits,clobber=clobber)[1]
+    except Exception, err:
+        print ' - WARNING Could not create SCI-CONTAM file for '+twodfits+' ('+str(err)+')'
+        created = None
+    return created
+#-------------------------------------------------------------------------------------------------------------
+def precompute_subtractcontam(directory,objlist=None,Nprocesses=None,clobber=False,verbose=True):
+    """
+    Generate the contamination subtracted *_SCI-CONTAM.fits files, which GiG and GiGz show in DS9,
+    for all 2D spectra in a directory in one go using a pool of processes. When the GUIs are launched
+    afterwards they find the files already present instead of creating them when DS9 is opened.
+    Files that are up to date are skipped.
+
+    -- INPUT --
+    directory         Directory containing the data of the objects (as given to launchgui)
+    objlist           List of objects to generate files for. If 'None' all objects in 'directory' are used.
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    clobber           Regenerate files even if they are up to date.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the number of files created, skipped and failed.
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    Ncreated, Nskipped, Nfailed = vi.precompute_subtractcontam('data/clusterXXXX/',Nprocesses=8)
+
+    """
+    dirindex = vi.build_dirindex(directory,verbose=verbose)
+    if objlist is None:
+        objlist = sorted(dirindex['objects'].keys())
+
+    twodfits = []
+    for objid in objlist:
+        if int(objid) not in dirindex['objects']: continue
+        PAdic = dirindex['objects'][int(objid)]['PAs']
+        for PA in sorted(PAdic.keys()):
+            for grism in sorted(PAdic[PA].keys()):
+                if '2Dfits' in PAdic[PA][grism]:
+                    twodfits.append(PAdic[PA][grism]['2Dfits'])
+
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Generating SCI-CONTAM files for '+str(len(twodfits))+' 2D spectra using '+\
+                      str(Nprocesses)+' processes'
+    tasks     = [(f,clobber) for f in twodfits]
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool    = multiprocessing.Pool(processes=Nprocesses)
+        created = pool.map(vi.subtractcontam_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        created = [vi.subtractcontam_worker(task) for task in tasks]
+    runtime = time.time()-starttime
+
+    Ncreated = len([cc for cc in created if cc == True])
+    Nskipped = len([cc for cc in created if cc == False])
+    Nfailed  = len([cc for cc in created if cc is None])
+    if verbose:
+        MBread = np.sum([os.path.getsize(f) for f, cc in zip(twodfits,created) if cc == True])/1024.**2
+        print ' - Created '+str(Ncreated)+', skipped '+str(Nskipped)+' (up to date) and failed '+\
+              str(Nfailed)+' files in '+str("%.1f" % runtime)+' seconds'
+        if (Ncreated > 0) & (runtime > 0):
+            print '   Throughput: '+str("%.1f" % (Ncreated/runtime))+' files/s ('+\
+                  str("%.1f" % (MBread/runtime))+' MB/s of 2D spectra read)'
+
+    return Ncreated, Nskipped, Nfailed
+#-------------------------------------------------------------------------------------------------------------
+def zfitresults_npz(eazydicfile,zfitfiles,clobber=False,verbose=False):
+    """
+    Convert the EAZY dictionary (*EAZYzfit_all.pickle) and zfit results (*zfit.dat) of an object into a
+    compact *EAZYzfit_all.npz file containing only what is plotted in GiGz, i.e.,
+    the '*_oned_wave' and '*_model_1D' arrays of the EAZY dictionary and the names (column 1) and
+    redshifts (column 7) of the zfit results.
+
+    The output is only (re)generated if it does not exist, is older than the input or clobber=True.
+
+    -- INPUT --
+    eazydicfile       EAZY dictionary pickle to convert
+    zfitfiles         List of zfit.dat files of the object
+    clobber           Regenerate the file even if it is up to date.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    output            Name of the npz file
+    created           True if the file was (re)generated, False if an up-to-date file was found
+    """
+    output = eazydicfile.replace('.pickle','.npz')
+    if (not clobber) and vi.zfitresults_uptodate(eazydicfile,zfitfiles):
+        if verbose: print ' - ',output,' already exists'
+        return output, False
+
+    if verbose: print ' - Create ',output
+    with open(eazydicfile, 'rb') as handle:
+        eazydic = pickle.load(handle)
+
+    arrays   = {}
+    goodzfit = False
+    for key in eazydic.keys():
+        if key.endswith('_oned_wave') or key.endswith('_model_1D'):
+            arrays[key] = np.asarray(eazydic[key])
+        elif key.endswith('2D.fits'):
+            try:
+                lambdaz, temp_sed, lci, obs_sed, fobs, efobs = eazydic[key]
+                goodzfit = True
+            except:
+                pass
+    arrays['goodzfit'] = np.asarray(goodzfit)
+
+    zfitnames     = []
+    zfitredshifts = []
+    for zfitfile in zfitfiles:
+        zfitdata      = np.atleast_1d(np.genfromtxt(zfitfile,dtype=None))
+        zfitnames     = zfitnames + list(zfitdata['f0'])
+        zfitredshifts = zfitredshifts + list(zfitdata['f6'])
+    arrays['zfit_names']     = np.asarray(zfitnames,dtype=str)
+    arrays['zfit_redshifts'] = np.asarray(zfitredshifts,dtype=float)
+
+    tempfile = output.replace('.npz','_tmp'+str(os.getpid())+'.npz')
+    np.savez(tempfile,**arrays)
+    os.rename(tempfile,output) # atomic on POSIX file systems
+
+    return output, True
+#-------------------------------------------------------------------------------------------------------------
+def zfitresults_uptodate(eazydicfile,zfitfiles):
+    """
+    Return the name of the npz file generated by zfitresults_npz for eazydicfile if it exists and is
+    newer than the EAZY dictionary and the zfit files. Otherwise None is returned.
+    """
+    output = eazydicfile.replace('.pickle','.npz')
+    if not os.path.isfile(output): return None
+    npztime = os.path.getmtime(output)
+    for infile in [eazydicfile]+list(zfitfiles):
+        if os.path.getmtime(infile) > npztime: return None
+    return output
+#-------------------------------------------------------------------------------------------------------------
+def load_zfitresults(npzfile):
+    """
+    Load npz file generated by zfitresults_npz. The arrays are only read from the file when accessed.
+
+    -- OUTPUT --
+    eazydic           Dictionary-like object with the '*_oned_wave' and '*_model_1D' arrays
+    zfitdata          Dictionary with the zfit names ('f0') and redshifts ('f6')
+    goodzfit          True if the EAZY dictionary contained a valid fit
+    """
+    eazydic  = np.load(npzfile)
+    zfitdata = {'f0':eazydic['zfit_names'], 'f6':eazydic['zfit_redshifts']}
+    goodzfit = bool(eazydic['goodzfit'])
+    return eazydic, zfitdata, goodzfit
+#-------------------------------------------------------------------------------------------------------------
+def zfitresults_worker(task):
+    """
+    Worker for precompute_zfitresults(). task = (eazydicfile, zfitfiles, clobber)
+    Returns True if the file was created, False if skipped and None if it failed.
+    """
+    eazydicfile, zfitfiles, clobber = task
+    try:
+        created = vi.zfitresults_npz(eazydicfile,zfitfiles,clobber=clobber)[1]
+    except Exception, err:
+        print ' - WARNING Could not convert '+eazydicfile+' ('+str(err)+')'
+        created = None
+    return created
+#-------------------------------------------------------------------------------------------------------------
+def precompute_zfitresults(directory,objlist=None,Nprocesses=None,clobber=False,verbose=True):
+    """
+    Convert the EAZY dictionaries (*EAZYzfit_all.pickle) and zfit results (*zfit.dat) of all objects
+    in a directory into compact *EAZYzfit_all.npz files (see zfitresults_npz) using a pool of processes.
+    GiGz loads these instead of the pickles when they are up to date.
+
+    -- INPUT --
+    directory         Directory containing the data of the objects (as given to launchgui_z)
+    objlist           List of objects to convert files for. If 'None' all objects in 'directory' are used.
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    clobber           Regenerate files even if they are up to date.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the number of files created, skipped and failed.
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    Ncreated, Nskipped, Nfailed = vi.precompute_zfitresults('data/clusterXXXX/',Nprocesses=8)
+
+    """
+    dirindex = vi.build_dirindex(directory,verbose=verbose)
+    if objlist is None:
+        objlist = sorted(dirindex['objects'].keys())
+
+    tasks = []
+    for objid in objlist:
+        idstr       = str("%.5d" % int(objid))
+        eazydicfile = vi.glob_dirindex(dirindex,directory+'*'+idstr+'*EAZYzfit_all.pickle')
+        if len(eazydicfile) == 0: continue
+        zfitfiles   = sorted(vi.glob_dirindex(dirindex,directory+'*_'+idstr+'*zfit.dat'))
+        tasks.append((eazydicfile[0],zfitfiles,clobber))
+
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Converting EAZY and zfit results of '+str(len(tasks))+' objects using '+\
+                      str(Nprocesses)+' processes'
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool    = multiprocessing.Pool(processes=Nprocesses)
+        created = pool.map(vi.zfitresults_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        created = [vi.zfitresults_worker(task) for task in tasks]
+    runtime = time.time()-starttime
+
+    Ncreated = len([cc for cc in created if cc == True])
+    Nskipped = len([cc for cc in created if cc == False])
+    Nfailed  = len([cc for cc in created if cc is None])
+    if verbose:
+        print ' - Created '+str(Ncreated)+', skipped '+str(Nskipped)+' (up to date) and failed '+\
+              str(Nfailed)+' files in '+str("%.1f" % runtime)+' seconds'
+
+    return Ncreated, Nskipped, Nfailed
+#-------------------------------------------------------------------------------------------------------------
+def load_1Dspectrum(fits1D,waverange,waverange_cut,xscale=1e4):
+    """
+    Load the 1D spectrum in fits1D once into compact float32 arrays ready for plotting in GiGz
+
+    -- INPUT --
+    fits1D            1D spectrum to load
+    waverange         Wavelength range [A] of the spectrum to keep for plotting
+    waverange_cut     Wavelength range [A] to get the flux limits for the plot window from
+    xscale            Scaling of the wavelengths to plot (1e4 gives micron)
+
+    -- OUTPUT --
+    Dictionary with the keys
+    'goodent'         Entries of the spectrum within waverange
+    'wave'            WAVE/xscale for goodent
+    'flux'            (FLUX-CONTAM)/SENSITIVITY for goodent
+    'sensitivity'     SENSITIVITY of the full spectrum (for flux calibrating the zfit models)
+    'fluxmin'         Minimum of FLUX within waverange_cut (None if no pixels in range)
+    'fluxmax'         Maximum of FLUX within waverange_cut (None if no pixels in range)
+    """
+    hdulist = pyfits.open(fits1D,memmap=True)
+    try:
+        dat1D   = hdulist[1].data
+        wave    = np.asarray(dat1D['WAVE'])
+        flux    = np.asarray(dat1D['FLUX'])
+        sens    = np.array(dat1D['SENSITIVITY'],dtype=np.float32) # copy; file is closed below
+        goodent = np.where((wave > waverange[0]) & (wave < waverange[1]))[0]
+        cutflux = flux[(wave > waverange_cut[0]) & (wave < waverange_cut[1])]
+
+        spec = {}
+        spec['goodent']     = goodent
+        spec['wave']        = (wave[goodent]/xscale).astype(np.float32)
+        spec['flux']        = ((flux[goodent] - dat1D['CONTAM'][goodent]) /
+                               dat1D['SENSITIVITY'][goodent]).astype(np.float32)
+        spec['sensitivity'] = sens
+        spec['fluxmin']     = None
+        spec['fluxmax']     = None
+        if len(cutflux) > 0:
+            spec['fluxmin'] = float(np.min(cutflux))
+            spec['fluxmax'] = float(np.max(cutflux))
+    finally:
+        hdulist.close()
+    return spec
+#-------------------------------------------------------------------------------------------------------------
+def load_GiGcatalog(GiGfile,verbose=True):
+    """
+    Load the output from GiG (launchgui) once into a table and an index of the marked line wavelengths
+
+    -- INPUT --
+    GiGfile           Output file from GiG to load
+    verbose           Toggle verbosity
+
+    -- OUTPUT --
+    GiGdata           Structured array with the columns of the GiG output (ID, PA, flags)
+    GiGlinewaves      Dictionary with keys (ID,PA) containing dictionaries with the keys 'G102' and 'G141'
+                      holding arrays of the line wavelengths [A] marked for the object in GiG.
+                      If an object and PA appears more than once, the last entry in the file is used.
+    """
+    GiGfile_open = open(GiGfile,'r')
+    GiGlines     = GiGfile_open.readlines()
+    GiGfile_open.close()
+
+    GiGdata      = np.genfromtxt(GiGlines,comments='#',skip_header=2,names=True)
+
+    GiGlinewaves = {}
+    for line in GiGlines:
+        if line.strip().startswith('#') or ('#G102wave#' not in line): continue
+        cols      = line.split()
+        linewaves = {}
+        linewaves['G102'] = line.split('#G102wave#')[-1].split('#G141wave#')[0]
+        linewaves['G141'] = line.split('#G141wave#')[-1].split('#C#')[0]
+        for grism in linewaves.keys():
+            waves = []
+            for wave in linewaves[grism].replace(',',' ').split():
+                try:
+                    wave = float(wave)
+                except ValueError:
+                    if verbose: print ' - WARNING Invalid '+grism+' wavelength ('+wave+') for ID = '+cols[0]+' in '+GiGfile
+                    continue
+                if wave < 2.0: wave = wave*1.e4 # in case of wave given in micron
+                waves.append(wave)
+            linewaves[grism] = np.asarray(waves)
+        GiGlinewaves[(int(cols[0]),float(cols[1]))] = linewaves
+
+    if verbose: print ' - Loaded '+str(len(GiGdata))+' entries (and marked line wavelengths) from '+GiGfile
+    return GiGdata, GiGlinewaves
+#-------------------------------------------------------------------------------------------------------------
+def GiGz_emissionlines():
+    """
+    Return the emission lines shown in the GiGz plots
+
+    -- OUTPUT --
+    linelist          Array with the rest frame wavelengths [A] of the lines
+    linename          List with the plot labels of the lines
+    """
+    #Lines from http://www.sdss.org/dr7/algorithms/linestable.html and
+    # http://adsabs.harvard.edu/abs/2008ApJS..174..282L
+    linelist = np.asarray([1216 ,1335 ,1402  ,1549 ,1908. ,2795. ,3726.03 ,
+                           4101.74   ,4340.47  ,4861.33 ,4959.,5007. ,
+                           6548, 6562.8, 6583.5,
+                           6718,6732,
+                           9071.1,   9533.2])
+    linename = ['Lya','CII','SiIV','CIV','CIII]','MgII',"[OII]" ,
+                '$H\delta$','H$\gamma$','H$\\beta$',''   ,'[OIII]',
+                ''  ,'H$\\alpha$+NII',' '   ,
+                ' ' ,'SII',
+                '[SIII]','[SIII]']
+    return linelist, linename
+#-------------------------------------------------------------------------------------------------------------
+def find_1Dspectra(directory,idstr,dirindex=None,MASTfiles=False):
+    """
+    Return the 1D spectra (fits files) of an object and the PAs they were observed at
+
+    -- INPUT --
+    directory         Directory containing the data of the object
+    idstr             ID of the object as 5-digit string
+    dirindex          Index of directory from build_dirindex. If None the directory is globbed.
+    MASTfiles         Set to True if the files are named as on MAST
+
+    -- OUTPUT --
+    fits1D            List of 1D spectra
+    PAs               Sorted array of the (unique) PAs as strings
+    """
+    if MASTfiles:
+        searchext = '1d.fits'
+    else:
+        searchext = '1D.fits'
+    if dirindex is None:
+        fits1Dfound = glob.glob(directory+'*'+idstr+'*'+searchext)
+    else:
+        fits1Dfound = vi.glob_dirindex(dirindex,directory+'*'+idstr+'*'+searchext)
+    fits1D = []
+    PAs    = []
+    for f1D in fits1Dfound:
+        try:
+            if MASTfiles:
+                PAs.append(re.search(r'(-pa..._)', f1D).group()[3:6])
+            else:
+                PAs.append(re.search(r'(-...-)', f1D).group()[1:4])
+
+            fits1D.append(f1D)
+        except:
+            pass
+
+    return fits1D, np.sort(np.unique(np.asarray(PAs)))
+#-------------------------------------------------------------------------------------------------------------
+def load_eazyzfit(directory,idstr,dirindex=None,verbose=False):
+    """
+    Load the EAZY dictionary (*EAZYzfit_all.pickle) and zfit results (*zfit.dat) of an object.
+    If an up-to-date npz file generated with precompute_zfitresults exists that is loaded instead.
+
+    -- INPUT --
+    directory         Directory containing the data of the object
+    idstr             ID of the object as 5-digit string
+    dirindex          Index of directory from build_dirindex. If None the directory is globbed.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    eazydicexists     True if an EAZY dictionary was found
+    eazydic           The EAZY dictionary (None if not found)
+    zfitdataALL       The zfit results ('f0' contains the names and 'f6' the redshifts)
+    goodzfitload      True if the EAZY dictionary contained a valid fit
+    """
+    if dirindex is None:
+        globfct = glob.glob
+    else:
+        globfct = lambda globstr: vi.glob_dirindex(dirindex,globstr)
+
+    eazydicexists = False
+    eazydic       = None
+    zfitdataALL   = []
+    goodzfitload  = False
+    eazydicfile   = globfct(directory+'*'+idstr+'*EAZYzfit_all.pickle')
+    if (len(eazydicfile) > 0):
+        eazydicfile = eazydicfile[0]
+        if os.path.isfile(eazydicfile):
+            zfitfiles = np.sort(globfct(directory+'/*_'+idstr+'*zfit.dat'))
+            npzfile   = vi.zfitresults_uptodate(eazydicfile,zfitfiles)
+            if npzfile is not None: # converted with vi.precompute_zfitresults
+                if verbose: print ' - Loading EAZY and zfit results from ',npzfile
+                eazydic, zfitdataALL, goodzfitload = vi.load_zfitresults(npzfile)
+            else:
+                with open(eazydicfile, 'rb') as handle:
+                    eazydic = pickle.load(handle)
+
+                if verbose: print ' - Attempt to load dictionary in ',eazydicfile
+                try:
+                    keys     = eazydic.keys()
+                    for key in keys:
+                        if key.endswith('2D.fits'):
+                            eazykey = key
+
+                    if verbose: print ' - Loading EAZY photo-z info from key ',eazykey
+                    lambdaz, temp_sed, lci, obs_sed, fobs, efobs = eazydic[eazykey]
+                    goodzfitload = True
+                except:
+                    goodzfitload = False
+
+                if verbose: print ' - Loading results from zfit (in *zfit.dat)'
+                for zfitfile in zfitfiles:
+                    zfitdata  = np.genfromtxt(zfitfile,dtype=None)
+                    if (zfitdataALL == []):
+                        zfitdataALL = zfitdata
+                    else:
+                        zfitdataALL = np.append(zfitdataALL,zfitdata)
+
+            eazydicexists = True
+        else:
+            if verbose: print ' No EAZY dictionary found when looking for ',eazydicfile
+
+    return eazydicexists, eazydic, zfitdataALL, goodzfitload
+#-------------------------------------------------------------------------------------------------------------
+def render_GiGz_1Dspecplot(directory,objid,plotname,redshift=None,smoothlevel=0.0,showmodels=True,
+                           GiGlinewaves=None,window=None,MASTfiles=False,latex=False,dirindex=None,
+                           verbose=False):
+    """
+    Render the GiGz plot of the 1D spectra of an object (spectra, zfit models and emission lines)
+    without the GUI and save it to plotname. Uses a matplotlib Figure directly (no pyplot), so it can
+    be run in worker processes without a display.
+
+    -- INPUT --
+    directory         Directory containing the data of the object
+    objid             ID of object to plot
+    plotname          Name of plot to save (e.g. *_GiGz_1Dspecplot.pdf)
+    redshift          Redshift to show the emission lines at. If None the zfit redshift of the first
+                      spectrum is used (the cluster redshift if there are no zfit results).
+    smoothlevel       Standard deviation of Gauss kernel used to smooth the spectra (as the GiGz slider)
+    showmodels        Show the zfit models and zfit line positions
+    GiGlinewaves      Dictionary with line wavelengths marked in GiG as returned by load_GiGcatalog.
+                      If None no GiG lines are shown.
+    window            Plot window [xmin,xmax,ymin,ymax]. If None the default GiGz window is used.
+    MASTfiles         Set to True if the files are named as on MAST
+    latex             Render plotting lables with latex; requires latex compiler.
+    dirindex          Index of directory from build_dirindex. If None the directory is globbed.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns plotname
+    """
+    Fsize      = 16
+    lwidth     = 2
+    xscale     = 1e4
+    g102col    = ['orange','cyan']
+    g141col    = ['red','magenta']
+    xrangeflam = [0.78,1.67]
+    linelist, linename = vi.GiGz_emissionlines()
+    plotrc = {'text.usetex':latex, 'font.family':'serif', 'font.size':Fsize,
+              'xtick.labelsize':Fsize, 'ytick.labelsize':Fsize}
+    with matplotlib.rc_context(rc=plotrc): # leave the rcParams of the caller untouched
+        idstr = str("%.5d" % objid)
+        fits1D, PAs = vi.find_1Dspectra(directory,idstr,dirindex=dirindex,MASTfiles=MASTfiles)
+        if len(fits1D) == 0:
+            if verbose: print ' - WARNING No 1D spectra found for '+idstr+' in '+directory
+            return None
+
+        eazydicexists, eazydic, zfitdataALL, goodzfitload = vi.load_eazyzfit(directory,idstr,dirindex=dirindex)
+        if redshift is None:
+            redshift = vi.getclusterz(fits1D[0])[1]
+            if eazydicexists:
+                ent = np.where(zfitdataALL['f0'] == fits1D[0].split('/')[-1].split('.1D.')[0])[0]
+                if len(ent) > 0: redshift = float(zfitdataALL['f6'][ent[0]])
+
+        fig = Figure(figsize=(12,4))
+        FigureCanvasAgg(fig)
+        fig.subplots_adjust(wspace=0.2, hspace=0.2,left=0.1, right=0.98, bottom=0.15, top=0.95)
+        ax  = fig.add_subplot(111)
+        ymax   = []
+        ymin   = []
+        for ii, f1D in enumerate(fits1D):
+            if ('G102' in f1D) or ('g102' in f1D):
+                grism   = 'G102'
+                spec1D  = vi.load_1Dspectrum(f1D,[7600,11700],[8000,11250],xscale=xscale)
+                color   = g102col[0]
+                if (len(PAs) == 2) and ('-'+PAs[1]+'-' in f1D): color = g102col[1] # second PA color
+            elif ('G141' in f1D) or ('g141' in f1D):
+                grism   = 'G141'
+                spec1D  = vi.load_1Dspectrum(f1D,[10500,17000],[8000,11250],xscale=xscale) # y-range as GiGz
+                color   = g141col[0]
+                if (len(PAs) == 2) and ('-'+PAs[1]+'-' in f1D): color = g141col[1] # second PA color
+            else:
+                continue
+
+            goodent = spec1D['goodent']
+            wave1D  = spec1D['wave']
+            flux1D  = spec1D['flux']
+            if len(flux1D) < 1: continue
+
+            if spec1D['fluxmax'] is not None:
+                ymax.append(spec1D['fluxmax'])
+                ymin.append(spec1D['fluxmin'])
+
+            flux1D_smooth = scipy.ndimage.filters.gaussian_filter1d(flux1D,smoothlevel,cval=0.0)
+            ax.plot(wave1D, flux1D, color=color,linestyle='-',linewidth=lwidth*1.5, alpha=0.2)
+            ax.plot(wave1D, flux1D_smooth, color=color,linestyle='-',linewidth=lwidth*1.5, alpha=0.7)
+            frange  = [np.min(flux1D),np.max(flux1D)]
+            dfrange = np.max(flux1D)-np.min(flux1D)
+
+            objPA = float(PAs[0])
+            if (len(PAs) == 2) and ('-'+PAs[1]+'-' in f1D): objPA = float(PAs[1])
+            if (GiGlinewaves is not None) and ((objid,objPA) in GiGlinewaves):
+                for wave in GiGlinewaves[(objid,objPA)][grism]:
+                    dwave  = np.abs(wave1D-wave/xscale)
+                    GiGent = np.where(dwave == np.min(dwave))[0]
+                    ax.plot(np.zeros(len(GiGent))+wave/xscale,flux1D_smooth[GiGent],marker='o',linestyle='',
+                            markerfacecolor=color,markeredgecolor='black',markeredgewidth=lwidth/1.5,markersize=8)
+
+            if eazydicexists & showmodels & goodzfitload:
+                ent = np.where(zfitdataALL['f0'] == f1D.split('/')[-1].split('.1D.')[0])
+                if len(ent[0]) > 0:
+                    zfitredshift = zfitdataALL['f6'][ent]
+                    for ll in range(len(linelist)):
+                        textpos = linelist[ll]/xscale*(zfitredshift+1.0)
+                        ax.plot(np.zeros(2)+textpos,frange,color=color,alpha=0.6,linestyle='--',linewidth=lwidth)
+                        if (textpos > xrangeflam[0]) & (textpos < xrangeflam[1]):
+                            ax.text(textpos,frange[0]+dfrange*0.05,linename[ll],color=color,size=Fsize-3.,
+                                    rotation='vertical',horizontalalignment='right',verticalalignment='bottom',
+                                    alpha=0.6)
+
+                    oned_wave = eazydic[f1D.split('/')[-1].replace('.1D.','.2D.')+'_oned_wave']
+                    model_1D  = eazydic[f1D.split('/')[-1].replace('.1D.','.2D.')+'_model_1D']/spec1D['sensitivity']
+                    if oned_wave[0] != -99:
+                        ax.plot(oned_wave[goodent]/xscale, model_1D[goodent],color='white',linestyle='-',
+                                linewidth=lwidth*2,alpha=1.0,zorder=50+ii)
+                        ax.plot(oned_wave[goodent]/xscale, model_1D[goodent],color=color,linestyle='-',
+                                linewidth=lwidth,alpha=1.0,zorder=50+ii,
+                                label='zfit model (zfit='+str("%.3f" % zfitredshift)+')')
+
+        if window is None:
+            if (len(ymin) != 0) & (len(ymax) != 0):
+                yrangeflam = [0.95*min(ymin), 1.05*max(ymax)]
+                if yrangeflam[0] < -0.01: yrangeflam[0] = -0.01
+                if yrangeflam[1] >  10.0: yrangeflam[1] =  10.0
+            else:
+                yrangeflam = [0.0, 1.0]
+        else:
+            xrangeflam = window[0:2]
+            yrangeflam = window[2:4]
+        Dyrange = yrangeflam[1]-yrangeflam[0]
+        ax.set_xlim(xrangeflam)
+        ax.set_ylim(yrangeflam)
+        ax.axvspan(1.105,1.16,alpha=0.20,color='k')
+
+        if latex:
+            ax.set_xlabel('$\lambda / [\mu\mathrm{m}]$')
+            ax.set_ylabel('$f_\lambda / [10^{-17}\mathrm{erg}/\mathrm{s}/\mathrm{cm}^2/\mathrm{\AA}]$')
+        else:
+            ax.set_xlabel('lambda / [micron]')
+            ax.set_ylabel('f_lambda / [10**-17/erg/s/cm2/A]')
+
+        # === emission lines for scale ===
+        textpos = linelist/xscale*(redshift+1.0)
+        for ll in range(len(linelist)):
+            ax.plot(np.zeros(2)+textpos[ll],yrangeflam,color='#006600',alpha=0.7,linestyle='-',linewidth=lwidth)
+            if (textpos[ll] > xrangeflam[0]) & (textpos[ll] < xrangeflam[1]):
+                ax.text(textpos[ll],yrangeflam[0]+Dyrange*0.05,linename[ll],color='#006600',size=Fsize-3.,
+                        rotation='vertical',horizontalalignment='right',verticalalignment='bottom')
+
+        # === legend ===
+        box = ax.get_position()
+        ax.set_position([box.x0, box.y0, box.width, box.height * 0.83])
+        ax.plot([],[],'orange',label='G102 PA='+PAs[0],linewidth=lwidth*2)
+        ax.plot([],[],'red',label='G141 PA='+PAs[0],linewidth=lwidth*2)
+        if len(PAs) == 2:
+            ax.plot([],[],'cyan',label='G102 PA='+PAs[1],linewidth=lwidth*2)
+            ax.plot([],[],'magenta',label='G141 PA='+PAs[1],linewidth=lwidth*2)
+        ax.plot([],[],'green',label='Lines at z='+str("%.3f" % redshift),linewidth=lwidth*2)
+        if GiGlinewaves is not None:
+            ax.plot([],[],label='GiG marked lines',marker='o',markerfacecolor='white',linestyle='',
+                    markeredgecolor='black',markeredgewidth=lwidth/1.5,markersize=8)
+        ax.legend(fancybox=True, loc='upper center',numpoints=1,prop={'size':Fsize-3.},
+                  ncol=5,bbox_to_anchor=(0.5, 1.27))
+
+        fig.savefig(plotname)
+        if verbose: print ' - Saved GiGz plot of '+idstr+' to \n   '+plotname
+        return plotname
+#-------------------------------------------------------------------------------------------------------------
+def render_GiGz_1Dspecplot_worker(task):
+    """
+    Worker for precompute_GiGz_1Dspecplots() and the background autosave of GiGz.
+    task = (directory, objid, plotname, keywords) where keywords is a dictionary of keywords
+    for render_GiGz_1Dspecplot(). Returns the name of the plot or None if it failed.
+    """
+    directory, objid, plotname, keywords = task
+    try:
+        output = vi.render_GiGz_1Dspecplot(directory,objid,plotname,**keywords)
+    except Exception, err:
+        print ' - WARNING Could not render GiGz plot '+plotname+' ('+str(err)+')'
+        output = None
+    return output
+#-------------------------------------------------------------------------------------------------------------
+def start_GiGz_plotwriter():
+    """
+    Start a separate python process (fork+exec, so it does not inherit the Tk state or threads of the GUI)
+    rendering the GiGz plots sent to it with send_GiGz_plotwriter(). Used for the autosave of GiGz.
+    Returns the subprocess.Popen object of the process.
+    """
+    moduledir = os.path.dirname(os.path.abspath(vi.__file__))
+    cmd       = 'import sys; sys.path.insert(0,'+repr(moduledir)+'); import visualinspection as vi; vi.GiGz_plotwriter()'
+    return subprocess.Popen([sys.executable,'-c',cmd],stdin=subprocess.PIPE)
+#-------------------------------------------------------------------------------------------------------------
+def send_GiGz_plotwriter(plotwriter,task):
+    """
+    Send a task for render_GiGz_1Dspecplot_worker() to the process from start_GiGz_plotwriter().
+    Send task=None to stop the process once all plots have been written.
+    """
+    pickle.dump(task,plotwriter.stdin,pickle.HIGHEST_PROTOCOL)
+    plotwriter.stdin.flush()
+#-------------------------------------------------------------------------------------------------------------
+def GiGz_plotwriter():
+    """
+    Main loop of the process started by start_GiGz_plotwriter(); renders the plots read from stdin
+    """
+    while True:
+        try:
+            task = pickle.load(sys.stdin)
+        except EOFError:
+            break
+        if task is None: break
+        vi.render_GiGz_1Dspecplot_worker(task)
+#-------------------------------------------------------------------------------------------------------------
+def precompute_GiGz_1Dspecplots(directory,objlist=None,outputfile=None,GiGfile=None,smoothlevel=0.0,
+                                MASTfiles=False,latex=False,Nprocesses=None,clobber=False,verbose=True):
+    """
+    Render the GiGz 1D spectra plots (as saved with the 's' button of GiGz) of all objects in a directory
+    without the GUI using a pool of processes. The plots are saved as
+    directory+cluster+'_'+ID+'_GiGz_1Dspecplot.pdf'.
+
+    -- INPUT --
+    directory         Directory containing the data of the objects (as given to launchgui_z)
+    objlist           List of objects to plot. If 'None' all objects in 'directory' (or in the outputfile if
+                      given) are plotted.
+    outputfile        Output file from GiGz. If given, the by-hand redshifts in the file are used for the
+                      emission lines (the zfit redshifts are used for objects without by-hand redshift).
+    GiGfile           Output from GiG. If given the lines marked in GiG are shown.
+    smoothlevel       Standard deviation of Gauss kernel used to smooth the spectra.
+    MASTfiles         Set to True if the files are named as on MAST
+    latex             Render plotting lables with latex; requires latex compiler.
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    clobber           Overwrite existing plots.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the number of plots created, skipped and failed.
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    Ncreated, Nskipped, Nfailed = vi.precompute_GiGz_1Dspecplots('data/clusterXXXX/',
+                                  outputfile='data/clusterXXXX/testfile_output_GiGz.txt')
+
+    """
+    dirindex = vi.build_dirindex(directory,verbose=verbose)
+
+    zbyhand = {}
+    if outputfile is not None:
+        outdat = np.atleast_1d(np.genfromtxt(outputfile,comments='#',skip_header=2,names=True))
+        for objid, zval in zip(outdat['ID'],outdat['byhandredshift']):
+            if zval != -99: zbyhand[int(objid)] = float(zval) # last entry of object used
+        if objlist is None:
+            objlist = np.unique(outdat['ID'].astype(int))
+    if objlist is None:
+        objlist = sorted(dirindex['objects'].keys())
+
+    if GiGfile is not None:
+        GiGlinewaves = vi.load_GiGcatalog(GiGfile,verbose=verbose)[1]
+
+    tasks    = []
+    Nskipped = 0
+    for objid in objlist:
+        objid = int(objid)
+        if objid not in dirindex['objects']: continue
+        idstr    = str("%.5d" % objid)
+        cluster  = vi.getclusterz(vi.glob_dirindex(dirindex,directory+'*'+idstr+'*')[0])[0]
+        plotname = directory+cluster+'_'+idstr+'_GiGz_1Dspecplot.pdf'
+        if os.path.isfile(plotname) and (not clobber):
+            Nskipped = Nskipped + 1
+            continue
+        keywords = {'redshift':zbyhand.get(objid,None), 'smoothlevel':smoothlevel, 'MASTfiles':MASTfiles,
+                    'latex':latex}
+        if GiGfile is not None:
+            keywords['GiGlinewaves'] = dict([(key,GiGlinewaves[key]) for key in GiGlinewaves.keys()
+                                             if key[0] == objid])
+        tasks.append((directory,objid,plotname,keywords))
+
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Rendering GiGz plots for '+str(len(tasks))+' objects using '+str(Nprocesses)+\
+                      ' processes ('+str(Nskipped)+' existing plots skipped)'
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool    = multiprocessing.Pool(processes=Nprocesses)
+        created = pool.map(vi.render_GiGz_1Dspecplot_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        created = [vi.render_GiGz_1Dspecplot_worker(task) for task in tasks]
+    runtime = time.time()-starttime
+
+    Nfailed  = len([cc for cc in created if cc is None])
+    Ncreated = len(created)-Nfailed
+    if verbose:
+        print ' - Created '+str(Ncreated)+', skipped '+str(Nskipped)+' (existing) and failed '+\
+              str(Nfailed)+' plots in '+str("%.1f" % runtime)+' seconds'
+
+    return Ncreated, Nskipped, Nfailed
+#-------------------------------------------------------------------------------------------------------------
+def linematchedfilter(flux,contsigma=10.0,linesigma=1.5):
+    """
+    Return the S/N of unresolved emission lines along a 1D spectrum: the spectrum is continuum subtracted
+    (Gauss smoothed with contsigma), scaled with the noise from the median absolute deviation and smoothed
+    with linesigma (the matched filter of an unresolved line). Returns None if the noise can not be estimated.
+    """
+    flux  = np.nan_to_num(np.asarray(flux,dtype=np.float64))
+    resid = flux - scipy.ndimage.filters.gaussian_filter1d(flux,contsigma)
+    noise = 1.4826*np.median(np.abs(resid-np.median(resid)))
+    if not (noise > 0): return None
+    return scipy.ndimage.filters.gaussian_filter1d(resid/noise,linesigma)
+#-------------------------------------------------------------------------------------------------------------
+def zscan_spectra(waves,fluxes,linelist=None,zmin=0.0,zmax=15.0,dlnz=0.0005,Ncandidates=5,xscale=1e4,
+                  contsigma=10.0,linesigma=1.5,minsep=0.01):
+    """
+    Scan a fine redshift grid for the redshifts where the emission lines in linelist best match peaks
+    in the 1D spectra of an object (a matched filter of the line list).
+
+    The S/N of lines along each spectrum is obtained with linematchedfilter and then evaluated at the observed wavelengths of all lines for all redshifts in one
+    vectorized interpolation, and the positive S/N is summed over lines and spectra.
+
+    -- INPUT --
+    waves             List of wavelength arrays of the spectra (in units of A/xscale)
+    fluxes            List of flux arrays of the spectra
+    linelist          Rest frame wavelengths [A] of the lines. If None the GiGz lines are used.
+    zmin              Minimum redshift of grid
+    zmax              Maximum redshift of grid
+    dlnz              Step of grid in ln(1+z)
+    Ncandidates       Number of candidate redshifts to return
+    xscale            Scaling of the wavelengths (1e4 for micron)
+    contsigma         Sigma (pixels) of Gauss kernel used to estimate the continuum
+    linesigma         Sigma (pixels) of the Gauss kernel used as line profile
+    minsep            Minimum separation in ln(1+z) between the returned candidates
+
+    -- OUTPUT --
+    zcandidates       Array of candidate redshifts (best first)
+    scores            Array with the score of the candidates
+    """
+    if linelist is None: linelist = vi.GiGz_emissionlines()[0]
+    lnzgrid = np.arange(np.log(1.0+zmin),np.log(1.0+zmax)+dlnz,dlnz)
+    zgrid   = np.exp(lnzgrid)-1.0
+    obswave = np.asarray(linelist)[None,:]*(1.0+zgrid[:,None])/xscale # (Nz,Nlines) observed wavelengths
+
+    score   = np.zeros(len(zgrid))
+    for wave, flux in zip(waves,fluxes):
+        if len(flux) < 3: continue
+        snr     = vi.linematchedfilter(flux,contsigma=contsigma,linesigma=linesigma)
+        if snr is None: continue
+        sampled = np.interp(obswave.ravel(),wave,snr,left=0.0,right=0.0).reshape(obswave.shape)
+        score   = score + np.sum(np.clip(sampled,0.0,None),axis=1)
+
+    # local maxima of score sorted by score, keeping only candidates separated by more than minsep
+    peaks      = np.where((score[1:-1] >= score[:-2]) & (score[1:-1] > score[2:]) & (score[1:-1] > 0))[0]+1
+    peaks      = peaks[np.argsort(score[peaks])[::-1]]
+    candidates = []
+    for peak in peaks:
+        if np.all(np.abs(lnzgrid[candidates]-lnzgrid[peak]) > minsep): candidates.append(peak)
+        if len(candidates) == Ncandidates: break
+
+    return np.round(zgrid[candidates],3), score[candidates]
+#-------------------------------------------------------------------------------------------------------------
+def zscan_object(directory,objid,dirindex=None,MASTfiles=False,Ncandidates=5):
+    """
+    Run zscan_spectra on the 1D spectra of an object (loaded with load_1Dspectrum as in GiGz)
+
+    -- OUTPUT --
+    zcandidates       Array of candidate redshifts (best first)
+    scores            Array with the score of the candidates
+    """
+    fits1D  = vi.find_1Dspectra(directory,str("%.5d" % objid),dirindex=dirindex,MASTfiles=MASTfiles)[0]
+    waves   = []
+    fluxes  = []
+    for f1D in fits1D:
+        if ('G102' in f1D) or ('g102' in f1D):
+            spec1D = vi.load_1Dspectrum(f1D,[7600,11700],[8000,11250])
+        elif ('G141' in f1D) or ('g141' in f1D):
+            spec1D = vi.load_1Dspectrum(f1D,[10500,17000],[8000,11250])
+        else:
+            continue
+        waves.append(spec1D['wave'])
+        fluxes.append(spec1D['flux'])
+    return vi.zscan_spectra(waves,fluxes,Ncandidates=Ncandidates)
+#-------------------------------------------------------------------------------------------------------------
+def zscan_worker(task):
+    """
+    Worker for precompute_zscan(). task = (directory, objid, MASTfiles, Ncandidates)
+    Returns the candidate redshifts and scores or None if the scan failed.
+    """
+    directory, objid, MASTfiles, Ncandidates = task
+    try:
+        result = vi.zscan_object(directory,objid,MASTfiles=MASTfiles,Ncandidates=Ncandidates)
+    except Exception, err:
+        print ' - WARNING Could not scan redshifts of '+str(objid)+' ('+str(err)+')'
+        result = None
+    return result
+#-------------------------------------------------------------------------------------------------------------
+def precompute_zscan(directory,objlist=None,outputfile='DEFAULT',Ncandidates=5,MASTfiles=False,
+                     Nprocesses=None,verbose=True):
+    """
+    Scan the redshifts of all objects in a directory for matches between the GiGz emission lines and peaks in
+    the 1D spectra (see zscan_spectra) using a pool of processes, and write the best candidate redshifts of
+    each object to a table which can be used to preset the redshift slider in GiGz (zscan keyword).
+
+    -- INPUT --
+    directory         Directory containing the data of the objects (as given to launchgui_z)
+    objlist           List of objects to scan. If 'None' all objects in 'directory' are scanned.
+    outputfile        Table to write. 'DEFAULT' gives directory+'GiGz_zscan.txt'
+    Ncandidates       Number of candidate redshifts to store for each object
+    MASTfiles         Set to True if the files are named as on MAST
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the name of the table written
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    zscanfile = vi.precompute_zscan('data/clusterXXXX/',MASTfiles=True)
+    vi.launchgui_z(directory='data/clusterXXXX/',MASTfiles=True,zscan=zscanfile)
+
+    """
+    if outputfile == 'DEFAULT': outputfile = directory+'GiGz_zscan.txt'
+    dirindex = vi.build_dirindex(directory,verbose=verbose)
+    if objlist is None:
+        objlist = sorted(dirindex['objects'].keys())
+    objlist = [int(objid) for objid in objlist]
+
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Scanning redshifts of '+str(len(objlist))+' objects using '+str(Nprocesses)+' processes'
+    tasks     = [(directory,objid,MASTfiles,Ncandidates) for objid in objlist]
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool    = multiprocessing.Pool(processes=Nprocesses)
+        results = pool.map(vi.zscan_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        results = [vi.zscan_worker(task) for task in tasks]
+    if verbose: print ' - Scanned the redshifts in '+str("%.1f" % (time.time()-starttime))+' seconds'
+
+    fout = open(outputfile,'w')
+    fout.write('# Redshift candidates from emission line scan generated with '
+               'visualinspection.precompute_zscan() on '+datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")+'\n')
+    fout.write('# directory = '+directory+'\n')
+    fout.write('# ID '+' '.join(['z_'+str(cc+1)+' score_'+str(cc+1) for cc in xrange(Ncandidates)])+'\n')
+    for objid, result in zip(objlist,results):
+        if result is None: continue
+        outstr = str("%.5d" % objid)
+        for cc in xrange(Ncandidates):
+            if cc < len(result[0]):
+                outstr = outstr+' '+str("%.3f" % result[0][cc])+' '+str("%.2f" % result[1][cc])
+            else:
+                outstr = outstr+' -99 -99'
+        fout.write(outstr+'\n')
+    fout.close()
+    if verbose: print ' - Wrote redshift candidates to '+outputfile
+
+    return outputfile
+#-------------------------------------------------------------------------------------------------------------
+def load_zscan(tablefile,verbose=True):
+    """
+    Load table of redshift candidates generated with precompute_zscan
+
+    -- OUTPUT --
+    Dictionary with object IDs as keys containing lists of (redshift,score) of the candidates (best first)
+    """
+    zscan = {}
+    for line in open(tablefile,'r'):
+        if line.startswith('#') or (line.strip() == ''): continue
+        cols  = line.split()
+        zvals = [float(val) for val in cols[1::2]]
+        svals = [float(val) for val in cols[2::2]]
+        zscan[int(cols[0])] = [(zz,ss) for zz, ss in zip(zvals,svals) if zz != -99]
+    if verbose: print ' - Loaded redshift candidates for '+str(len(zscan))+' objects from '+tablefile
+    return zscan
+#-------------------------------------------------------------------------------------------------------------
+def detectlines_1Dspectrum(fits1D,waverange,snrcut=3.0,contsigma=10.0,linesigma=1.5):
+    """
+    Detect emission line candidates in a 1D spectrum, i.e., peaks in the S/N from linematchedfilter
+    of (FLUX-CONTAM)/SENSITIVITY above snrcut.
+
+    -- INPUT --
+    fits1D            1D spectrum to search
+    waverange         Wavelength range [A] to search
+    snrcut            Minimum S/N of peaks
+    contsigma         Sigma (pixels) of Gauss kernel used to estimate the continuum
+    linesigma         Sigma (pixels) of the Gauss kernel used as line profile
+
+    -- OUTPUT --
+    Npeaks            Number of peaks above snrcut
+    snrmax            Maximum S/N in the spectrum
+    score             Sum of the S/N of the peaks above snrcut
+    wavepeak          Wavelength [A] of the highest peak (-99 if no peaks)
+    """
+    spec1D = vi.load_1Dspectrum(fits1D,waverange,waverange,xscale=1.0)
+    if len(spec1D['flux']) < 3: return 0, -99, 0.0, -99
+    snr    = vi.linematchedfilter(spec1D['flux'],contsigma=contsigma,linesigma=linesigma)
+    if snr is None: return 0, -99, 0.0, -99
+
+    peaks  = np.where((snr[1:-1] >= snr[:-2]) & (snr[1:-1] > snr[2:]) & (snr[1:-1] > snrcut))[0]+1
+    if len(peaks) == 0:
+        return 0, float(np.max(snr)), 0.0, -99
+    return len(peaks), float(np.max(snr)), float(np.sum(snr[peaks])), float(spec1D['wave'][peaks[np.argmax(snr[peaks])]])
+#-------------------------------------------------------------------------------------------------------------
+def detectlines_worker(task):
+    """
+    Worker for precompute_linedetections(). task = (fits1D, waverange, snrcut)
+    Returns the output of detectlines_1Dspectrum or None if it failed.
+    """
+    fits1D, waverange, snrcut = task
+    try:
+        result = vi.detectlines_1Dspectrum(fits1D,waverange,snrcut=snrcut)
+    except Exception, err:
+        print ' - WARNING Could not search '+fits1D+' for emission lines ('+str(err)+')'
+        result = None
+    return result
+#-------------------------------------------------------------------------------------------------------------
+def precompute_linedetections(directory,objlist=None,outputfile='DEFAULT',snrcut=3.0,Nprocesses=None,
+                              verbose=True):
+    """
+    Search all 1D spectra in a directory for emission line candidates (see detectlines_1Dspectrum) using a
+    pool of processes, and write the results for each object, PA and grism to a table. The table can be
+    used to order or filter the objects inspected in GiG (linedetections keyword of launchgui).
+
+    -- INPUT --
+    directory         Directory containing the data of the objects (as given to launchgui)
+    objlist           List of objects to search. If 'None' all objects in 'directory' are searched.
+    outputfile        Table to write. 'DEFAULT' gives directory+'GiG_linedetections.txt'
+    snrcut            Minimum S/N of line candidates
+    Nprocesses        Number of processes to use. If 'None' the number of CPUs is used.
+    verbose           Toggle verbosity.
+
+    -- OUTPUT --
+    Returns the name of the table written
+
+    -- EXAMPLE OF USE --
+    import visualinspection as vi
+    detfile = vi.precompute_linedetections('data/clusterXXXX/')
+    vi.launchgui(directory='data/clusterXXXX/',MASTfiles=True,linedetections=detfile)
+
+    """
+    if outputfile == 'DEFAULT': outputfile = directory+'GiG_linedetections.txt'
+    dirindex = vi.build_dirindex(directory,verbose=verbose)
+    if objlist is None:
+        objlist = sorted(dirindex['objects'].keys())
+
+    waveranges = {'G102':[8000,11250], 'G141':[11000,16500]}
+    entries    = []
+    for objid in objlist:
+        if int(objid) not in dirindex['objects']: continue
+        PAdic = dirindex['objects'][int(objid)]['PAs']
+        for PA in sorted(PAdic.keys()):
+            for grism in sorted(PAdic[PA].keys()):
+                if ('1Dfits' in PAdic[PA][grism]) and (grism in waveranges):
+                    entries.append((int(objid),PA,grism,PAdic[PA][grism]['1Dfits']))
+
+    if Nprocesses is None: Nprocesses = multiprocessing.cpu_count()
+    if verbose: print ' - Searching '+str(len(entries))+' 1D spectra for emission lines using '+\
+                      str(Nprocesses)+' processes'
+    tasks     = [(entry[3],waveranges[entry[2]],snrcut) for entry in entries]
+    starttime = time.time()
+    if Nprocesses > 1:
+        pool    = multiprocessing.Pool(processes=Nprocesses)
+        results = pool.map(vi.detectlines_worker,tasks,chunksize=max(1,len(tasks)/(4*Nprocesses)))
+        pool.close()
+        pool.join()
+    else:
+        results = [vi.detectlines_worker(task) for task in tasks]
+    if verbose: print ' - Searched the spectra in '+str("%.1f" % (time.time()-starttime))+' seconds'
+
+    fout = open(outputfile,'w')
+    fout.write('# Emission line candidates generated with visualinspection.precompute_linedetections() on '+
+               datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")+'\n')
+    fout.write('# directory = '+directory+'\n')
+    fout.write('# snrcut = '+str(snrcut)+'\n')
+    fout.write('# ID PA grism Npeaks snrmax score wavepeak\n')
+    for entry, result in zip(entries,results):
+        if result is None: continue
+        fout.write(str("%.5d" % entry[0])+' '+str("%.3d" % entry[1])+' '+entry[2]+' '+str(result[0])+' '+
+                   str("%.2f" % result[1])+' '+str("%.2f" % result[2])+' '+str("%.1f" % result[3])+'\n')
+    fout.close()
+    if verbose: print ' - Wrote emission line candidates to '+outputfile
+
+    return outputfile
+#-------------------------------------------------------------------------------------------------------------
+def load_linedetections(tablefile,verbose=True):
+    """
+    Load table of emission line candidates generated with precompute_linedetections
+
+    -- OUTPUT --
+    objscores         Dictionary with the score of each object ID (the highest score of its PAs and grisms)
+    detections        Dictionary with keys (ID,PA,grism) containing [Npeaks,snrmax,score,wavepeak]
+    """
+    objscores  = {}
+    detections = {}
+    for line in open(tablefile,'r'):
+        if line.startswith('#') or (line.strip() == ''): continue
+        cols  = line.split()
+        objid = int(cols[0])
+        detections[(objid,int(cols[1]),cols[2])] = [int(cols[3]),float(cols[4]),float(cols[5]),float(cols[6])]
+        objscores[objid] = max(objscores.get(objid,0.0),float(cols[5]))
+    if verbose: print ' - Loaded emission line candidates of '+str(len(objscores))+' objects from '+tablefile
+    return objscores, detections
+#-------------------------------------------------------------------------------------------------------------
+def gaussiansmooth_ladder(flux,sigmas,truncate=4.0):
+    """
+    Gauss smooth a spectrum with a whole set of smoothing levels in one batched FFT convolution.
+    Reproduces scipy.ndimage.filters.gaussian_filter1d(flux,sigma) (mode='reflect', truncate=4.0)
+    for each of the sigmas.
+
+    -- INPUT --
+    flux              1D array to smooth
+    sigmas            List of standard deviations (in pixels) of the Gaussian kernels
+    truncate          Truncate the kernels at this many standard deviations
+
+    -- OUTPUT --
+    Array of shape (len(sigmas),len(flux)) with the smoothed spectra (same dtype as flux)
+    """
+    flux    = np.asarray(flux)
+    sigmas  = np.atleast_1d(np.asarray(sigmas,dtype=np.float64))
+    Npix    = len(flux)
+    radii   = (truncate*sigmas+0.5).astype(int)
+    rmax    = int(np.max(radii))
+    if (Npix == 0) or (rmax == 0):
+        return np.repeat(flux[None,:],len(sigmas),axis=0)
+
+    # kernels normalized within their own radius and zero beyond it
+    xx      = np.arange(-rmax,rmax+1,dtype=np.float64)
+    sigsafe = np.where(sigmas > 0,sigmas,1.0)
+    kernels = np.exp(-0.5*(xx[None,:]/sigsafe[:,None])**2)
+    kernels[np.abs(xx)[None,:] > radii[:,None]] = 0.0
+    kernels = kernels/np.sum(kernels,axis=1)[:,None]
+
+    padded  = np.pad(flux.astype(np.float64),rmax,mode='symmetric') # = 'reflect' mode of scipy.ndimage
+    Nfft    = 1
+    while Nfft < len(padded)+2*rmax: Nfft = Nfft*2
+    conv    = np.fft.irfft(np.fft.rfft(kernels,Nfft,axis=1)*np.fft.rfft(padded,Nfft)[None,:],Nfft,axis=1)
+
+    return conv[:,2*rmax:2*rmax+Npix].astype(flux.dtype)
+#-------------------------------------------------------------------------------------------------------------
+class ByteLRUCache(object):
+    """
+    Least recently used cache with the memory used by the cached values bounded by maxMB.
+    The size in bytes of each value is given when storing it. Base class of vi.SmoothCache and
+    vi.PhotoImageCache which add how the values are created.
+    """
+    cachename = 'ByteLRUCache' # name and unit used by report()
+    itemname  = 'entries'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,maxMB=20.0,verbose=False):
+        """
+        Setup the cache
+
+        -- INPUT --
+        maxMB             Maximum memory in MB used by the cached values.
+        verbose           Toggle verbosity.
+        """
+        self.vb       = verbose
+        self.maxbytes = maxMB*1e6
+        self.entries  = collections.OrderedDict() # key -> [value,bytes]
+        self.Nbytes   = 0
+        self.Nhits    = 0
+        self.Nmisses  = 0
+        self.Ndropped = 0
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __contains__(self,key):
+        return key in self.entries
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def lookup(self,key):
+        """
+        Return the cached value of key marking it as most recently used, or None if not cached.
+        Counts as a hit or a miss.
+        """
+        if key in self.entries:
+            self.Nhits = self.Nhits + 1
+            entry      = self.entries.pop(key)
+            self.entries[key] = entry # move to the most recently used end
+            return entry[0]
+        self.Nmisses = self.Nmisses + 1
+        return None
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def store(self,key,value,Nbytes):
+        """
+        Store value dropping the least recently used ones if above the memory limit
+        """
+        if key in self.entries: self.Nbytes = self.Nbytes - self.entries.pop(key)[1]
+        self.entries[key] = [value,Nbytes]
+        self.Nbytes       = self.Nbytes + Nbytes
+        while (self.Nbytes > self.maxbytes) & (len(self.entries) > 1):
+            dropkey, dropped = self.entries.popitem(last=False)
+            self.Nbytes      = self.Nbytes - dropped[1]
+            self.Ndropped    = self.Ndropped + 1
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def stats(self):
+        """
+        Return dictionary with the counters of the cache (for monitoring)
+        """
+        return {'Nentries':len(self.entries),'Nbytes':self.Nbytes,'maxbytes':self.maxbytes,
+                'Nhits':self.Nhits,'Nmisses':self.Nmisses,'Ndropped':self.Ndropped}
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def report(self):
+        """
+        Return string summarizing the content and use of the cache
+        """
+        return ' - '+self.cachename+': '+str(len(self.entries))+' '+self.itemname+' using '+\
+               str("%.2f" % (self.Nbytes/1e6))+' of '+str("%.1f" % (self.maxbytes/1e6))+' MB ('+\
+               str(self.Nhits)+' hits, '+str(self.Nmisses)+' misses, '+str(self.Ndropped)+' dropped)'
 #-------------------------------------------------------------------------------------------------------------
-def get_objinfo(infofile,objid,cluster):
+class SmoothCache(ByteLRUCache):
     """
-    Return information on object given an input file
+    Least recently used cache of Gauss smoothed spectra keyed on (spectrum name, smoothing level).
+    The memory used by the cached arrays is bounded by maxMB.
     """
-    if infofile == None:
-        returndat = None
-    else:
-        infodat = np.genfromtxt(infofile,dtype=None,names=True,skip_header=0,comments='#')
-        objent  = np.where((infodat['id'] == int(objid)) & (infodat['cluster'] == cluster))[0]
+    cachename = 'SmoothCache'
+    itemname  = 'smoothed spectra'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,maxMB=50.0,ladder=0,ladderstep=0.1,sigmamax=10.0,verbose=False):
+        """
+        Setup the cache
 
-        if len(objent) == 0:
-            returndat = None
+        -- INPUT --
+        maxMB             Maximum memory in MB used by the cached spectra.
+        ladder            When a smoothing level is not cached, also smooth the spectrum with the 'ladder'
+                          levels on each side of it (in steps of ladderstep) in one batched computation
+                          with vi.gaussiansmooth_ladder. Set to 0 to only smooth the requested level.
+        ladderstep        Step between the smoothing levels of the ladder.
+        sigmamax          Maximum smoothing level to include in the ladder.
+        verbose           Toggle verbosity.
+        """
+        ByteLRUCache.__init__(self,maxMB=maxMB,verbose=verbose) # (name,sigma) -> smoothed spectrum
+        self.ladder     = ladder
+        self.ladderstep = ladderstep
+        self.sigmamax   = sigmamax
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def get(self,name,flux,sigma):
+        """
+        Return flux of the spectrum 'name' Gauss smoothed with sigma, smoothing it if not cached
+        """
+        sigma  = round(float(sigma),3)
+        key    = (name,sigma)
+        smooth = self.lookup(key)
+        if smooth is not None: return smooth
+
+        if self.ladder > 0:
+            steps  = np.arange(-self.ladder,self.ladder+1)*self.ladderstep
+            levels = np.unique(np.clip(sigma+steps,0.0,max(self.sigmamax,sigma)))
+            levels = [round(float(sig),3) for sig in levels]
+            sigmas = [sigma]+[sig for sig in levels if (sig != sigma) & ((name,sig) not in self)]
+            ladder = vi.gaussiansmooth_ladder(flux,sigmas)
+            for ss in xrange(1,len(sigmas)):
+                self.store((name,sigmas[ss]),ladder[ss].copy())
+            smooth = ladder[0].copy()
         else:
-            returndat = infodat[objent]
-
-    return returndat
+            smooth = scipy.ndimage.filters.gaussian_filter1d(flux,sigma,cval=0.0)
+        self.store(key,smooth)
+        return smooth
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def store(self,key,smooth):
+        """
+        Store smoothed spectrum dropping the least recently used ones if above the memory limit
+        """
+        ByteLRUCache.store(self,key,smooth,smooth.nbytes)
 #-------------------------------------------------------------------------------------------------------------
-def check_idlist(idlist,dir,verbose=True):
+class PhotoImageCache(ByteLRUCache):
     """
-    Checking if pngs exist for objects in idlist.
-    Returning list of ids with existing files
+    Least recently used cache of decoded and resized Tk PhotoImages keyed on (image name, size, modification time).
+    The memory used by the cached images is bounded by maxMB.
+    The PhotoImages have to be created in the thread running the Tk mainloop, i.e., by the GUI itself.
     """
-    if verbose: print ' - Checking ID list to make sure data for objects exists'
-    goodids = np.array([])
-    for objid in idlist:
-        idstr = str("%.5d" % objid)
-        pngs  = glob.glob(dir+'*_'+idstr+'*2D.png')
-        if len(pngs) > 0:
-            goodids = np.append(goodids,objid)
+    cachename = 'PhotoImageCache'
+    itemname  = 'images'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def __init__(self,maxMB=20.0,thumbcache=None,verbose=False):
+        """
+        Setup the cache
 
-    if (len(goodids) == 0):
-        if verbose: print ' - WARNING None of the IDs have data in dir=\n   '+dir
+        -- INPUT --
+        maxMB             Maximum memory in MB used by the cached images (estimated as 4 bytes per pixel
+                          as that is what Tk keeps for each PhotoImage).
+        thumbcache        vi.ThumbnailCache to read/store the resized images in (passed to loadGUIimage)
+        verbose           Toggle verbosity.
+        """
+        ByteLRUCache.__init__(self,maxMB=maxMB,verbose=verbose) # (imgname,size,mtime) -> PhotoImage
+        self.thumbcache = thumbcache
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def get(self,imgname,size,prefetcher=None):
+        """
+        Return PhotoImage of imgname resized to size=(xsize,ysize), loading it with vi.loadGUIimage if not cached.
+        If a vi.ImagePrefetcher is provided the image is taken from that instead.
+        """
+        size  = tuple(size)
+        key   = (imgname,size,os.path.getmtime(imgname))
+        photo = self.lookup(key)
+        if photo is not None: return photo
 
-    return goodids
+        if prefetcher is not None:
+            img = prefetcher.get(imgname,size)
+        else:
+            img = vi.loadGUIimage(imgname,size,thumbcache=self.thumbcache)
+        photo        = ImageTk.PhotoImage(img)
+        self.store(key,photo,img.size[0]*img.size[1]*4)
+        return photo
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def iscached(self,imgname,size):
+        """
+        Return True if the PhotoImage of imgname with the given size is in the cache
+        """
+        return (imgname,tuple(size),os.path.getmtime(imgname)) in self
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def add(self,imgname,size,img):
+        """
+        Add PIL image already decoded and resized elsewhere (e.g. by vi.ImagePrefetcher) to the cache.
+        Does not count as a hit or miss.
+        """
+        key = (imgname,tuple(size),os.path.getmtime(imgname))
+        if key in self: return
+        self.store(key,ImageTk.PhotoImage(img),img.size[0]*img.size[1]*4)
 #-------------------------------------------------------------------------------------------------------------
 class Application(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def __init__(self,dir,outfile,master=None,objlist=None,verbose=True,iname='John Doe',
                  ACSinspection=False,clobber=False,ds9xpa=False,openfitsauto=False,
                  inGUIimage='zfit',check4duplicates=False,outputcheck=False,skipempty=False,
-                 MASTfiles=False):
+                 MASTfiles=False,prefetch=0,specmetrics=None,ds9banks=False,outputsync='flush',
+                 skipinspected=False,linedetections=None,linedetectionsort=True,linedetectionmin=None,
+                 thumbcache=None,thumbcacheMB=200.0):
         """
         Intitialize the GUI
 
@@ -315,6 +2628,33 @@ class Application(Frame):
         skipempty         Set to True to ignore unedited objects when writing to output file.
                           Hence, if skipempty = True objects with no comments, flags set or sliders changed
                           will be written to the output
+        prefetch          Number of upcoming objects in objlist for which the in-GUI image is decoded and
+                          resized in the background by a pool of worker threads. Moving to the next object
+                          then only requires swapping in the prepared image. Set to 0 to disable.
+        specmetrics       Table of spectral coverage and contamination levels generated with
+                          vi.precompute_specmetrics() to look up values in when saving objects instead
+                          of estimating them from the FITS files. Use 'DEFAULT' for the table with the
+                          default name in 'dir'. If None (or the table does not match the estimators used)
+                          the values are estimated on the fly.
+        ds9banks          Only used if ds9xpa=True. Keep two banks of frames in the DS9 window. While an
+                          object is inspected the fits files of the next object in objlist are loaded into
+                          the hidden bank, which is swapped in when the fits files of that object are opened.
+        outputsync        How the output is made persistent after each saved object: 'flush' (default) to
+                          the operating system, 'fsync' to disk or 'none' (written when quitting).
+                          See vi.OutputJournal for details.
+        skipinspected     When appending to an existing output file, skip all objects already in the file
+                          instead of resuming after the last object in the file.
+        linedetections    Table of emission line candidates generated with vi.precompute_linedetections().
+                          Use 'DEFAULT' for the table with the default name in 'dir'. If provided the objects
+                          are ordered and/or filtered on their detection score (highest score of PAs and grisms)
+        linedetectionsort Inspect the objects with the highest detection score first (ties keep the ID order)
+        linedetectionmin  Only inspect objects with a detection score of at least linedetectionmin.
+                          Objects not in the linedetections table have a score of 0.
+        thumbcache        Directory of the on-disk cache of in-GUI images resized to the display size
+                          (see vi.ThumbnailCache) so each image is only resampled once across sessions.
+                          Use 'DEFAULT' for vi.thumbcache_defaultdir(). If None no thumbnail cache is used.
+                          The cache can be filled beforehand with vi.precompute_thumbnails().
+        thumbcacheMB      Maximum size in MB of the thumbnail cache directory.
         """
         pp    = subprocess.Popen('ds9 -version',shell=True,executable=os.environ["SHELL"],stdout=subprocess.PIPE)
         ppout = pp.communicate()[0]
@@ -325,24 +2665,55 @@ class Application(Frame):
         self.dir        = dir
         self.ds9open    = False # set ds9 indicator (used for ds9xpa = False)
         self.ds9windowopen = False # set ds9 indicator (used for ds9xpa = True)
+        self.ds9starting   = False # DS9 launched but not yet answering XPA requests (ds9xpa = True)
         self.ACSins     = ACSinspection
         self.quitting   = False
+        self.procs      = vi.ProcessManager(verbose=verbose) # keeps track of png and DS9 windows
+        self.ds9batch   = vi.DS9XPABatch(verbose=verbose)    # sends XPA commands to DS9
         self.xpa        = ds9xpa # check if user indacetd that xpa was available for ds9
         self.inGUIimage = inGUIimage
         self.duplicates = check4duplicates
         self.fitsauto   = openfitsauto # Open fits files automatically?
         self.outcheck   = outputcheck
         self.skipempty  = skipempty
+        self.outputsync = outputsync
+        self.skipinspected = skipinspected
         self.MASTfiles  = MASTfiles
+        self.prefetch   = prefetch
+        self.thumbcache = None
+        if thumbcache is not None:
+            if thumbcache == 'DEFAULT': thumbcache = vi.thumbcache_defaultdir()
+            self.thumbcache = vi.ThumbnailCache(thumbcache,maxMB=thumbcacheMB,verbose=self.vb)
         if self.xpa:
             #sys.exit(' - XPA DS9 controls not enabled yet; still under construction (use ds9xpa=False)')
             self.ds9windowopen = False
 
+        self.ds9banks    = ds9banks    # double-buffered DS9 frames (only with ds9xpa = True)
+        self.ds9banksize = 17          # number of DS9 frames per object/bank
+        self.ds9bank     = 0           # bank currently shown
+        self.ds9bankobj  = [None,None] # objects loaded into the banks
+        if self.ds9banks & (not self.xpa):
+            print ' - WARNING ds9banks=True requires ds9xpa=True; not using frame banks'
+            self.ds9banks = False
+
         if os.path.exists(self.dir):
             self.twodfits = glob.glob(self.dir)
         else:
             sys.exit(' - The directory '+self.dir+' does not exist --> ABORTING')
 
+        self.dirindex = vi.build_dirindex(self.dir,verbose=self.vb) # index of files to avoid globbing the dir
+
+        # -------- LOAD PRECOMPUTED SPECTRAL METRICS --------
+        self.specmetrics      = None
+        self.specmetricssetup = None
+        if specmetrics is not None:
+            if specmetrics == 'DEFAULT':
+                specmetrics = self.dir+'GiG_specmetrics.txt'
+            if os.path.isfile(specmetrics):
+                self.specmetrics, self.specmetricssetup = vi.load_specmetrics(specmetrics,verbose=self.vb)
+            else:
+                print ' - WARNING The table '+specmetrics+' does not exist; estimating metrics on the fly'
+
         # -------- GET OBJIDS --------
         if objlist == None:
             if self.MASTfiles:
@@ -352,7 +2723,8 @@ class Application(Frame):
                 searchext = '.2D.png'
                 cutent    = [-17,-12]
 
-            self.file_2Dpng = [f for f in glob.glob(self.dir+'*'+searchext) if 'zfit' not in f]
+            self.file_2Dpng = [f for f in vi.glob_dirindex(self.dirindex,self.dir+'*'+searchext)
+                               if 'zfit' not in f]
             self.objlist    = np.asarray([int(self.file_2Dpng[jj][cutent[0]:cutent[1]])
                                           for jj in xrange(len(self.file_2Dpng))])
             self.objlist    = np.unique(self.objlist)
@@ -362,7 +2734,25 @@ class Application(Frame):
             else:
                 self.objlist = np.asarray(objlist)
 
-            self.objlist = vi.check_idlist(self.objlist,self.dir,verbose=self.vb) # check objects exist in dir
+            self.objlist = vi.check_idlist(self.objlist,self.dir,verbose=self.vb,
+                                           dirindex=self.dirindex) # check objects exist in dir
+
+        # -------- ORDER/FILTER OBJIDS ON EMISSION LINE DETECTIONS --------
+        if linedetections is not None:
+            if linedetections == 'DEFAULT':
+                linedetections = self.dir+'GiG_linedetections.txt'
+            if os.path.isfile(linedetections):
+                objscores = vi.load_linedetections(linedetections,verbose=self.vb)[0]
+                scores    = np.asarray([objscores.get(int(objid),0.0) for objid in self.objlist])
+                if linedetectionmin is not None:
+                    self.objlist = self.objlist[scores >= linedetectionmin]
+                    scores       = scores[scores >= linedetectionmin]
+                    if verbose: print ' - '+str(len(self.objlist))+' objects have a line detection score >= '+\
+                                      str(linedetectionmin)
+                if linedetectionsort:
+                    self.objlist = self.objlist[np.argsort(-scores,kind='mergesort')]
+            else:
+                print ' - WARNING The table '+linedetections+' does not exist; not using line detections'
 
         if len(self.objlist) == 0:
             sys.exit('  No valid IDs found \n            Forgot a forward slash after the objdir? \n            Running on MAST files? Then use MASTfiles = True')
@@ -371,7 +2761,7 @@ class Application(Frame):
         if verbose: print " - Found "+str(len(self.objlist))+' objects to inspect'
         # -------- Get version of MAST data release (assuming all the same) --------
         if self.MASTfiles:
-            self.MASTversion = glob.glob(self.dir+'*_2d.png')[0][-11:-7]
+            self.MASTversion = vi.glob_dirindex(self.dirindex,self.dir+'*_2d.png')[0][-11:-7]
         else:
             self.MASTversion = 'None'
 
@@ -383,7 +2773,7 @@ class Application(Frame):
                 searchext = '_1d.png'
             else:
                 searchext = '1D.png'
-            PAobj  = len(glob.glob(self.dir+'*'+idstr+'*'+searchext))/2. # divide by two to account for grisms
+            PAobj  = len(vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*'+searchext))/2. # 2 grisms per PA
             allPAs.append(PAobj)
         self.Npamax = np.max(allPAs)
         if verbose: print ' - The maximum number of PAs in the objlist was ',self.Npamax
@@ -401,19 +2791,24 @@ class Application(Frame):
 
         if os.path.isfile(outfile):
             newfile   = False
-            self.fout = open(outfile,'r')                # open existing file
-            IDinspected = np.array([])                  # array to contain IDs in file
-            for line in self.fout.readlines():           # loop through file to last line
-                lsplit = line.split()
-                if lsplit[0] != '#':
-                    IDinspected = np.append(IDinspected,float(lsplit[0]))
+            self.fout = vi.OutputJournal(outfile,mode='a',sync=self.outputsync,verbose=self.vb) # indexes file
+            IDinspected = set([int(key[0]) for key in self.fout.Nrecords.keys()]) # IDs in file
             if len(IDinspected) == 0:
                 sys.exit('Found no inspected objects in '+outfile)
-            lastline = line
-            self.fout.close()
 
-            lastID = lastline.split()[0]                     # get the last ID in file
-            if lastID != '#':
+            lastID = self.fout.lastline.split()[0]           # get the last ID in file
+            if self.skipinspected:
+                if self.vb: print ' - The file '+outfile+' already exists (Skipping all objects in output)'
+                notinspected = np.asarray([int(objid) not in IDinspected for objid in self.objlist])
+                if not np.any(notinspected):
+                    sys.exit(' - All objects in "objlist" are already in the outputfile --> ABORTING ')
+                self.objlist    = self.objlist[notinspected]
+                self.currentobj = self.objlist[0]            # change first id to look at
+                if self.vb:
+                    print ' - Info from existing output: '
+                    print '   '+str(len(self.objlist))+' of '+str(len(notinspected))+' IDs still need to be expected'
+                    print '   Found '+str(len(IDinspected))+' IDs already inspected in file'
+            elif lastID != '#':
                 objent = np.where(self.objlist == float(lastID))[0]
                 if self.vb: print ' - The file '+outfile+' already exists (Resuming after last objects in output)'
                 try:
@@ -421,17 +2816,16 @@ class Application(Frame):
                 except:
                     sys.exit(' - The last object in the outputfile is the last in "objlist" --> ABORTING ')
                 Nremaining = len(self.objlist[objent+1:])
-                Ninspected = len(np.unique(np.sort(IDinspected)))
+                Ninspected = len(IDinspected)
                 if self.vb:
                     print ' - Info from existing output: '
                     print '   '+str(Nremaining)+' of '+str(len(self.objlist))+' IDs still need to be expected'
                     print '   Found '+str(Ninspected)+' IDs already inspected in file'
             else:
                 if self.vb: print ' - The file '+outfile+' already exists (append as last row does not contain ID)'
-            self.fout     = open(outfile,'a')
         else:
             if self.vb: print ' - The file '+outfile+' was created (did not exist)'
-            self.fout     = open(outfile,'w')
+            self.fout     = vi.OutputJournal(outfile,mode='w',sync=self.outputsync,verbose=self.vb)
             self.fout.write('# Results from Visual Inspection initiated on '+self.now+' \n')
             self.fout.write('# Inspector: '+iname+' \n')
             newfile = True
@@ -453,9 +2847,17 @@ class Application(Frame):
 
         # -------- ADD IMAGE WINDOW --------
         self.imgx,self.imgy = 990, 200
-        img = ImageTk.PhotoImage(Image.open(self.GUIimage).resize((self.imgx,self.imgy),Image.ANTIALIAS))
+        img = ImageTk.PhotoImage(vi.loadGUIimage(self.GUIimage,(self.imgx,self.imgy),thumbcache=self.thumbcache))
         self.imageframe = Label(master, image=img)
         self.imageframe.image = img
+        self.prefetcher       = None
+        self.prefetchphotos   = {}   # PhotoImages of upcoming objects prepared while GUI is idle
+        self.prefetchupcoming = []
+        self.prefetchafter    = None
+        if self.prefetch > 0:
+            self.prefetcher = vi.ImagePrefetcher(Nworkers=2,Nkeep=2*self.prefetch+2,
+                                                 thumbcache=self.thumbcache,verbose=self.vb)
+            self.prefetchimages()
         self.imageframe.grid(row = 100, column = 0, columnspan = 1, sticky=S)
 
         # -------- DRAW SEPERATORS --------
@@ -829,6 +3231,53 @@ class Application(Frame):
         self.comments2 = Entry(self)
         self.comments2.grid(row=position[0],column=position[1]+position[2],columnspan=position[2],sticky=W)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def getpngs(self,objid):
+        """
+        Return the pngs of an object, the pngs ordered for display and the image to show in the GUI
+        """
+        idstr     = str("%05d" % objid)
+        pngs      = vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*.png')+\
+                    vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*.pdf')
+
+        # order the pngs to display
+        if self.MASTfiles:
+            G102_1D = [name for name in pngs if "g102_"+self.MASTversion+"_1d.png" in name]
+            G102_2D = [name for name in pngs if "g102_"+self.MASTversion+"_2d.png" in name]
+            G141_1D = [name for name in pngs if "g141_"+self.MASTversion+"_1d.png" in name]
+            G141_2D = [name for name in pngs if "g141_"+self.MASTversion+"_2d.png" in name]
+            G800_1D = [name for name in pngs if "g800l_"+self.MASTversion+"_1d.png" in name]
+            G800_2D = [name for name in pngs if "g800l_"+self.MASTversion+"_2d.png" in name]
+        else:
+            G102_1D = [name for name in pngs if "G102.1D.png" in name]
+            G102_2D = [name for name in pngs if "G102.2D.png" in name]
+            G141_1D = [name for name in pngs if "G141.1D.png" in name]
+            G141_2D = [name for name in pngs if "G141.2D.png" in name]
+            G800_1D = [name for name in pngs if "G800L.1D.png" in name]
+            G800_2D = [name for name in pngs if "G800L.2D.png" in name]
+
+        zfit    = [name for name in pngs if "zfit" in name]
+        stack   = [name for name in pngs if "stack" in name]
+        mosaic  = [name for name in pngs if "mosaic" in name]
+        pngorderedlist = G102_1D + G102_2D + G141_1D + G141_2D + G800_1D + G800_2D + zfit + stack + mosaic
+        remaining      = list(set(pngs) - set(pngorderedlist)) # get files not accounted for above
+        pngorderedlist = pngorderedlist #+ remaining
+
+        # Get the in-GUI image
+        GUIimage = None
+        for png in pngs:
+            if (self.inGUIimage == 'zfit') & ('zfitplot.png' in png):
+                GUIimage  = png
+            if (self.inGUIimage == 'G102stack') & \
+                    (('G102_stack.png' in png) or ('g102_'+self.MASTversion+'_2dstack.png' in png)):
+                GUIimage  = png
+            if (self.inGUIimage == 'G141stack') & \
+                    (('G141_stack.png' in png) or ('g141_'+self.MASTversion+'_2dstack.png' in png)):
+                GUIimage  = png
+        if (GUIimage == None) & (len(pngorderedlist) > 0):  # if requested image not found use first png instead
+            GUIimage = pngorderedlist[0]
+
+        return pngs, pngorderedlist, GUIimage
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openpngs(self,objid=None):
         """
         Function to open pngs of object
@@ -838,36 +3287,13 @@ class Application(Frame):
         else:
             id = objid
         idstr     = str("%05d" % id)
-        self.pngs = glob.glob(self.dir+'*'+idstr+'*.png')+glob.glob(self.dir+'*'+idstr+'*.pdf')
+        self.pngs, pngorderedlist, self.GUIimage = self.getpngs(id)
         if len(self.pngs) == 0:
             sys.exit(' - Did not find any png files to open. Looked for '+
                      self.dir+'*'+idstr+'*.png  --> ABORTING')
 
         self.file = self.pngs[0].split('/')[-1]
 
-        # order the pngs to display
-        if self.MASTfiles:
-            G102_1D = [name for name in self.pngs if "g102_"+self.MASTversion+"_1d.png" in name]
-            G102_2D = [name for name in self.pngs if "g102_"+self.MASTversion+"_2d.png" in name]
-            G141_1D = [name for name in self.pngs if "g141_"+self.MASTversion+"_1d.png" in name]
-            G141_2D = [name for name in self.pngs if "g141_"+self.MASTversion+"_2d.png" in name]
-            G800_1D = [name for name in self.pngs if "g800l_"+self.MASTversion+"_1d.png" in name]
-            G800_2D = [name for name in self.pngs if "g800l_"+self.MASTversion+"_2d.png" in name]
-        else:
-            G102_1D = [name for name in self.pngs if "G102.1D.png" in name]
-            G102_2D = [name for name in self.pngs if "G102.2D.png" in name]
-            G141_1D = [name for name in self.pngs if "G141.1D.png" in name]
-            G141_2D = [name for name in self.pngs if "G141.2D.png" in name]
-            G800_1D = [name for name in self.pngs if "G800L.1D.png" in name]
-            G800_2D = [name for name in self.pngs if "G800L.2D.png" in name]
-
-        zfit    = [name for name in self.pngs if "zfit" in name]
-        stack   = [name for name in self.pngs if "stack" in name]
-        mosaic  = [name for name in self.pngs if "mosaic" in name]
-        pngorderedlist = G102_1D + G102_2D + G141_1D + G141_2D + G800_1D + G800_2D + zfit + stack + mosaic
-        remaining      = list(set(self.pngs) - set(pngorderedlist)) # get files not accounted for above
-        pngorderedlist = pngorderedlist #+ remaining
-
         self.plat = sys.platform
         if self.plat == 'darwin':
             import platform
@@ -879,44 +3305,35 @@ class Application(Frame):
         elif self.plat == 'linux2' or 'Linux':
             opencmd = 'gthumb '+' '.join(pngorderedlist)+' &'
 
-        # Update the in-GUI image
-        self.GUIimage = None
-        for png in self.pngs:
-            if (self.inGUIimage == 'zfit') & ('zfitplot.png' in png):
-                self.GUIimage  = png
-            if (self.inGUIimage == 'G102stack') & \
-                    (('G102_stack.png' in png) or ('g102_'+self.MASTversion+'_2dstack.png' in png)):
-                self.GUIimage  = png
-            if (self.inGUIimage == 'G141stack') & \
-                    (('G141_stack.png' in png) or ('g141_'+self.MASTversion+'_2dstack.png' in png)):
-                self.GUIimage  = png
-        if self.GUIimage == None:  # if requested image not found for object use first png figure instead
-            self.GUIimage = pngorderedlist[0]
-
         # Getting number of PAs for current object
+        self.PAs  = self.getPAs(id)
+        self.Npa  = len(self.PAs)
+        if self.plat == 'darwin': # Preview.app is not started as a child of 'open'; found when closing
+            self.pPNG = self.procs.start('png',opencmd,detachedsearch='Preview.app')
+        else:
+            self.pPNG = self.procs.start('png',opencmd)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def getPAs(self,objid):
+        """
+        Return the sorted PAs available for the object
+        """
+        idstr = str("%05d" % objid)
         if self.MASTfiles:
             searchext = '_1d.png'
         else:
             searchext = '.1D.png'
-        twodpng    = glob.glob(self.dir+'*'+idstr+'*'+searchext)
-        self.PAs = np.zeros(len(twodpng))
-        for ii in xrange(len(self.PAs)):
+        twodpng = vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*'+searchext)
+        PAs     = np.zeros(len(twodpng))
+        for ii in xrange(len(PAs)):
             if self.MASTfiles:
                 namesplit = os.path.basename(twodpng[ii]).split('-pa')
-                self.PAs[ii] = namesplit[-1][:3]
+                PAs[ii] = namesplit[-1][:3]
             else:
                 namesplit = os.path.basename(twodpng[ii]).split('-')
-                self.PAs[ii] = int(namesplit[1])
+                PAs[ii] = int(namesplit[1])
                 if namesplit[0] in ['MACS0416.1','MACS2129.4','RXJ1347.5']: # case of names with negative dec
-                    self.PAs[ii] = int(namesplit[2])
-        self.PAs  = np.sort(np.unique(self.PAs)) # Make sure the PAs are sorted
-        self.Npa  = len(self.PAs)
-        self.pPNG = subprocess.Popen(opencmd,shell=True,executable=os.environ["SHELL"])
-        time.sleep(1.1)# sleep to make sure png appear in PIDlist
-        if self.plat == 'darwin':
-            self.pngPID = vi.getPID('Preview.app',verbose=False) # get PID of png process
-        elif self.plat == 'linux2' or 'Linux':
-            self.pngPID = vi.getPID('gthumb',verbose=False)      # get PID of png process
+                    PAs[ii] = int(namesplit[2])
+        return np.sort(np.unique(PAs)) # Make sure the PAs are sorted
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openfits_but(self,position):
         """
@@ -940,66 +3357,166 @@ class Application(Frame):
         lockstr = self.lockds9string()
         ds9cmd  = ' '
 
-        if not self.ds9windowopen:
+        if self.ds9starting:
+            if self.vb: print ' - DS9 is still starting up; the fits files are loaded once it is ready'
+        elif not self.ds9windowopen:
             ds9cmd = ds9cmd+'ds9 -geometry 1200x600 -scale zscale '+\
                      lockstr+' -tile grid layout 4 '+str(2*int(self.Npamax))
-            self.pds9   = subprocess.Popen(ds9cmd,shell=True,executable=os.environ["SHELL"])
-            time.sleep(1.1)# sleep to make sure ds9 appear in PIDlist
-            self.ds9PID = vi.getPID('ds9',verbose=False) # get PID of DS9 process
-            self.ds9windowopen = True
-            time.sleep(1.0)
-            for ii in np.arange(1,17):
-                out = commands.getoutput('xpaset -p ds9 frame new')
-            out = commands.getoutput('xpaset -p ds9 tile')
-
-        Fstart = 1
-        for PA in self.PAs:
+            Nbanks = 1
+            if self.ds9banks: Nbanks = 2
+            for ii in np.arange(1,self.ds9banksize*Nbanks):
+                ds9cmd = ds9cmd+' -frame new'
+            for ff in np.arange(self.ds9banksize+1,self.ds9banksize*Nbanks+1): # hide 2nd bank
+                ds9cmd = ds9cmd+' -frame '+str(ff)+' -frame hide'
+            ds9cmd = ds9cmd+' -frame 1 -tile yes'
+            self.pds9   = self.procs.start('ds9',ds9cmd)
+            self.ds9starting = True # ds9windowopen is set once DS9 answers XPA requests
+            self.waitfords9xpa(self.loadfits_xpa)
+        else:
+            self.loadfits_xpa()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def waitfords9xpa(self,loadcmd,waited=0,probe=None):
+        """
+        Run loadcmd once the newly launched DS9 window accepts XPA commands. The check is run by a
+        background xpaaccess process (vi.ds9xpaprobe) which is polled every 100 ms from the Tk event loop,
+        so the GUI stays responsive while DS9 starts up (also if the XPA name server is slow).
+        """
+        if self.quitting: return
+        if probe is None:
+            probe = vi.ds9xpaprobe()
+            if probe is None:
+                self.ds9starting = False
+                return
+        elif probe.poll() is not None: # probe finished
+            if probe.stdout.read().strip() == 'yes':
+                self.ds9starting   = False
+                self.ds9windowopen = True
+                loadcmd()
+                return
+            probe = None # DS9 not ready yet; probe again
+        if waited < 30000:
+            self.after(100,self.waitfords9xpa,loadcmd,waited+100,probe)
+        else:
+            if probe is not None: probe.kill()
+            self.ds9starting = False
+            print ' - WARNING DS9 did not respond to XPA commands within 30 seconds; not loading fits files'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def loadfits_xpa(self):
+        """
+        Load the fits files of the current object into the open DS9 window via XPA
+
+        With ds9banks=True the object is shown by swapping in the hidden bank of frames if it was
+        preloaded there, and the next object in objlist is preloaded into the bank being hidden.
+        """
+        objstr = 'object '+str("%05d" % self.currentobj)
+        if not self.ds9banks:
+            self.addfits_xpa(self.currentobj,self.PAs,1)
+        else:
+            if self.ds9batch.cancel(): # previous loading interrupted so banks might be incomplete
+                self.ds9bankobj = [None,None]
+
+            if self.ds9bankobj[1-self.ds9bank] == self.currentobj:
+                self.flipds9banks_xpa()
+                objstr = objstr+' (preloaded)'
+            elif self.ds9bankobj[self.ds9bank] != self.currentobj:
+                self.loadbank_xpa(self.ds9bank,self.currentobj,self.PAs)
+
+            objent = np.where(self.objlist == self.currentobj)[0][0]
+            if objent < len(self.objlist)-1:
+                nextobj = self.objlist[objent+1]
+                if self.ds9bankobj[1-self.ds9bank] != nextobj:
+                    self.loadbank_xpa(1-self.ds9bank,nextobj,self.getPAs(nextobj))
+            self.ds9batch.add('frame '+str(self.ds9bank*self.ds9banksize+1))
+
+        batch = self.ds9batch.send()
+        self.reportds9load(batch,objstr)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def addfits_xpa(self,objid,PAs,Fstart):
+        """
+        Add the XPA commands loading the fits files of an object into the DS9 frames
+        starting at Fstart to the batch. Returns the number of the first frame not used.
+        """
+        idstr  = str("%05d" % objid)
+        for PA in PAs:
             PAstr = '-'+str("%03d" % int(PA))+'-'
             if self.MASTfiles:
                 searchexpression = self.dir+'*'+idstr+'*-pa'+PAstr[1:-1]+'_*2d.fits'
             else:
                 searchexpression = self.dir+'*'+PAstr+'*'+idstr+'*2D.fits'
-            fits_2D = glob.glob(searchexpression)
+            fits_2D = vi.glob_dirindex(self.dirindex,searchexpression)
 
             for ii in xrange(len(fits_2D)):
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'DSCI.reg')
                 self.ds9textregion('DSCI PA='+str(int(PA)),filename=regionfile)
-                out = commands.getoutput('xpaset -p ds9 file '+fits_2D[ii]+'[DSCI]')
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+fits_2D[ii]+'[DSCI]')
+                self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'SCI.reg')
                 self.ds9textregion('SCI PA='+str(int(PA)),filename=regionfile)
-                out = commands.getoutput('xpaset -p ds9 file '+fits_2D[ii]+'[SCI]')
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+fits_2D[ii]+'[SCI]')
+                self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'CONTAM.reg')
                 self.ds9textregion('CONTAM PA='+str(int(PA)),filename=regionfile)
-                out = commands.getoutput('xpaset -p ds9 file '+fits_2D[ii]+'[CONTAM]')
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+fits_2D[ii]+'[CONTAM]')
+                self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'SCI-CONTAM.reg')
                 self.ds9textregion('SCI-CONTAM PA='+str(int(PA)),filename=regionfile)
                 contamsub = self.subtractcontam(fits_2D[ii]) # creating file with contam. subtracted spectrum
-                out = commands.getoutput('xpaset -p ds9 file '+contamsub)
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+contamsub)
+                self.ds9batch.add('regions '+regionfile)
 
                 # If a sextractor region file for the SCI-CONTAM image exists, show it.
                 sexregion = fits_2D[ii].split('.fit')[0]+'_SCI-CONTAM.reg'
                 if os.path.exists(sexregion):
-                    out = commands.getoutput('xpaset -p ds9 regions '+sexregion)
+                    self.ds9batch.add('regions '+sexregion)
                 Fstart += 1
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        return Fstart
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def loadbank_xpa(self,bank,objid,PAs):
+        """
+        Add the XPA commands loading an object into a bank of DS9 frames to the batch
+        """
+        Fstart = bank*self.ds9banksize+1
+        Fend   = self.addfits_xpa(objid,PAs,Fstart)
+        for ff in np.arange(Fend,Fstart+self.ds9banksize): # clear frames left from previous object
+            self.ds9batch.add('frame '+str(ff))
+            self.ds9batch.add('frame clear')
+        self.ds9bankobj[bank] = objid
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def flipds9banks_xpa(self):
+        """
+        Add the XPA commands showing the hidden bank of DS9 frames and hiding the current one to the batch
+        """
+        newbank = 1-self.ds9bank
+        for ff in np.arange(self.ds9banksize):
+            self.ds9batch.add('frame show '+str(newbank*self.ds9banksize+ff+1))
+        for ff in np.arange(self.ds9banksize):
+            self.ds9batch.add('frame hide '+str(self.ds9bank*self.ds9banksize+ff+1))
+        self.ds9bank = newbank
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def reportds9load(self,batch,objstr):
+        """
+        Report the time DS9 spent loading the object once the XPA batch has finished
+        """
+        if batch != self.ds9batch.Nsent: return # superseded by batch for another object
+        if not self.ds9batch.isdone():
+            self.after(50,self.reportds9load,batch,objstr)
+        elif self.vb:
+            print ' - Loaded '+objstr+' into DS9 in '+str("%.2f" % self.ds9batch.loadtime)+' seconds'
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openfits_but_cmd(self):
         """
@@ -1017,7 +3534,7 @@ class Application(Frame):
                 searchext = '2d.fits'
             else:
                 searchext = '2D.fits'
-            fits_2D = glob.glob(self.dir+'*'+PAstr+'*'+idstr+'*'+searchext)
+            fits_2D = vi.glob_dirindex(self.dirindex,self.dir+'*'+PAstr+'*'+idstr+'*'+searchext)
             for ii in xrange(len(fits_2D)):
                 regionfile = self.regiontemp.replace('.reg',PAstr+'DSCI.reg')
                 self.ds9textregion('DSCI PA='+str(int(PA)),filename=regionfile)
@@ -1041,9 +3558,7 @@ class Application(Frame):
                 if os.path.exists(sexregion):
                     ds9cmd = ds9cmd+' -region '+sexregion+' '
 
-        self.pds9   = subprocess.Popen(ds9cmd,shell=True,executable=os.environ["SHELL"])
-        time.sleep(1.1)# sleep to make sure ds9 appear in PIDlist
-        self.ds9PID = vi.getPID('ds9',verbose=False) # get PID of DS9 process
+        self.pds9   = self.procs.start('ds9',ds9cmd)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def lockds9string(self):
         """
@@ -1071,9 +3586,50 @@ class Application(Frame):
         """
         update image in GUI
         """
-        img = ImageTk.PhotoImage(Image.open(self.GUIimage).resize((self.imgx,self.imgy),Image.ANTIALIAS))
+        if self.GUIimage in self.prefetchphotos: # PhotoImage already prepared in the background
+            img = self.prefetchphotos.pop(self.GUIimage)
+        elif self.prefetcher is not None:
+            img = ImageTk.PhotoImage(self.prefetcher.get(self.GUIimage,(self.imgx,self.imgy)))
+        else:
+            img = ImageTk.PhotoImage(vi.loadGUIimage(self.GUIimage,(self.imgx,self.imgy),thumbcache=self.thumbcache))
         self.imageframe.configure(image = img)
         self.imageframe.image = img
+        self.prefetchimages()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def prefetchimages(self):
+        """
+        Queue the in-GUI images of the next objects in objlist for decoding in the background
+        """
+        if self.prefetcher is None: return
+
+        objent   = np.where(self.objlist == self.currentobj)[0][0]
+        upcoming = []
+        for objid in self.objlist[objent+1:objent+1+self.prefetch]:
+            GUIimage = self.getpngs(objid)[2]
+            if GUIimage is not None:
+                self.prefetcher.request(GUIimage,(self.imgx,self.imgy))
+                upcoming.append(GUIimage)
+
+        for png in self.prefetchphotos.keys(): # drop PhotoImages no longer ahead of current object
+            if png not in upcoming: del self.prefetchphotos[png]
+        self.prefetchupcoming = upcoming
+
+        if self.prefetchafter is not None: self.after_cancel(self.prefetchafter)
+        self.prefetchafter = self.after(100,self.prefetchphotoimages)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def prefetchphotoimages(self):
+        """
+        Turn the images prepared by the prefetcher into PhotoImages while the GUI is idle
+        """
+        self.prefetchafter = None
+        pending = False
+        for png in self.prefetchupcoming:
+            if png in self.prefetchphotos: continue
+            if self.prefetcher.isready(png,(self.imgx,self.imgy)):
+                self.prefetchphotos[png] = ImageTk.PhotoImage(self.prefetcher.get(png,(self.imgx,self.imgy)))
+            elif self.prefetcher.ispending(png,(self.imgx,self.imgy)):
+                pending = True
+        if pending: self.prefetchafter = self.after(100,self.prefetchphotoimages)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def reset(self,skip=False):
         """
@@ -1127,9 +3683,8 @@ class Application(Frame):
                 Ndup = self.removeoutputduplicate(self.currentobj,self.PAs[0])
 
             # calculating spectral coverage and contamination if not skipping
-            speccov       = self.estimate_spectralcoverage(self.currentobj,self.PAs[0],type=speccovtype)
-            contlevel     = self.estimate_contaminationlevel(self.currentobj,self.PAs[0],cut=cutcontam,
-                                                             type=contleveltype)
+            speccov, contlevel = self.getspecmetrics(self.currentobj,self.PAs[0],cut=cutcontam,
+                                                     speccovtype=speccovtype,contleveltype=contleveltype)
             resultstr     = resultstr.replace(self.keys.keys()[2],str("%.5f" % speccov[0]))   # G102
             resultstr     = resultstr.replace(self.keys.keys()[3],str("%.5f" % speccov[1]))   # G141
             resultstr     = resultstr.replace(self.keys.keys()[6],str("%.5f" % contlevel[0])) # G102
@@ -1183,9 +3738,8 @@ class Application(Frame):
                     Ndup = self.removeoutputduplicate(self.currentobj,self.PAs[1])
 
                 # calculating spectral coverage and contamination if not skipping
-                speccov       = self.estimate_spectralcoverage(self.currentobj,self.PAs[1],type=speccovtype)
-                contlevel     = self.estimate_contaminationlevel(self.currentobj,self.PAs[1],cut=cutcontam,
-                                                                 type=speccovtype)
+                speccov, contlevel = self.getspecmetrics(self.currentobj,self.PAs[1],cut=cutcontam,
+                                                         speccovtype=speccovtype,contleveltype=speccovtype)
                 resultstr     = resultstr.replace(self.keys2.keys()[2],str("%.5f" % speccov[0]))   # G102
                 resultstr     = resultstr.replace(self.keys2.keys()[3],str("%.5f" % speccov[1]))   # G141
                 resultstr     = resultstr.replace(self.keys2.keys()[6],str("%.5f" % contlevel[0])) # G102
@@ -1196,9 +3750,8 @@ class Application(Frame):
                 self.fout.write(str(resultstr))
             if resultstr == defaultstr: skip = skipin # restoring original skip value
 
-        # --- close and re-open output file so inspection is saved ---
-        self.fout.close()
-        self.fout = open(self.outfile,'a')
+        # --- make sure inspection is saved ---
+        self.fout.commit()
 
         # --- resetting widgets and closing windows ---
         self.comments.delete(0,END) # reset comment field
@@ -1219,29 +3772,34 @@ class Application(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def removeoutputduplicate(self,id,pa):
         """
-        Subtract continuum from science fram
+        Remove earlier entries of the object and PA from the output. The entries are flagged in the
+        output journal and removed from the file when it is compacted (on quit).
         """
-        self.fout.close()
         idstr       = str("%.5d" % id)
         pastr       = str("%.3d" % pa)
-        stringstart = ' '+idstr+' '+pastr
-        file        = open(self.outfile,'r')
-        lines       = file.readlines()
-        file.close()
-        file = open(self.outfile,"w")
-
-        Ndup        = 0
-        for line in lines:
-            if line[0:10] != stringstart:
-                file.write(line)
-            else:
-                if self.vb: print ' - Found dublicate entry for ID '+idstr+' PA '+pastr+' deleting it!'
-                Ndup = Ndup+1
-
-        file.close()
-        self.fout = open(self.outfile,'a')
+        Ndup        = self.fout.supersede((idstr,pastr))
+        if (Ndup > 0) & self.vb: print ' - Found '+str(Ndup)+' dublicate entries for ID '+idstr+' PA '+pastr+\
+                                       ' deleting them!'
         return Ndup
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def getspecmetrics(self,objid,PA,cut=1e-3,speccovtype=1,contleveltype=1):
+        """
+        Return the spectral coverage and contamination level (G102, G141) for the object at the given PA.
+        Looked up in the table from vi.precompute_specmetrics() if it was loaded and generated with the
+        same setup, otherwise estimated from the FITS files.
+        """
+        key   = (int(objid),int(PA))
+        setup = {'cutcontam':cut, 'speccovtype':speccovtype, 'contleveltype':contleveltype}
+        if (self.specmetrics is not None) and (key in self.specmetrics) and (self.specmetricssetup == setup):
+            G102      = self.specmetrics[key].get('G102',[9.99,9.99])
+            G141      = self.specmetrics[key].get('G141',[9.99,9.99])
+            speccov   = G102[0], G141[0]
+            contlevel = G102[1], G141[1]
+        else:
+            speccov   = self.estimate_spectralcoverage(objid,PA,type=speccovtype)
+            contlevel = self.estimate_contaminationlevel(objid,PA,cut=cut,type=contleveltype)
+        return speccov, contlevel
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def estimate_spectralcoverage(self,objid,PA,type=1):
         """
         Estimating the spectral coverage for the current object
@@ -1249,33 +3807,18 @@ class Application(Frame):
         idstr     = str("%05d" % objid)
         PAstr     = '-'+str("%03d" % int(PA))+'-'
         globstr   = self.dir+'*'+PAstr+'*'+idstr+'*1D.fits'
-        file1D    = glob.glob(globstr)
+        file1D    = vi.glob_dirindex(self.dirindex,globstr)
 
         if len(file1D) > 2:
             if self.vb: print ' - WARNING Found more than 2 file globbing for '+globstr
 
         speccovG102 = speccovG141 = 9.99
         for f in file1D:
-            dat    = pyfits.open(f)[1].data
-            et     = dat['etrace']
-            Npix   = float(len(et))
-            Nzero  = float(len(et[et==0]))
-
-            if Npix == 0:
-                if 'G102' in f:
-                    speccovG102 = -99
-                elif 'G141' in f:
-                    speccovG141 = -99
-            else:
-                if type == 1:
-                    SCvalue     = 1.0 - Nzero/Npix
-                else:
-                    sys.exit(' - Invalid type ('+str(type)+') in estimate_spectralcoverage')
-
-                if 'G102' in f:
-                    speccovG102 = SCvalue
-                elif 'G141' in f:
-                    speccovG141 = SCvalue
+            SCvalue = vi.spectralcoverage_file(f,type=type)
+            if 'G102' in f:
+                speccovG102 = SCvalue
+            elif 'G141' in f:
+                speccovG141 = SCvalue
 
         return speccovG102, speccovG141
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -1285,33 +3828,15 @@ class Application(Frame):
         """
         idstr     = str("%05d" % objid)
         PAstr     = '-'+str("%03d" % int(PA))+'-'
-        file2D    = glob.glob(self.dir+'*'+PAstr+'*'+idstr+'*2D.fits')
+        file2D    = vi.glob_dirindex(self.dirindex,self.dir+'*'+PAstr+'*'+idstr+'*2D.fits')
 
         contlevelG102 = contlevelG141 = 9.99
         for f in file2D:
-            hduimg      = pyfits.open(f) # Load the FITS hdulist
-            model       = hduimg[6].data
-            #scimodel    = hduimg[4].data[model != 0]
-            contammodel = hduimg[7].data[model != 0]
-
-            Nbad        = float(len(contammodel[np.abs(contammodel) > cut]) )
-            Npix        = float(len(contammodel))
-
-            if Npix == 0:
-                if 'G102' in f:
-                    contlevelG102 = -99
-                elif 'G141' in f:
-                    contlevelG141 = -99
-            else:
-                if type == 1:
-                    CLvalue  = Nbad/Npix
-                else:
-                    sys.exit(' - Invalid type ('+str(type)+') in estimate_contaminationlevel')
-
-                if 'G102' in f:
-                    contlevelG102 = CLvalue
-                elif 'G141' in f:
-                    contlevelG141 = CLvalue
+            CLvalue = vi.contaminationlevel_file(f,cut=cut,type=type)
+            if 'G102' in f:
+                contlevelG102 = CLvalue
+            elif 'G141' in f:
+                contlevelG141 = CLvalue
 
         return contlevelG102, contlevelG141
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -1322,17 +3847,13 @@ class Application(Frame):
         killsignal = 1     # see bash> man kill
         PIDkill    = True
         if PIDkill:
-            try:
-                os.kill(self.pngPID,killsignal)                  # close PNG window for currentobj
-            except:
+            if not self.procs.close('png',killsignal):        # close PNG window for currentobj
                 print '   WARNING error occurred while trying to close PNG window(s)'
 
             if np.logical_or(((self.ds9open == True) & (self.xpa == False)),
-                             ((self.xpa == True) & (self.quitting == True) & (self.ds9windowopen == True))):
-                try:
-                    os.kill(self.ds9PID,killsignal)                  # close DS9 window for currentobj
-                except:
-                    if self.vb: print ' - WARNING: Could not kill DS9 process id ',self.ds9PID
+                             ((self.xpa == True) & (self.quitting == True) & (self.ds9windowopen or self.ds9starting))):
+                if not self.procs.close('ds9',killsignal):     # close DS9 window for currentobj
+                    if self.vb: print ' - WARNING: Could not close DS9 window (already closed?)'
                 rmout = commands.getoutput('rm '+self.regiontemp.replace('.reg','*.reg')) # removing ds9 region file
         else:
             print '=== WHAT ARE YOU DOING HERE?? ==='
@@ -1442,8 +3963,10 @@ class Application(Frame):
         self.quitting = True
         self.fout.close()
         self.closewindows()
+        if self.prefetcher is not None: self.prefetcher.stop()
         if self.outcheck: self.checkoutput()
         self.quit()
+        if self.vb & (self.thumbcache is not None): print self.thumbcache.report()
         if self.vb: print ' - Quit GiG successfully'
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def checkoutput(self):
@@ -1461,21 +3984,9 @@ class Application(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def subtractcontam(self,twodfits):
         """
-        Subtract continuum from science fram
+        Subtract continuum from science fram (see vi.precompute_subtractcontam to generate all files beforehand)
         """
-        filename, fileext =  os.path.splitext(twodfits)
-        output = filename+'_SCI-CONTAM'+fileext
-
-        if os.path.isfile(output): # check if file already exists
-            if self.vb: print ' - ',output,' already exists'
-        else:
-            if self.vb: print ' - Create ',output
-            hduimg  = pyfits.open(twodfits) # Load the FITS hdulist
-            hdrsci  = hduimg['SCI'].header    # extracting science header
-            sci     = hduimg['SCI'].data
-            contam  = hduimg['CONTAM'].data
-            pyfits.writeto(output, sci-contam, hdrsci, clobber=False)
-
+        output = vi.subtractcontam_fits(twodfits,verbose=self.vb)[0]
         return output
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def keyboard_cmd(self,event):
@@ -1576,7 +4087,8 @@ class Application_z(Frame):
                  objlist=None,verbose=True,iname='John Doe',latexplotlabel=False,
                  ACSinspection=False,clobber=False,ds9xpa=False,openfitsauto=False,skipempty=False,
                  inGUIimage='zfit',check4duplicates=False,outputcheck=False,autosaveplot=False,
-                 MASTfiles=False):
+                 MASTfiles=False,prefetch=0,ds9banks=False,outputsync='flush',skipinspected=False,
+                 smoothcache=50.0,smoothladder=0,zscan=False,thumbcache=None,thumbcacheMB=200.0):
         """
         Intitialize the GUI for redshift fit
 
@@ -1613,7 +4125,35 @@ class Application_z(Frame):
                           and remove duplicate entries
         outputcheck       Checking the written output to see if it contains the expected number
                           of objects etc.
-        autosaveplot      Saving of the 1Dspec plot automatically when advancing to next object
+        autosaveplot      Saving of the 1Dspec plot automatically when advancing to next object. The plot
+                          is rendered and written by a background process (see vi.render_GiGz_1Dspecplot).
+        prefetch          Number of upcoming objects in objlist for which the in-GUI image is decoded and
+                          resized in the background by a pool of worker threads. Moving to the next object
+                          then only requires swapping in the prepared image. Set to 0 to disable.
+        ds9banks          Only used if ds9xpa=True. Keep two banks of frames in the DS9 window. While an
+                          object is inspected the fits files of the next object in objlist are loaded into
+                          the hidden bank, which is swapped in when the fits files of that object are opened.
+        outputsync        How the output is made persistent after each saved object: 'flush' (default) to
+                          the operating system, 'fsync' to disk or 'none' (written when quitting).
+                          See vi.OutputJournal for details.
+        skipinspected     When appending to an existing output file, skip all objects already in the file
+                          instead of resuming after the last object in the file.
+        smoothcache       Maximum memory in MB used for keeping the Gauss smoothed 1D spectra (see vi.SmoothCache)
+        smoothladder      When a smoothing level is not cached, also compute the smoothladder levels on each
+                          side of it (in steps of 0.1 as used by m/M) in one batched computation. 0 disables.
+        zscan             Preset the redshift slider to the best candidate redshift from matching the emission
+                          lines to the 1D spectra (see vi.zscan_spectra). The candidates can be stepped through
+                          with the j (next) and J (previous) keys. Choices are:
+                          False        Do not scan redshifts (default)
+                          True         Scan the spectra of each object when it is loaded
+                          'DEFAULT'    Use the table self.dir+'GiGz_zscan.txt' generated with vi.precompute_zscan
+                          filename     Use the table 'filename' generated with vi.precompute_zscan
+                          Objects not in the table are scanned when loaded.
+        thumbcache        Directory of the on-disk cache of in-GUI images resized to the display size
+                          (see vi.ThumbnailCache) so each image is only resampled once across sessions.
+                          Use 'DEFAULT' for vi.thumbcache_defaultdir(). If None no thumbnail cache is used.
+                          The cache can be filled beforehand with vi.precompute_thumbnails().
+        thumbcacheMB      Maximum size in MB of the thumbnail cache directory.
         """
         pp    = subprocess.Popen('ds9 -version',shell=True,executable=os.environ["SHELL"],stdout=subprocess.PIPE)
         ppout = pp.communicate()[0]
@@ -1624,8 +4164,22 @@ class Application_z(Frame):
         self.dir           = dir
         self.ds9open       = False # set ds9 indicator (used for ds9xpa = False)
         self.ds9windowopen = False # set ds9 indicator (used for ds9xpa = True)
+        self.ds9starting   = False # DS9 launched but not yet answering XPA requests (ds9xpa = True)
         self.ACSins        = ACSinspection
+        self.smoothcache   = vi.SmoothCache(maxMB=smoothcache,ladder=smoothladder,verbose=verbose)
+        self.zscan         = zscan
+        self.zscantable    = None
+        self.zcandidates   = []
+        self.zcandent      = 0
+        if (self.zscan != False) & (self.zscan != True):
+            if self.zscan == 'DEFAULT': self.zscan = self.dir+'GiGz_zscan.txt'
+            if os.path.isfile(self.zscan):
+                self.zscantable = vi.load_zscan(self.zscan,verbose=self.vb)
+            else:
+                print ' - WARNING zscan table '+self.zscan+' not found; scanning objects when loaded'
         self.quitting      = False
+        self.procs         = vi.ProcessManager(verbose=verbose) # keeps track of png and DS9 windows
+        self.ds9batch      = vi.DS9XPABatch(verbose=verbose)    # sends XPA commands to DS9
         self.xpa           = ds9xpa # check if user indacetd that xpa was available for ds9
         self.inGUIimage    = inGUIimage
         self.duplicates    = check4duplicates
@@ -1634,22 +4188,39 @@ class Application_z(Frame):
         self.GiGf          = GiGfile
         self.latex         = latexplotlabel
         self.autosaveplot  = autosaveplot
+        self.plotwriter    = None # process writing autosaved plots (started before any widgets or threads)
+        if self.autosaveplot: self.plotwriter = vi.start_GiGz_plotwriter()
         self.skipempty     = skipempty
+        self.outputsync    = outputsync
+        self.skipinspected = skipinspected
         self.MASTfiles     = MASTfiles
+        self.prefetch      = prefetch
+        self.thumbcache = None
+        if thumbcache is not None:
+            if thumbcache == 'DEFAULT': thumbcache = vi.thumbcache_defaultdir()
+            self.thumbcache = vi.ThumbnailCache(thumbcache,maxMB=thumbcacheMB,verbose=self.vb)
         if self.xpa:
             #sys.exit(' - XPA DS9 controls not enabled yet; still under construction (use ds9xpa=False)')
             self.ds9windowopen = False
 
+        self.ds9banks    = ds9banks    # double-buffered DS9 frames (only with ds9xpa = True)
+        self.ds9banksize = 17          # number of DS9 frames per object/bank
+        self.ds9bank     = 0           # bank currently shown
+        self.ds9bankobj  = [None,None] # objects loaded into the banks
+        if self.ds9banks & (not self.xpa):
+            print ' - WARNING ds9banks=True requires ds9xpa=True; not using frame banks'
+            self.ds9banks = False
+
         if os.path.exists(self.dir):
             self.twodfits = glob.glob(self.dir)
         else:
             sys.exit(' - The directory '+self.dir+' does not exist --> ABORTING')
 
+        self.dirindex = vi.build_dirindex(self.dir,verbose=self.vb) # index of files to avoid globbing the dir
+
         # -------- LOAD GiG INFO IF FILE PROVIDED --------
         if self.GiGf != None:
-            GiGfile_open  = open(GiGfile,'r')
-            self.GiGlines = GiGfile_open.readlines()
-            GiGfile_open.close()
+            self.GiGdata, self.GiGlinewaves = vi.load_GiGcatalog(GiGfile,verbose=self.vb)
 
             GiGsel         = GiGselection
             self.GiGobjID  = self.selectonGiG(GiGfile,GiGsel)
@@ -1666,7 +4237,8 @@ class Application_z(Frame):
                     searchext = '.2D.png'
                     cutent    = [-17,-12]
 
-                self.file_2Dpng = [f for f in glob.glob(self.dir+'*'+searchext) if 'zfit' not in f]
+                self.file_2Dpng = [f for f in vi.glob_dirindex(self.dirindex,self.dir+'*'+searchext)
+                                   if 'zfit' not in f]
                 self.objlist    = np.asarray([int(self.file_2Dpng[jj][cutent[0]:cutent[1]])
                                               for jj in xrange(len(self.file_2Dpng))])
                 self.objlist    = np.unique(self.objlist)
@@ -1676,7 +4248,8 @@ class Application_z(Frame):
             else:
                 self.objlist = np.asarray(objlist)
 
-            self.objlist = vi.check_idlist(self.objlist,self.dir,verbose=self.vb) # check objects exist in dir
+            self.objlist = vi.check_idlist(self.objlist,self.dir,verbose=self.vb,
+                                           dirindex=self.dirindex) # check objects exist in dir
 
         if len(self.objlist) == 0:
             sys.exit(' No valid IDs found \n             Forgot a forward slash after the objdir? \n             Running on MAST files? Then use MASTfiles = True')
@@ -1685,7 +4258,7 @@ class Application_z(Frame):
         if verbose: print " - Found "+str(len(self.objlist))+' objects to inspect'
         # -------- Get version of MAST data release (assuming all the same) --------
         if self.MASTfiles:
-            self.MASTversion = glob.glob(self.dir+'*_2d.png')[0][-11:-7]
+            self.MASTversion = vi.glob_dirindex(self.dirindex,self.dir+'*_2d.png')[0][-11:-7]
         else:
             self.MASTversion = 'None'
         # -------- COUNT PAs FOR ALL IDs --------
@@ -1696,7 +4269,7 @@ class Application_z(Frame):
                 searchext = '_1d.png'
             else:
                 searchext = '1D.png'
-            PAobj  = len(glob.glob(self.dir+'*'+idstr+'*'+searchext))/2. # divide by two to account for grisms
+            PAobj  = len(vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*'+searchext))/2. # 2 grisms per PA
             allPAs.append(PAobj)
         self.Npamax = np.max(allPAs)
         if verbose: print ' - The maximum number of PAs in the objlist was ',self.Npamax
@@ -1714,19 +4287,24 @@ class Application_z(Frame):
 
         if os.path.isfile(outfile):
             newfile   = False
-            self.fout = open(outfile,'r')                # open existing file
-            IDinspected = np.array([])                   # array to contain IDs in file
-            for line in self.fout.readlines():           # loop through file to last line
-                lsplit = line.split()
-                if lsplit[0] != '#':
-                    IDinspected = np.append(IDinspected,float(lsplit[0]))
+            self.fout = vi.OutputJournal(outfile,mode='a',sync=self.outputsync,verbose=self.vb) # indexes file
+            IDinspected = set([int(key[0]) for key in self.fout.Nrecords.keys()]) # IDs in file
             if len(IDinspected) == 0:
                 sys.exit('Found no inspected objects in '+outfile)
-            lastline = line
-            self.fout.close()
 
-            lastID = lastline.split()[0]                     # get the last ID in file
-            if lastID != '#':
+            lastID = self.fout.lastline.split()[0]           # get the last ID in file
+            if self.skipinspected:
+                if self.vb: print ' - The file '+outfile+' already exists (Skipping all objects in output)'
+                notinspected = np.asarray([int(objid) not in IDinspected for objid in self.objlist])
+                if not np.any(notinspected):
+                    sys.exit(' - All objects in "objlist" are already in the outputfile --> ABORTING ')
+                self.objlist    = self.objlist[notinspected]
+                self.currentobj = self.objlist[0]            # change first id to look at
+                if self.vb:
+                    print ' - Info from existing output: '
+                    print '   '+str(len(self.objlist))+' of '+str(len(notinspected))+' IDs still need to be expected'
+                    print '   Found '+str(len(IDinspected))+' IDs already inspected in file'
+            elif lastID != '#':
                 objent = np.where(self.objlist == float(lastID))[0]
                 if self.vb: print ' - The file '+outfile+' already exists (Resuming after last objects in output)'
                 try:
@@ -1734,7 +4312,7 @@ class Application_z(Frame):
                 except:
                     sys.exit(' - The last object in the outputfile is the last in "objlist" --> ABORTING ')
                 Nremaining = len(self.objlist[objent+1:])
-                Ninspected = len(np.unique(np.sort(IDinspected)))
+                Ninspected = len(IDinspected)
                 if self.vb:
                     print ' - Info from existing output: '
                     print '   '+str(Nremaining)+' of '+str(len(self.objlist))+' IDs still need to be expected'
@@ -1742,10 +4320,9 @@ class Application_z(Frame):
 
             else:
                 if self.vb: print ' - The file '+outfile+' already exists (append as last row does not contain ID)'
-            self.fout     = open(outfile,'a')
         else:
             if self.vb: print ' - The file '+outfile+' was created (did not exist)'
-            self.fout     = open(outfile,'w')
+            self.fout     = vi.OutputJournal(outfile,mode='w',sync=self.outputsync,verbose=self.vb)
             self.fout.write('# Results from Visual Inspection of zfits initiated on '+self.now+' \n')
             self.fout.write('# Inspector: '+iname+' \n')
             newfile = True
@@ -1766,17 +4343,25 @@ class Application_z(Frame):
         self.create_widgets()
 
         # -------- SETUP DATAPLOT --------
-        self.dataPlot_init(xsize=1200,ysize=100)
+        self.dataPlot_init(xsize=980,ysize=100)
         self.dataPlot_loaddata()
-        self.dataPlot_plot(refresh=False,newobj=True)
+        self.dataPlot_plot(newobj=True)
         self.DPxlow_full, self.DPxhigh_full, self.DPylow_full, self.DPyhigh_full = \
             self.dataPlot_getwindowinfo() # store first full window
 
         # -------- ADD IMAGE WINDOW --------
         self.imgx,self.imgy = 990, 200
-        img = ImageTk.PhotoImage(Image.open(self.GUIimage).resize((self.imgx,self.imgy),Image.ANTIALIAS))
+        img = ImageTk.PhotoImage(vi.loadGUIimage(self.GUIimage,(self.imgx,self.imgy),thumbcache=self.thumbcache))
         self.imageframe = Label(master, image=img)
         self.imageframe.image = img
+        self.prefetcher       = None
+        self.prefetchphotos   = {}   # PhotoImages of upcoming objects prepared while GUI is idle
+        self.prefetchupcoming = []
+        self.prefetchafter    = None
+        if self.prefetch > 0:
+            self.prefetcher = vi.ImagePrefetcher(Nworkers=2,Nkeep=2*self.prefetch+2,
+                                                 thumbcache=self.thumbcache,verbose=self.vb)
+            self.prefetchimages()
         self.imageframe.grid(row = 150, column = 0, columnspan = 1, sticky=S)
 
         # -------- DRAW SEPERATORS --------
@@ -1979,10 +4564,8 @@ class Application_z(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def selectonGiG(self,GiGfile,GiGsel,verbose=True):
         """
-        Returning object list of selection from GiG catalog
+        Returning object list of selection from GiG catalog (loaded into self.GiGdata)
         """
-        self.GiGdata = np.genfromtxt(GiGfile,comments='#',skip_header=2,names=True)
-
         if GiGsel == 'emissionlineobjects':
             selection = self.GiGdata[np.logical_or(np.logical_or(self.GiGdata['G102_Emission_Line'] == 1,
                                                                  self.GiGdata['G141_Emission_Line'] == 1),
@@ -2067,13 +4650,12 @@ class Application_z(Frame):
 
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-    def dataPlot_init(self,xsize=500,ysize=150,rowval=45):
+    def dataPlot_init(self,xsize=500,ysize=150,rowval=45,plotrow=149):
         """
-        Inititalize the data plot window (also used to kill it when exiting)
+        Inititalize the data plot. The figure is drawn on a FigureCanvasTkAgg placed in the GUI window
+        (in row plotrow of the master) together with the matplotlib navigation toolbar.
         """
         #----------------- Plot setup -----------------
-        plt.ioff()                                                 # turn off interactive plotting
-        plt.ion()                                                  # enable interactive plotting
         self.DPFsize  = 16
         self.DPlwidth = 2
         self.DPxscale = 1e4
@@ -2084,27 +4666,42 @@ class Application_z(Frame):
         self.DPg102col   = ['orange','cyan']
         self.DPg141col   = ['red','magenta']
         self.DPxrange    = [0.78,1.67]
+        self.DPartists   = None # persistent artists created by dataPlot_build
+        self.DPbackground = None # plot without the emission lines used for blitting
+        self.DPzafter     = None
+        self.DPlinelist, self.DPlinename = vi.GiGz_emissionlines() # emission line list
         if self.latex:
-            plt.rc('text', usetex=True)                            # enabling LaTex rendering of text
+            matplotlib.rc('text', usetex=True)                     # enabling LaTex rendering of text
         else:
-            plt.rc('text', usetex=False)                           # disabling LaTex rendering of text
-        plt.rc('font' , family='serif',size=self.DPFsize)          # setting text font
-        plt.rc('xtick', labelsize=self.DPFsize)
-        plt.rc('ytick', labelsize=self.DPFsize)
-
-        self.dataPlot_fig    = plt.figure()
-        self.dataPlot_fig.canvas.set_window_title('GLASS 1D spectra of object '+str(self.currentobj))
+            matplotlib.rc('text', usetex=False)                    # disabling LaTex rendering of text
+        matplotlib.rc('font' , family='serif',size=self.DPFsize)   # setting text font
+        matplotlib.rc('xtick', labelsize=self.DPFsize)
+        matplotlib.rc('ytick', labelsize=self.DPFsize)
+
+        self.dataPlot_frame  = Frame(self.master)
+        self.dataPlot_frame.grid(row=plotrow,column=0,columnspan=1,sticky=W+E)
+        self.DPtitlevar      = StringVar()
+        Label(self.dataPlot_frame,textvariable=self.DPtitlevar).grid(row=0,column=0,sticky=W)
+        self.DPtitlevar.set('GLASS 1D spectra of object '+str(self.currentobj))
+
+        dpi = 100.
+        self.dataPlot_fig    = Figure(figsize=(xsize/dpi,ysize/dpi),dpi=dpi)
         self.dataPlot_fig.subplots_adjust(wspace=0.2, hspace=0.2,left=0.1, right=0.98, bottom=0.15, top=0.95)
         self.dataPlot_ax     = self.dataPlot_fig.add_subplot(111)
-        self.dataPlotManager = plt.get_current_fig_manager()  # get plotting canvas
-        self.dataPlotManager.resize(xsize,ysize)
+        self.dataPlot_canvas = FigureCanvasTkAgg(self.dataPlot_fig,master=self.dataPlot_frame)
+        self.dataPlot_canvas.get_tk_widget().grid(row=1,column=0,sticky=W+E)
+        toolbarframe         = Frame(self.dataPlot_frame)  # the toolbar packs itself so give it its own frame
+        toolbarframe.grid(row=2,column=0,sticky=W)
+        self.dataPlot_toolbar = NavigationToolbar2Tk(self.dataPlot_canvas,toolbarframe)
+        self.dataPlot_toolbar.update()
 
         # ==== SLIDERS =====
         cluster, cluster_z = vi.getclusterz(self.file)
 
         self.varsliderz = DoubleVar()
         self.sliderz  = Scale(self, from_=0.00, to=15.0,label='Redshift (n)+ (N)-',variable = self.varsliderz,
-                              orient=HORIZONTAL,background='gray',length=200,resolution=0.001)
+                              orient=HORIZONTAL,background='gray',length=200,resolution=0.001,
+                              command=self.dataPlot_sliderz_cmd)
         self.sliderz.grid(row=rowval,column=0,columnspan=1,rowspan=1,sticky=W)
         self.varsliderz.set(cluster_z) # set intial value of slider
 
@@ -2153,8 +4750,8 @@ class Application_z(Frame):
         self.dataPlot_redrawbutton([rowval+2,1,1])
         self.dataPlot_savebutton([rowval+2,3,1])
 
+        self.dataPlot_canvas.mpl_connect('draw_event', self.dataPlot_ondraw)
         self.DPxlow, self.DPxhigh, self.DPylow, self.DPyhigh = self.dataPlot_getwindowinfo() # store window
-        # self.dataPlotManager.destroy()
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def dataPlot_redrawbutton(self,position):
         """
@@ -2170,7 +4767,7 @@ class Application_z(Frame):
         Command for redrawing the plot
         """
         self.DPxlow, self.DPxhigh, self.DPylow, self.DPyhigh = self.dataPlot_getwindowinfo() # store window
-        self.dataPlot_plot(refresh=True,verbose=True)
+        self.dataPlot_plot(verbose=True)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def dataPlot_fullzoombutton(self,position):
         """
@@ -2186,7 +4783,7 @@ class Application_z(Frame):
         Command for going back to full zoom in the plot
         """
         self.DPxlow, self.DPxhigh, self.DPylow, self.DPyhigh = self.dataPlot_getwindowinfo() # store window
-        self.dataPlot_plot(refresh=True,fullzoom=True,verbose=True)
+        self.dataPlot_plot(fullzoom=True,verbose=True)
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def dataPlot_savebutton(self,position):
@@ -2204,296 +4801,407 @@ class Application_z(Frame):
         Command for saving the created plot
         """
         plotname = self.dir+self.cluster+'_'+str("%.5d" % self.currentobj)+'_GiGz_1Dspecplot.pdf'
-        self.dataPlot_fig.savefig(plotname)
+        zartists = []
+        if self.DPartists is not None: # animated artists are skipped by savefig so include them temporarily
+            zartists = [self.DPartists['zlines']]+self.DPartists['ztexts']
+        for artist in zartists: artist.set_animated(False)
+        try:
+            self.dataPlot_fig.savefig(plotname)
+        finally:
+            for artist in zartists: artist.set_animated(True)
         print ' - Saved GiGz plot window to \n   '+plotname
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_autosave(self):
+        """
+        Save the plot of the current object (as shown in the plot window) from a background process
+        with vi.render_GiGz_1Dspecplot, so moving to the next object does not wait for the PDF to be written.
+        """
+        plotname = self.dir+self.cluster+'_'+str("%.5d" % self.currentobj)+'_GiGz_1Dspecplot.pdf'
+        try:
+            redshift = float(self.byhandz.get())
+        except:
+            redshift = float(self.varsliderz.get())
+        keywords = {'redshift':redshift, 'smoothlevel':float(self.varslidersmooth.get()),
+                    'showmodels':(self.modelboxvar.get() == '0'), 'window':list(self.dataPlot_getwindowinfo()),
+                    'MASTfiles':self.MASTfiles, 'latex':self.latex}
+        if (self.GiGf != None) & (self.GiGlinesboxvar.get() != '0'):
+            keywords['GiGlinewaves'] = dict([(key,self.GiGlinewaves[key]) for key in self.GiGlinewaves.keys()
+                                             if key[0] == self.currentobj])
+
+        if self.plotwriter is None: self.plotwriter = vi.start_GiGz_plotwriter()
+        vi.send_GiGz_plotwriter(self.plotwriter,(self.dir,self.currentobj,plotname,keywords))
+        print ' - Saving GiGz plot window in the background to \n   '+plotname
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def dataPlot_loaddata(self,verbose=False):
         """
         Loading the data for dataPlot so it's only necessary to load data once
 
         """
         self.DPidstr    = str("%.5d" % self.currentobj)
-        if self.MASTfiles:
-            searchext = '1d.fits'
-        else:
-            searchext = '1D.fits'
-        fits1Dfound     = glob.glob(self.dir+'*'+self.DPidstr+'*'+searchext)
-        self.DPfits1D   = []
-        self.DPPAs      = []
-        for f1D in fits1Dfound:
-            try:
-                if self.MASTfiles:
-                    self.DPPAs.append(re.search(r'(-pa..._)', f1D).group()[3:6])
-                else:
-                    self.DPPAs.append(re.search(r'(-...-)', f1D).group()[1:4])
-
-                self.DPfits1D.append(f1D)
-            except:
-                pass
-
+        self.DPfits1D, self.DPPAs = vi.find_1Dspectra(self.dir,self.DPidstr,dirindex=self.dirindex,
+                                                      MASTfiles=self.MASTfiles)
         self.DPNfiles   = len(self.DPfits1D)
-        self.DPPAs      = np.sort(np.unique(np.asarray(self.DPPAs)))
         if verbose: print ' - Found the PAs ',self.DPPAs
 
+        # load the spectra once; dataPlot_plot only uses these arrays
+        self.DPspec     = []
+        for f1D in self.DPfits1D:
+            if ('G102' in f1D) or ('g102' in f1D):
+                waverange = self.DPg102range_full
+            elif ('G141' in f1D) or ('g141' in f1D):
+                waverange = self.DPg141range_full
+            else:
+                self.DPspec.append(None)
+                continue
+            self.DPspec.append(vi.load_1Dspectrum(f1D,waverange,self.DPg102range_cut,xscale=self.DPxscale))
+
         # check if EAZY fit pickle exist and load that data
-        self.eazydicexists = False
-        eazydicfile        = glob.glob(self.dir+'*'+self.DPidstr+'*EAZYzfit_all.pickle')
-        if (len(eazydicfile) > 0):
-            eazydicfile = eazydicfile[0]
-            if os.path.isfile(eazydicfile):
-                import pickle
-                with open(eazydicfile, 'rb') as handle:
-                    self.eazydic = pickle.load(handle)
+        self.eazydicexists, self.eazydic, self.zfitdataALL, self.goodzfitload = \
+            vi.load_eazyzfit(self.dir,self.DPidstr,dirindex=self.dirindex,verbose=verbose)
 
-                if verbose: print ' - Attempt to load dictionary in ',eazydicfile
-                try:
-                    keys     = self.eazydic.keys()
-                    for key in keys:
-                        if key.endswith('2D.fits'):
-                            eazykey = key
+        # preset the redshift slider to the best candidate from the emission line scan
+        if self.zscan != False: self.dataPlot_zcandidates(verbose=verbose)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_zcandidates(self,verbose=False):
+        """
+        Get the candidate redshifts of the current object (from the zscan table or by scanning the loaded
+        spectra) and set the redshift slider to the best one
+        """
+        objid = int(self.currentobj)
+        if (self.zscantable is not None) and (objid in self.zscantable):
+            self.zcandidates = self.zscantable[objid]
+        else:
+            waves  = [spec1D['wave'] for spec1D in self.DPspec if spec1D is not None]
+            fluxes = [spec1D['flux'] for spec1D in self.DPspec if spec1D is not None]
+            zcand, scores    = vi.zscan_spectra(waves,fluxes,linelist=self.DPlinelist,xscale=self.DPxscale)
+            self.zcandidates = zip(zcand,scores)
+
+        self.zcandent = 0
+        if len(self.zcandidates) > 0:
+            self.varsliderz.set(self.zcandidates[0][0])
+            if verbose: print ' - Redshift candidates (z,score): '+str(self.zcandidates)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_jumpzcandidate(self,step):
+        """
+        Move the redshift slider 'step' candidates forward (or backward if negative) in the list of candidates
+        """
+        if len(self.zcandidates) == 0:
+            if self.vb: print ' - No redshift candidates for object '+str(self.currentobj)+' (see zscan keyword)'
+            return
+        self.zcandent = (self.zcandent+step) % len(self.zcandidates)
+        zcand, score  = self.zcandidates[self.zcandent]
+        self.varsliderz.set(zcand)
+        if self.vb: print ' - Redshift candidate '+str(self.zcandent+1)+'/'+str(len(self.zcandidates))+\
+                          ': z = '+str("%.3f" % zcand)+' (score = '+str("%.2f" % score)+')'
+    # = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = =
+    def dataPlot_plot(self,verbose=False,newobj=False,fullzoom=False):
+        """
+        Plotting the 1D spectra loaded in dataPlot_loaddata
+        Code taken from runzfit.plotcombinedresults on 141024 and modified.
 
-                    if verbose: print ' - Loading EAZY photo-z info from key ',eazykey
-                    lambdaz, temp_sed, lci, obs_sed, fobs, efobs = self.eazydic[eazykey]
-                    self.goodzfitload = True
-                except:
-                    self.goodzfitload = False
+        Eazydicfile ends on MACS1423.8+2404_00111_EAZYzfit_all.pickle
+
+        The artists are created once per object by dataPlot_build. Changing the redshift, the
+        smoothing or the model/GiG line check boxes only updates the data and visibility of these
+        artists before drawing the canvas once.
+
+        """
+        xlow, xhigh, ylow, yhigh = self.dataPlot_getwindowinfo()
+        if fullzoom:
+            xlow, xhigh, ylow, yhigh =  self.DPxlow_full, self.DPxhigh_full, self.DPylow_full, self.DPyhigh_full
+        #----------------- Building artists for new object -----------------
+        if newobj or (self.DPartists is None):
+            self.dataPlot_build(verbose=verbose)
+        #----------------- Grab infor from sliders -----------------
+        smoothlevel  = float(self.varslidersmooth.get())
+        if verbose: print ' - Grabbed the Gauss smooth level ',smoothlevel,' from the slider'
+        redshift     = float(self.varsliderz.get())
+        if verbose: print ' - Grabbed the redshift ',redshift,' from the slider'
+
+        try:
+            zbyhand      = float(self.byhandz.get())
+            if type(zbyhand) == float:
+                redshift = zbyhand
+                if verbose: print '   But the redshift',zbyhand,'was found in "by-hand" field so using that instead '
+            self.varsliderz.set(zbyhand)
+        except:
+            pass
+
+        showmodels = self.eazydicexists & (self.modelboxvar.get() == '0') & (self.goodzfitload == True)
+        showGiG    = (self.GiGf != None) & (self.GiGlinesboxvar.get() != '0')
+
+        #----------------- Update spectra -----------------
+        newsmooth = (smoothlevel != self.DPartists['smoothlevel'])
+        for spec in self.DPartists['spectra']:
+            if newsmooth:
+                # Smoothed versions
+                filtersigma   = smoothlevel
+                flux1D_smooth = self.smoothcache.get(spec['file'],spec['flux'],filtersigma)
+                spec['smooth'].set_ydata(flux1D_smooth)
+                for GiGline, GiGent in spec['GiG']:
+                    GiGline.set_ydata(flux1D_smooth[GiGent])
+
+            for artist in spec['GiGartists']:
+                artist.set_visible(showGiG)
+            for artist in spec['modelartists']:
+                artist.set_visible(showmodels)
+        self.DPartists['smoothlevel'] = smoothlevel
+        if verbose: print self.smoothcache.report()
+
+        # set ranges based on spectra
+        yrangeflam = self.DPartists['yrange']
+        if not newobj: # only check window if not plotting new object
+            if (ylow != yrangeflam[0]) or (yhigh != yrangeflam[1]):
+                yrangeflam = [ylow,yhigh]
+        Dyrange    = yrangeflam[1]-yrangeflam[0]
+        self.dataPlot_ax.set_ylim(yrangeflam)
+
+        xrangeflam = self.DPxrange
+        if not newobj: # only check window if not plotting new object
+            if (xlow != xrangeflam[0]) or (xhigh != xrangeflam[1]):
+                xrangeflam = [xlow,xhigh]
+        self.dataPlot_ax.set_xlim(xrangeflam)
+
+        # === move emission lines for scale ===
+        self.dataPlot_setz(redshift,xrangeflam,yrangeflam)
+
+        # === update legend ===
+        self.dataPlot_legend(redshift)
+
+        self.dataPlot_canvas.draw()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_setz(self,redshift,xrange,yrange):
+        """
+        Move the emission lines for scale to the given redshift. The x positions of all lines are
+        computed in one go and set on the LineCollection holding the lines.
+        """
+        Nlines   = len(self.DPlinelist)
+        textpos  = self.DPlinelist/self.DPxscale*(redshift+1.0)
+        segments = np.empty((Nlines,2,2))
+        segments[:,:,0] = textpos[:,None]
+        segments[:,0,1] = yrange[0]
+        segments[:,1,1] = yrange[1]
+        self.DPartists['zlines'].set_segments(segments)
+
+        textshow = (textpos > xrange[0]) & (textpos < xrange[1])
+        ytext    = yrange[0]+(yrange[1]-yrange[0])*0.05
+        for ii, ztext in enumerate(self.DPartists['ztexts']):
+            ztext.set_position((textpos[ii],ytext))
+            ztext.set_visible(textshow[ii])
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_legend(self,redshift):
+        """
+        (Re)create the legend of the data plot from the stored artists
+        """
+        showmodels = self.eazydicexists & (self.modelboxvar.get() == '0') & (self.goodzfitload == True)
+        showGiG    = (self.GiGf != None) & (self.GiGlinesboxvar.get() != '0')
+
+        self.DPartists['zlegend'].set_label('Lines at z='+str("%.3f" % redshift))
+        handles = []
+        for spec in self.DPartists['spectra']:
+            if showmodels: handles = handles + spec['modellegend']
+        for spec in self.DPartists['spectra']:
+            if self.eazydicexists & (self.modelboxvar.get() == '1'): handles = handles + spec['zfitlegend']
+        handles = handles + self.DPartists['legend']
+        if showGiG: handles.append(self.DPartists['GiGlegend'])
+        leg = self.dataPlot_ax.legend(handles,[hh.get_label() for hh in handles],
+                                      fancybox=True, loc='upper center',numpoints=1,prop={'size':self.DPFsize-3.},
+                                      ncol=5,bbox_to_anchor=(0.5, 1.27))
+        #leg.get_frame().set_alpha(0.7)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_drawzlines(self):
+        """
+        Draw the (animated) emission lines for scale on top of the current canvas
+        """
+        self.dataPlot_ax.draw_artist(self.DPartists['zlines'])
+        for ztext in self.DPartists['ztexts']:
+            self.dataPlot_ax.draw_artist(ztext)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_ondraw(self,event):
+        """
+        Store the freshly drawn plot (without the emission lines) as background for blitting
+        and add the emission lines on top
+        """
+        if self.DPartists is None: return
+        canvas = event.canvas
+        if not hasattr(canvas,'copy_from_bbox'): return # e.g. when saving the plot to a pdf
+        self.DPbackground = canvas.copy_from_bbox(self.dataPlot_fig.bbox)
+        self.dataPlot_drawzlines()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_sliderz_cmd(self,value):
+        """
+        Command for the redshift slider (also called when using n/N). Moves the emission lines by
+        blitting them onto the stored background; the legend is updated once the slider settles.
+        """
+        if (self.DPartists is None) or (self.DPbackground is None): return
+        redshift = float(value)
+        xlow, xhigh, ylow, yhigh = self.dataPlot_getwindowinfo()
+        self.dataPlot_setz(redshift,[xlow,xhigh],[ylow,yhigh])
 
-                if verbose: print ' - Loading results from zfit (in *zfit.dat)'
-                self.zfitdataALL = []
-                idstr            = str("%.5d" % self.currentobj)
-                zfitfiles        = np.sort(glob.glob(self.dir+'/*_'+idstr+'*zfit.dat'))
-                for zfitfile in zfitfiles:
-                    zfitdata  = np.genfromtxt(zfitfile,dtype=None)
-                    if (self.zfitdataALL == []):
-                        self.zfitdataALL = zfitdata
-                    else:
-                        self.zfitdataALL = np.append(self.zfitdataALL,zfitdata)
+        canvas = self.dataPlot_canvas
+        canvas.restore_region(self.DPbackground)
+        self.dataPlot_drawzlines()
+        canvas.blit(self.dataPlot_fig.bbox)
 
-                self.eazydicexists = True
-            else:
-                if verbose: print ' No EAZY dictionary found when looking for ',eazydicfile
-        else:
-            self.goodzfitload = False
-    # = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = = =
-    def dataPlot_plot(self,verbose=False,refresh=False,newobj=False,fullzoom=False):
+        if self.DPzafter is not None: self.after_cancel(self.DPzafter)
+        self.DPzafter = self.after(300,self.dataPlot_sliderz_settle)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_sliderz_settle(self):
         """
-        Plotting the 1D spectra loaded in dataPlot_loaddata
-        Code taken from runzfit.plotcombinedresults on 141024 and modified.
-
-        Eazydicfile ends on MACS1423.8+2404_00111_EAZYzfit_all.pickle
+        Update the legend with the redshift of the slider once it has stopped moving
+        """
+        self.DPzafter = None
+        if self.DPartists is None: return
+        self.dataPlot_legend(float(self.varsliderz.get()))
+        self.dataPlot_canvas.draw_idle()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def dataPlot_build(self,verbose=False):
+        """
+        Clear the data plot and create the artists for the spectra, GiG line markers, zfit models and
+        emission lines of the current object. The artists are stored in self.DPartists and updated by
+        dataPlot_plot when the sliders or check boxes change.
 
         """
-        self.dataPlot_fig.canvas.set_window_title('GLASS 1D spectra of object '+str(self.currentobj))
-        xlow, xhigh, ylow, yhigh = self.dataPlot_getwindowinfo()
-        if fullzoom:
-            xlow, xhigh, ylow, yhigh =  self.DPxlow_full, self.DPxhigh_full, self.DPylow_full, self.DPyhigh_full
-        #----------------- Define emission line list -----------------
-        #Lines from http://www.sdss.org/dr7/algorithms/linestable.html and
-        # http://adsabs.harvard.edu/abs/2008ApJS..174..282L
-        linelist = np.asarray([1216 ,1335 ,1402  ,1549 ,1908. ,2795. ,3726.03 ,
-                    4101.74   ,4340.47  ,4861.33 ,4959.,5007. ,
-                    6548, 6562.8, 6583.5,
-                    6718,6732,
-                    9071.1,   9533.2])
-        linename = ['Lya','CII','SiIV','CIV','CIII]','MgII',"[OII]" ,
-                    '$H\delta$','H$\gamma$','H$\\beta$',''   ,'[OIII]',
-                    ''  ,'H$\\alpha$+NII',' '   ,
-                    ' ' ,'SII',
-                    '[SIII]','[SIII]']
+        self.DPtitlevar.set('GLASS 1D spectra of object '+str(self.currentobj))
         #----------------- Refreshing plot window-----------------
-        if refresh:
-            self.dataPlot_fig.clf() # clearing figure
-            self.dataPlot_ax     = self.dataPlot_fig.add_subplot(111)
-        #----------------- Grab infor from sliders -----------------
-        smoothlevel  = float(self.varslidersmooth.get())
-        if verbose: print ' - Grabbed the Gauss smooth level ',smoothlevel,' from the slider'
-        redshift     = float(self.varsliderz.get())
-        if verbose: print ' - Grabbed the redshift ',redshift,' from the slider'
-
-        try:
-            zbyhand      = float(self.byhandz.get())
-            if type(zbyhand) == float:
-                redshift = zbyhand
-                if verbose: print '   But the redshift',zbyhand,'was found in "by-hand" field so using that instead '
-            self.varsliderz.set(zbyhand)
-        except:
-            pass
+        self.dataPlot_fig.clf() # clearing figure
+        self.dataPlot_ax     = self.dataPlot_fig.add_subplot(111)
 
-        #----------------- Flambda spec -----------------
+        linelist   = self.DPlinelist
+        linename   = self.DPlinename
         xrangeflam = self.DPxrange
-        ymax   = []
-        ymin   = []
+        ymax       = []
+        ymin       = []
+        self.DPartists = {'spectra':[], 'zlines':None, 'ztexts':[], 'legend':[], 'smoothlevel':None}
 
+        #----------------- Flambda spec -----------------
         for ii in range(self.DPNfiles):
-            dat1D   = pyfits.open(self.DPfits1D[ii])[1].data
+            spec1D  = self.DPspec[ii] # loaded in dataPlot_loaddata
+            if spec1D is None: continue
             if ('G102' in self.DPfits1D[ii]) or ('g102' in self.DPfits1D[ii]):
-                goodent = np.where((dat1D['WAVE'] > self.DPg102range_full[0]) &
-                                   (dat1D['WAVE'] < self.DPg102range_full[1]))[0]
+                grism   = 'G102'
                 color   = self.DPg102col[0]
                 if len(self.DPPAs) == 2:
                     if '-'+self.DPPAs[1]+'-' in self.DPfits1D[ii]: color = self.DPg102col[1] # second PA color
             elif ('G141' in self.DPfits1D[ii]) or 'g141' in self.DPfits1D[ii]:
-                goodent = np.where((dat1D['WAVE'] > self.DPg141range_full[0]) &
-                                   (dat1D['WAVE'] < self.DPg141range_full[1]))[0]
+                grism   = 'G141'
                 color   = self.DPg141col[0]
                 if len(self.DPPAs) == 2:
                     if '-'+self.DPPAs[1]+'-' in self.DPfits1D[ii]: color = self.DPg141col[1] # second PA color
 
+            goodent = spec1D['goodent']
+            wave1D  = spec1D['wave']
+            flux1D  = spec1D['flux']
+
+            if len(flux1D) < 1: continue
+
+            spec = {'file':self.DPfits1D[ii], 'flux':flux1D, 'GiG':[], 'GiGartists':[], 'modelartists':[], 'modellegend':[], 'zfitlegend':[]}
+            self.DPartists['spectra'].append(spec)
+
+            self.dataPlot_ax.plot(wave1D, flux1D, color=color,linestyle='-',
+                                  linewidth=self.DPlwidth*1.5, alpha=0.2)
+
+            if spec1D['fluxmax'] is not None:
+                ymax.append(spec1D['fluxmax'])
+                ymin.append(spec1D['fluxmin'])
+
+            # Smoothed version (data set by dataPlot_plot)
+            spec['smooth'] = self.dataPlot_ax.plot(wave1D, flux1D, color=color,linestyle='-',
+                                                   linewidth=self.DPlwidth*1.5, alpha=0.7)[0]
+
+            frange  = [np.min(flux1D),np.max(flux1D)]
+            dfrange = np.max(flux1D)-np.min(flux1D)
+
+            # ======= GiG catalog lines if any there for object =======
+            if (self.GiGf != None):
+                objPA = float(self.DPPAs[0])
+                if (len(self.DPPAs) == 2):
+                    if ('-'+self.DPPAs[1]+'-' in self.DPfits1D[ii]): # 2nd PA
+                        objPA = float(self.DPPAs[1])
+
+                GiGkey = (self.currentobj,objPA)
+                if GiGkey in self.GiGlinewaves: # wavelengths parsed by vi.load_GiGcatalog
+                    GiGwaves = self.GiGlinewaves[GiGkey][grism]
+                    for wave in GiGwaves:
+                        dwave  = np.abs(wave1D-wave/self.DPxscale)
+                        GiGent = np.where(dwave == np.min(dwave))[0]
+                        GiGline = self.dataPlot_ax.plot(np.zeros(len(GiGent))+wave/self.DPxscale,
+                                                        flux1D[GiGent],marker='o',linestyle='',
+                                                        markerfacecolor=color,markeredgecolor='black',
+                                                        markeredgewidth=self.DPlwidth/1.5,
+                                                        markersize=8)[0]
+                        spec['GiG'].append((GiGline,GiGent))
+                        spec['GiGartists'].append(GiGline)
+                    if len(GiGwaves) == 0: # No lines marked
+                        if verbose:
+                            print ' - No '+grism+' line wavelengths found for',self.currentobj,'at PA =',objPA
+                        textpos = wave1D[int(len(wave1D)/2.)]
+                        if (textpos > xrangeflam[0]) & (textpos < xrangeflam[1]):
+                            ypos = flux1D[wave1D == textpos]
+                            GiGtext = self.dataPlot_ax.text(textpos,ypos,
+                                                            'No line wavelengths found in GiG catalog',
+                                                            color=color,size=self.DPFsize-3.,
+                                                            horizontalalignment='center',
+                                                            verticalalignment='center',alpha=0.8)
+                            spec['GiGartists'].append(GiGtext)
+                else:
+                    if verbose: print ' - No entry for',self.currentobj,'at PA =',objPA,'in GiG catalog'
 
-            wave1D = dat1D['WAVE'][goodent]/self.DPxscale
-            flux1D = (dat1D['FLUX'][goodent] - dat1D['CONTAM'][goodent])/dat1D['SENSITIVITY'][goodent]
-
-            if len(flux1D) >= 1:
-                self.dataPlot_ax.plot(wave1D, flux1D, color=color,linestyle='-',
-                                      linewidth=self.DPlwidth*1.5, alpha=0.2)
-
-                ymax.append(np.max(dat1D['FLUX'][(dat1D['WAVE'] > self.DPg102range_cut[0]) &
-                                                 (dat1D['WAVE'] < self.DPg102range_cut[1])]))
-                ymin.append(np.min(dat1D['FLUX'][(dat1D['WAVE'] > self.DPg102range_cut[0]) &
-                                                 (dat1D['WAVE'] < self.DPg102range_cut[1])]))
-
-                # Smoothed versions
-                filtersigma   = smoothlevel
-                flux1D_smooth = scipy.ndimage.filters.gaussian_filter1d(flux1D, filtersigma,cval=0.0)
-                self.dataPlot_ax.plot(wave1D, flux1D_smooth, color=color,linestyle='-',
-                                      linewidth=self.DPlwidth*1.5, alpha=0.7)
-
-                frange  = [np.min(flux1D),np.max(flux1D)]
-                dfrange = np.max(flux1D)-np.min(flux1D)
-
-                # ======= Plotting the GiG catalog lines if any there for object =======
-                if (self.GiGf != None) & (self.GiGlinesboxvar.get() != '0'):
-                    objPA = float(self.DPPAs[0])
-                    if (len(self.DPPAs) == 2):
-                        if ('-'+self.DPPAs[1]+'-' in self.DPfits1D[ii]): # 2nd PA
-                            objPA = float(self.DPPAs[1])
-
-                    if ('G102' in self.DPfits1D[ii]) or ('g102' in self.DPfits1D[ii]):
-                        ents = np.where((self.GiGdata['ID'] == self.currentobj) &
-                                        (self.GiGdata['PA'] == objPA) ) # first PA match
-
-                        if (len(ents[0]) > 0):
-                            for ent in ents:
-                                objGiGdat = self.GiGlines[ent+3]
-                                G102waves = objGiGdat.split('#G102wave#')[-1].split('#G141wave#')[0].replace(',',' ').split()
-                                for wave in G102waves:
-                                    wave = float(wave)
-                                    if wave < 2.0: wave = wave*1.e4 # in case of wave given in micron
-                                    dwave = np.abs(wave1D-wave/self.DPxscale)
-                                    GiGlineflux = flux1D_smooth[dwave == np.min(dwave)]
-                                    self.dataPlot_ax.plot(wave/self.DPxscale,GiGlineflux,marker='o',
-                                                          markerfacecolor=color,markeredgecolor='black',
-                                                          markeredgewidth=self.DPlwidth/1.5,
-                                                          markersize=8)
-                                if len(G102waves) == 0: # No G102 lines marked
-                                    if verbose:
-                                        print ' - No G102 line wavelengths found for',self.currentobj,'at PA =',objPA
-                                    textpos = wave1D[int(len(wave1D)/2.)]
-                                    if (textpos > xrangeflam[0]) & (textpos < xrangeflam[1]):
-                                        ypos = flux1D[wave1D == textpos]
-                                        self.dataPlot_ax.text(textpos,ypos,
-                                                              'No line wavelengths found in GiG catalog',
-                                                              color=color,size=self.DPFsize-3.,
-                                                              horizontalalignment='center',
-                                                              verticalalignment='center',alpha=0.8)
-                        else:
-                            if verbose: print ' - No entry for',self.currentobj,'at PA =',objPA,'in GiG catalog'
-
-
-
-                    if ('G141' in self.DPfits1D[ii]) or ('g141' in self.DPfits1D[ii]):
-                        ents = np.where((self.GiGdata['ID'] == self.currentobj) &
-                                        (self.GiGdata['PA'] == objPA) ) # first PA match
-
-                        if (len(ents[0]) > 0):
-                            for ent in ents:
-                                objGiGdat = self.GiGlines[ent+3]
-                                G141waves = objGiGdat.split('#G141wave#')[-1].split('#C#')[0].replace(',',' ').split()
-                                for wave in G141waves:
-                                    wave = float(wave)
-                                    if wave < 2.0: wave = wave*1.e4 # in case of wave given in micron
-                                    dwave = np.abs(wave1D-wave/self.DPxscale)
-                                    GiGlineflux = flux1D_smooth[dwave == np.min(dwave)]
-                                    self.dataPlot_ax.plot(wave/self.DPxscale,GiGlineflux,marker='o',
-                                                          markerfacecolor=color,markeredgecolor='black',
-                                                          markeredgewidth=self.DPlwidth/1.5,
-                                                          markersize=8)
-                                if len(G141waves) == 0: # No G141 lines marked
-                                    if verbose:
-                                        print ' - No G141 line wavelengths found for',self.currentobj,'at PA =',objPA
-                                    textpos = wave1D[int(len(wave1D)/2.)]
-                                    if (textpos > xrangeflam[0]) & (textpos < xrangeflam[1]):
-                                        ypos = flux1D[wave1D == textpos]
-                                        self.dataPlot_ax.text(textpos,ypos,
-                                                              'No line wavelengths found in GiG catalog',
-                                                              color=color,size=self.DPFsize-3.,
-                                                              horizontalalignment='center',
-                                                              verticalalignment='center',alpha=0.8)
-                        else:
-                            if verbose: print ' - No entry for',self.currentobj,'at PA =',objPA,'in GiG catalog'
-
-            # ======= Plot zfit models on top of spectra =======
-            if self.eazydicexists & (self.modelboxvar.get() == '0') & (self.goodzfitload == True):
-                # plot wavelength solutions for zfit
+            # ======= zfit models on top of spectra =======
+            if self.eazydicexists & (self.goodzfitload == True):
+                # wavelength solutions for zfit
                 ent = np.where(self.zfitdataALL['f0'] == self.DPfits1D[ii].split('/')[-1].split('.1D.')[0])
-                if len(ent[0]) == 0:
-                    pass
-                else:
+                if len(ent[0]) > 0:
                     zfitredshift = self.zfitdataALL['f6'][ent]
                     for ll in range(len(linelist)):
-                        try:
-                            self.dataPlot_ax.plot(np.zeros(2)+linelist[ll]/self.DPxscale*(zfitredshift+1.0),
-                                                  frange,color=color,alpha=0.6,
-                                                  linestyle='--',linewidth=self.DPlwidth)
-                            textpos = linelist[ll]/self.DPxscale*(zfitredshift+1.0)
-                        except:
-                            pdb.set_trace()
+                        textpos = linelist[ll]/self.DPxscale*(zfitredshift+1.0)
+                        spec['modelartists'].append(self.dataPlot_ax.plot(np.zeros(2)+textpos,
+                                                                          frange,color=color,alpha=0.6,
+                                                                          linestyle='--',linewidth=self.DPlwidth)[0])
 
                         if (textpos > xrangeflam[0]) & (textpos < xrangeflam[1]):
-                            self.dataPlot_ax.text(textpos,frange[0]+dfrange*0.05,
-                                                  linename[ll],color=color,size=self.DPFsize-3.,
-                                                  rotation='vertical',horizontalalignment='right',
-                                                  verticalalignment='bottom',alpha=0.6)
-
-                    # plot model for given redshift
+                            spec['modelartists'].append(self.dataPlot_ax.text(textpos,frange[0]+dfrange*0.05,
+                                                                              linename[ll],color=color,
+                                                                              size=self.DPFsize-3.,
+                                                                              rotation='vertical',
+                                                                              horizontalalignment='right',
+                                                                              verticalalignment='bottom',
+                                                                              alpha=0.6))
+
+                    # model for given redshift
                     oned_wave = self.eazydic[self.DPfits1D[ii].split('/')[-1].replace('.1D.','.2D.')+'_oned_wave']
                     model_1D  = self.eazydic[self.DPfits1D[ii].split('/')[-1].replace('.1D.','.2D.')+'_model_1D']/\
-                                dat1D['SENSITIVITY']
+                                spec1D['sensitivity']
                     if oned_wave[0] != -99:
-                        self.dataPlot_ax.plot(oned_wave[goodent]/self.DPxscale, model_1D[goodent],
-                                              color='white',linestyle='-',
-                                              linewidth=self.DPlwidth*2,alpha=1.0,zorder=50+ii,)
-
-                        self.dataPlot_ax.plot(oned_wave[goodent]/self.DPxscale, model_1D[goodent],
-                                              color=color,linestyle='-',
-                                              linewidth=self.DPlwidth,alpha=1.0,zorder=50+ii,
-                                              label='zfit model (zfit='+str("%.3f" % zfitredshift)+')')
-
-            if self.eazydicexists & (self.modelboxvar.get() == '1'): # add legend if no models shown
+                        spec['modelartists'].append(self.dataPlot_ax.plot(oned_wave[goodent]/self.DPxscale,
+                                                                          model_1D[goodent],
+                                                                          color='white',linestyle='-',
+                                                                          linewidth=self.DPlwidth*2,alpha=1.0,
+                                                                          zorder=50+ii)[0])
+
+                        modelline = self.dataPlot_ax.plot(oned_wave[goodent]/self.DPxscale, model_1D[goodent],
+                                                          color=color,linestyle='-',
+                                                          linewidth=self.DPlwidth,alpha=1.0,zorder=50+ii,
+                                                          label='zfit model (zfit='+str("%.3f" % zfitredshift)+')')[0]
+                        spec['modelartists'].append(modelline)
+                        spec['modellegend'].append(modelline)
+
+            if self.eazydicexists: # legend entry used if no models shown
                 ent = np.where(self.zfitdataALL['f0'] == self.DPfits1D[ii].split('/')[-1].split('.1D.')[0])
-                zfitredshift = self.zfitdataALL['f6'][ent]
-                self.dataPlot_ax.plot([],[],color=color,linestyle='-',linewidth=self.DPlwidth,
-                                            alpha=1.0,label='zfit ='+str("%.3f" % zfitredshift))
+                if len(ent[0]) > 0:
+                    zfitredshift = self.zfitdataALL['f6'][ent]
+                    spec['zfitlegend'].append(Line2D([],[],color=color,linestyle='-',linewidth=self.DPlwidth,
+                                                     alpha=1.0,label='zfit ='+str("%.3f" % zfitredshift)))
 
-        # set ranges based on spectra
+        # ranges based on spectra
         if (len(ymin) != 0) & (len(ymax) != 0):
             yrangeflam = [0.95*min(ymin), 1.05*max(ymax)]
             if yrangeflam[0] < -0.01: yrangeflam[0] = -0.01
             if yrangeflam[1] >  10.0: yrangeflam[1] =  10.0
         else:
             yrangeflam = 0.0, 1.0
-        if not newobj: # only check window if not plotting new object
-            if (ylow != yrangeflam[0]) or (yhigh != yrangeflam[1]):
-                yrangeflam = [ylow,yhigh]
-        Dyrange    = yrangeflam[1]-yrangeflam[0]
-        self.dataPlot_ax.set_ylim(yrangeflam)
-
-        if not newobj: # only check window if not plotting new object
-            if (xlow != xrangeflam[0]) or (xhigh != xrangeflam[1]):
-                xrangeflam = [xlow,xhigh]
-        self.dataPlot_ax.set_xlim(xrangeflam)
-        self.dataPlot_ax.fill_between([1.105,1.16],[yrangeflam[0],yrangeflam[0]],[yrangeflam[1],yrangeflam[1]],
-                                      alpha=0.20,color='k')
+        self.DPartists['yrange'] = yrangeflam
+        self.dataPlot_ax.axvspan(1.105,1.16,alpha=0.20,color='k')
 
         if self.latex:
             xlab = '$\lambda / [\mu\mathrm{m}]$'
@@ -2505,37 +5213,30 @@ class Application_z(Frame):
         self.dataPlot_ax.set_xlabel(xlab)
         self.dataPlot_ax.set_ylabel(ylab)
 
-        self.dataPlotManager.canvas.draw()
-
-        # === plot emission lines for scale ===
+        # === emission lines for scale (positioned by dataPlot_setz and blitted when moving the slider) ===
+        self.DPartists['zlines'] = LineCollection([],colors='#006600',alpha=0.7,
+                                                  linestyles='solid',linewidths=self.DPlwidth,animated=True)
+        self.dataPlot_ax.add_collection(self.DPartists['zlines'])
         for ii in range(len(linelist)):
-            self.dataPlot_ax.plot(np.zeros(2)+linelist[ii]/self.DPxscale*(redshift+1.0),
-                                  yrangeflam,color='#006600',alpha=0.7,
-                                  linestyle='-',linewidth=self.DPlwidth)
-            textpos = linelist[ii]/self.DPxscale*(redshift+1.0)
-
-            if (textpos > xrangeflam[0]) & (textpos < xrangeflam[1]):
-                self.dataPlot_ax.text(textpos,yrangeflam[0]+Dyrange*0.05,
-                                      linename[ii],color='#006600',size=self.DPFsize-3.,rotation='vertical',
-                                      horizontalalignment='right',verticalalignment='bottom')
+            ztext = self.dataPlot_ax.text(0.0,yrangeflam[0],
+                                          linename[ii],color='#006600',size=self.DPFsize-3.,rotation='vertical',
+                                          horizontalalignment='right',verticalalignment='bottom',animated=True)
+            self.DPartists['ztexts'].append(ztext)
 
         # === position legend ===
         box = self.dataPlot_ax.get_position()
         self.dataPlot_ax.set_position([box.x0, box.y0, box.width, box.height * 0.83])
-        self.dataPlot_ax.plot(0,0,'orange',label='G102 PA='+self.DPPAs[0],linewidth=self.DPlwidth*2)
-        self.dataPlot_ax.plot(0,0,'red',label='G141 PA='+self.DPPAs[0],linewidth=self.DPlwidth*2)
+        legend = self.DPartists['legend']
+        legend.append(Line2D([],[],color='orange',label='G102 PA='+self.DPPAs[0],linewidth=self.DPlwidth*2))
+        legend.append(Line2D([],[],color='red',label='G141 PA='+self.DPPAs[0],linewidth=self.DPlwidth*2))
         if len(self.DPPAs) == 2:
-            self.dataPlot_ax.plot(0,0,'cyan',label='G102 PA='+self.DPPAs[1],linewidth=self.DPlwidth*2)
-            self.dataPlot_ax.plot(0,0,'magenta',label='G141 PA='+self.DPPAs[1],linewidth=self.DPlwidth*2)
-        self.dataPlot_ax.plot(0,0,'green',label='Lines at z='+str("%.3f" % redshift),linewidth=self.DPlwidth*2)
-        if (self.GiGf != None) & (self.GiGlinesboxvar.get() != '0'):
-            self.dataPlot_ax.plot(0,0,label='GiG marked lines',marker='o',markerfacecolor='white',linestyle='',
-                                  markeredgecolor='black',markeredgewidth=self.DPlwidth/1.5,markersize=8)
-        leg = self.dataPlot_ax.legend(fancybox=True, loc='upper center',numpoints=1,prop={'size':self.DPFsize-3.},
-                                      ncol=5,bbox_to_anchor=(0.5, 1.27))
-        #leg.get_frame().set_alpha(0.7)
-
-        self.dataPlotManager.canvas.draw()
+            legend.append(Line2D([],[],color='cyan',label='G102 PA='+self.DPPAs[1],linewidth=self.DPlwidth*2))
+            legend.append(Line2D([],[],color='magenta',label='G141 PA='+self.DPPAs[1],linewidth=self.DPlwidth*2))
+        self.DPartists['zlegend'] = Line2D([],[],color='green',label='Lines at z=',linewidth=self.DPlwidth*2)
+        legend.append(self.DPartists['zlegend'])
+        self.DPartists['GiGlegend'] = Line2D([],[],label='GiG marked lines',marker='o',markerfacecolor='white',
+                                             linestyle='',markeredgecolor='black',
+                                             markeredgewidth=self.DPlwidth/1.5,markersize=8)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def dataPlot_getwindowinfo(self):
         """
@@ -2566,6 +5267,44 @@ class Application_z(Frame):
         self.comments2 = Entry(self)
         self.comments2.grid(row=position[0],column=position[1]+position[2],columnspan=position[2],sticky=W)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def getpngs(self,objid):
+        """
+        Return the pngs of an object, the pngs ordered for display and the image to show in the GUI
+        """
+        idstr     = str("%05d" % objid)
+        pngs      = vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*.png')+\
+                    vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*.pdf')
+
+        # order the pngs to display
+        G102_1D = [name for name in pngs if "G102.1D.png" in name]
+        G102_2D = [name for name in pngs if "G102.2D.png" in name]
+        G141_1D = [name for name in pngs if "G141.1D.png" in name]
+        G141_2D = [name for name in pngs if "G141.2D.png" in name]
+        G800_1D = [name for name in pngs if "G800L.1D.png" in name]
+        G800_2D = [name for name in pngs if "G800L.2D.png" in name]
+        zfit    = [name for name in pngs if "zfit" in name]
+        stack   = [name for name in pngs if "stack" in name]
+        mosaic  = [name for name in pngs if "mosaic" in name]
+        pngorderedlist = G102_1D + G102_2D + G141_1D + G141_2D + G800_1D + G800_2D + zfit + stack + mosaic
+        remaining      = list(set(pngs) - set(pngorderedlist)) # get files not accounted for above
+        pngorderedlist = pngorderedlist #+ remaining
+
+        # Get the in-GUI image
+        GUIimage = None
+        for png in pngs:
+            if (self.inGUIimage == 'zfit') & ('zfitplot.png' in png):
+                GUIimage  = png
+            if (self.inGUIimage == 'G102stack') & \
+                    (('G102_stack.png' in png) or ('g102_'+self.MASTversion+'_2dstack.png' in png)):
+                GUIimage  = png
+            if (self.inGUIimage == 'G141stack') & \
+                    (('G141_stack.png' in png) or ('g141_'+self.MASTversion+'_2dstack.png' in png)):
+                GUIimage  = png
+        if (GUIimage == None) & (len(pngorderedlist) > 0):  # if requested image not found use first png instead
+            GUIimage = pngorderedlist[0]
+
+        return pngs, pngorderedlist, GUIimage
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openpngs(self,objid=None):
         """
         Function to open pngs of object
@@ -2575,27 +5314,13 @@ class Application_z(Frame):
         else:
             id = objid
         idstr     = str("%05d" % id)
-        self.pngs = glob.glob(self.dir+'*'+idstr+'*.png')+glob.glob(self.dir+'*'+idstr+'*.pdf')
+        self.pngs, pngorderedlist, self.GUIimage = self.getpngs(id)
         if len(self.pngs) == 0:
             sys.exit(' - Did not find any png files to open. Looked for '+
                      self.dir+'*'+idstr+'*.png  --> ABORTING')
 
         self.file = self.pngs[0].split('/')[-1]
 
-        # order the pngs to display
-        G102_1D = [name for name in self.pngs if "G102.1D.png" in name]
-        G102_2D = [name for name in self.pngs if "G102.2D.png" in name]
-        G141_1D = [name for name in self.pngs if "G141.1D.png" in name]
-        G141_2D = [name for name in self.pngs if "G141.2D.png" in name]
-        G800_1D = [name for name in self.pngs if "G800L.1D.png" in name]
-        G800_2D = [name for name in self.pngs if "G800L.2D.png" in name]
-        zfit    = [name for name in self.pngs if "zfit" in name]
-        stack   = [name for name in self.pngs if "stack" in name]
-        mosaic  = [name for name in self.pngs if "mosaic" in name]
-        pngorderedlist = G102_1D + G102_2D + G141_1D + G141_2D + G800_1D + G800_2D + zfit + stack + mosaic
-        remaining      = list(set(self.pngs) - set(pngorderedlist)) # get files not accounted for above
-        pngorderedlist = pngorderedlist #+ remaining
-
         self.plat = sys.platform
         if self.plat == 'darwin':
             import platform
@@ -2607,44 +5332,35 @@ class Application_z(Frame):
         elif self.plat == 'linux2' or 'Linux':
             opencmd = 'gthumb '+' '.join(pngorderedlist)+' &'
 
-        # Update the in-GUI image
-        self.GUIimage = None
-        for png in self.pngs:
-            if (self.inGUIimage == 'zfit') & ('zfitplot.png' in png):
-                self.GUIimage  = png
-            if (self.inGUIimage == 'G102stack') & \
-                    (('G102_stack.png' in png) or ('g102_'+self.MASTversion+'_2dstack.png' in png)):
-                self.GUIimage  = png
-            if (self.inGUIimage == 'G141stack') & \
-                    (('G141_stack.png' in png) or ('g141_'+self.MASTversion+'_2dstack.png' in png)):
-                self.GUIimage  = png
-        if self.GUIimage == None:  # if requested image not found for object use first png figure instead
-            self.GUIimage = pngorderedlist[0]
-
         # Getting number of PAs for current object
+        self.PAs  = self.getPAs(id)
+        self.Npa  = len(self.PAs)
+        if self.plat == 'darwin': # Preview.app is not started as a child of 'open'; found when closing
+            self.pPNG = self.procs.start('png',opencmd,detachedsearch='Preview.app')
+        else:
+            self.pPNG = self.procs.start('png',opencmd)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def getPAs(self,objid):
+        """
+        Return the sorted PAs available for the object
+        """
+        idstr = str("%05d" % objid)
         if self.MASTfiles:
             searchext = '_1d.png'
         else:
             searchext = '.1D.png'
-        twodpng    = glob.glob(self.dir+'*'+idstr+'*'+searchext)
-        self.PAs = np.zeros(len(twodpng))
-        for ii in xrange(len(self.PAs)):
+        twodpng = vi.glob_dirindex(self.dirindex,self.dir+'*'+idstr+'*'+searchext)
+        PAs     = np.zeros(len(twodpng))
+        for ii in xrange(len(PAs)):
             if self.MASTfiles:
                 namesplit = os.path.basename(twodpng[ii]).split('-pa')
-                self.PAs[ii] = namesplit[-1][:3]
+                PAs[ii] = namesplit[-1][:3]
             else:
                 namesplit = os.path.basename(twodpng[ii]).split('-')
-                self.PAs[ii] = int(namesplit[1])
+                PAs[ii] = int(namesplit[1])
                 if namesplit[0] in ['MACS0416.1','MACS2129.4','RXJ1347.5']: # case of names with negative dec
-                    self.PAs[ii] = int(namesplit[2])
-        self.PAs  = np.sort(np.unique(self.PAs)) # Make sure the PAs are sorted
-        self.Npa  = len(self.PAs)
-        self.pPNG = subprocess.Popen(opencmd,shell=True,executable=os.environ["SHELL"])
-        time.sleep(1.1)# sleep to make sure png appear in PIDlist
-        if self.plat == 'darwin':
-            self.pngPID = vi.getPID('Preview.app',verbose=False) # get PID of png process
-        elif self.plat == 'linux2' or 'Linux':
-            self.pngPID = vi.getPID('gthumb',verbose=False)      # get PID of png process
+                    PAs[ii] = int(namesplit[2])
+        return np.sort(np.unique(PAs)) # Make sure the PAs are sorted
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openfits_but(self,position):
         """
@@ -2668,66 +5384,166 @@ class Application_z(Frame):
         lockstr = self.lockds9string()
         ds9cmd  = ' '
 
-        if not self.ds9windowopen:
+        if self.ds9starting:
+            if self.vb: print ' - DS9 is still starting up; the fits files are loaded once it is ready'
+        elif not self.ds9windowopen:
             ds9cmd = ds9cmd+'ds9 -geometry 1200x600 -scale zscale '+\
                      lockstr+' -tile grid layout 4 '+str(2*int(self.Npamax))
-            self.pds9   = subprocess.Popen(ds9cmd,shell=True,executable=os.environ["SHELL"])
-            time.sleep(1.1)# sleep to make sure ds9 appear in PIDlist
-            self.ds9PID = vi.getPID('ds9',verbose=False) # get PID of DS9 process
-            self.ds9windowopen = True
-            time.sleep(1.0)
-            for ii in np.arange(1,17):
-                out = commands.getoutput('xpaset -p ds9 frame new')
-            out = commands.getoutput('xpaset -p ds9 tile')
-
-        Fstart = 1
-        for PA in self.PAs:
+            Nbanks = 1
+            if self.ds9banks: Nbanks = 2
+            for ii in np.arange(1,self.ds9banksize*Nbanks):
+                ds9cmd = ds9cmd+' -frame new'
+            for ff in np.arange(self.ds9banksize+1,self.ds9banksize*Nbanks+1): # hide 2nd bank
+                ds9cmd = ds9cmd+' -frame '+str(ff)+' -frame hide'
+            ds9cmd = ds9cmd+' -frame 1 -tile yes'
+            self.pds9   = self.procs.start('ds9',ds9cmd)
+            self.ds9starting = True # ds9windowopen is set once DS9 answers XPA requests
+            self.waitfords9xpa(self.loadfits_xpa)
+        else:
+            self.loadfits_xpa()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def waitfords9xpa(self,loadcmd,waited=0,probe=None):
+        """
+        Run loadcmd once the newly launched DS9 window accepts XPA commands. The check is run by a
+        background xpaaccess process (vi.ds9xpaprobe) which is polled every 100 ms from the Tk event loop,
+        so the GUI stays responsive while DS9 starts up (also if the XPA name server is slow).
+        """
+        if self.quitting: return
+        if probe is None:
+            probe = vi.ds9xpaprobe()
+            if probe is None:
+                self.ds9starting = False
+                return
+        elif probe.poll() is not None: # probe finished
+            if probe.stdout.read().strip() == 'yes':
+                self.ds9starting   = False
+                self.ds9windowopen = True
+                loadcmd()
+                return
+            probe = None # DS9 not ready yet; probe again
+        if waited < 30000:
+            self.after(100,self.waitfords9xpa,loadcmd,waited+100,probe)
+        else:
+            if probe is not None: probe.kill()
+            self.ds9starting = False
+            print ' - WARNING DS9 did not respond to XPA commands within 30 seconds; not loading fits files'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def loadfits_xpa(self):
+        """
+        Load the fits files of the current object into the open DS9 window via XPA
+
+        With ds9banks=True the object is shown by swapping in the hidden bank of frames if it was
+        preloaded there, and the next object in objlist is preloaded into the bank being hidden.
+        """
+        objstr = 'object '+str("%05d" % self.currentobj)
+        if not self.ds9banks:
+            self.addfits_xpa(self.currentobj,self.PAs,1)
+        else:
+            if self.ds9batch.cancel(): # previous loading interrupted so banks might be incomplete
+                self.ds9bankobj = [None,None]
+
+            if self.ds9bankobj[1-self.ds9bank] == self.currentobj:
+                self.flipds9banks_xpa()
+                objstr = objstr+' (preloaded)'
+            elif self.ds9bankobj[self.ds9bank] != self.currentobj:
+                self.loadbank_xpa(self.ds9bank,self.currentobj,self.PAs)
+
+            objent = np.where(self.objlist == self.currentobj)[0][0]
+            if objent < len(self.objlist)-1:
+                nextobj = self.objlist[objent+1]
+                if self.ds9bankobj[1-self.ds9bank] != nextobj:
+                    self.loadbank_xpa(1-self.ds9bank,nextobj,self.getPAs(nextobj))
+            self.ds9batch.add('frame '+str(self.ds9bank*self.ds9banksize+1))
+
+        batch = self.ds9batch.send()
+        self.reportds9load(batch,objstr)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def addfits_xpa(self,objid,PAs,Fstart):
+        """
+        Add the XPA commands loading the fits files of an object into the DS9 frames
+        starting at Fstart to the batch. Returns the number of the first frame not used.
+        """
+        idstr  = str("%05d" % objid)
+        for PA in PAs:
             PAstr = '-'+str("%03d" % int(PA))+'-'
             if self.MASTfiles:
                 searchexpression = self.dir+'*'+idstr+'*-pa'+PAstr[1:-1]+'_*2d.fits'
             else:
                 searchexpression = self.dir+'*'+PAstr+'*'+idstr+'*2D.fits'
-            fits_2D = glob.glob(searchexpression)
+            fits_2D = vi.glob_dirindex(self.dirindex,searchexpression)
 
             for ii in xrange(len(fits_2D)):
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'DSCI.reg')
                 self.ds9textregion('DSCI PA='+str(int(PA)),filename=regionfile)
-                out = commands.getoutput('xpaset -p ds9 file '+fits_2D[ii]+'[DSCI]')
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+fits_2D[ii]+'[DSCI]')
+                self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'SCI.reg')
                 self.ds9textregion('SCI PA='+str(int(PA)),filename=regionfile)
-                out = commands.getoutput('xpaset -p ds9 file '+fits_2D[ii]+'[SCI]')
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+fits_2D[ii]+'[SCI]')
+                self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'CONTAM.reg')
                 self.ds9textregion('CONTAM PA='+str(int(PA)),filename=regionfile)
-                out = commands.getoutput('xpaset -p ds9 file '+fits_2D[ii]+'[CONTAM]')
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+fits_2D[ii]+'[CONTAM]')
+                self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 regionfile = self.regiontemp.replace('.reg',PAstr+'SCI-CONTAM.reg')
                 self.ds9textregion('SCI-CONTAM PA='+str(int(PA)),filename=regionfile)
                 contamsub = self.subtractcontam(fits_2D[ii]) # creating file with contam. subtracted spectrum
-                out = commands.getoutput('xpaset -p ds9 file '+contamsub)
-                out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                self.ds9batch.add('file '+contamsub)
+                self.ds9batch.add('regions '+regionfile)
 
                 # If a sextractor region file for the SCI-CONTAM image exists, show it.
                 sexregion = fits_2D[ii].split('.fit')[0]+'_SCI-CONTAM.reg'
                 if os.path.exists(sexregion):
-                    out = commands.getoutput('xpaset -p ds9 regions '+sexregion)
+                    self.ds9batch.add('regions '+sexregion)
                 Fstart += 1
                 # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+        return Fstart
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def loadbank_xpa(self,bank,objid,PAs):
+        """
+        Add the XPA commands loading an object into a bank of DS9 frames to the batch
+        """
+        Fstart = bank*self.ds9banksize+1
+        Fend   = self.addfits_xpa(objid,PAs,Fstart)
+        for ff in np.arange(Fend,Fstart+self.ds9banksize): # clear frames left from previous object
+            self.ds9batch.add('frame '+str(ff))
+            self.ds9batch.add('frame clear')
+        self.ds9bankobj[bank] = objid
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def flipds9banks_xpa(self):
+        """
+        Add the XPA commands showing the hidden bank of DS9 frames and hiding the current one to the batch
+        """
+        newbank = 1-self.ds9bank
+        for ff in np.arange(self.ds9banksize):
+            self.ds9batch.add('frame show '+str(newbank*self.ds9banksize+ff+1))
+        for ff in np.arange(self.ds9banksize):
+            self.ds9batch.add('frame hide '+str(self.ds9bank*self.ds9banksize+ff+1))
+        self.ds9bank = newbank
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def reportds9load(self,batch,objstr):
+        """
+        Report the time DS9 spent loading the object once the XPA batch has finished
+        """
+        if batch != self.ds9batch.Nsent: return # superseded by batch for another object
+        if not self.ds9batch.isdone():
+            self.after(50,self.reportds9load,batch,objstr)
+        elif self.vb:
+            print ' - Loaded '+objstr+' into DS9 in '+str("%.2f" % self.ds9batch.loadtime)+' seconds'
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openfits_but_cmd(self):
         """
@@ -2745,7 +5561,7 @@ class Application_z(Frame):
                 searchext = '2d.fits'
             else:
                 searchext = '2D.fits'
-            fits_2D = glob.glob(self.dir+'*'+PAstr+'*'+idstr+'*'+searchext)
+            fits_2D = vi.glob_dirindex(self.dirindex,self.dir+'*'+PAstr+'*'+idstr+'*'+searchext)
             for ii in xrange(len(fits_2D)):
                 regionfile = self.regiontemp.replace('.reg',PAstr+'DSCI.reg')
                 self.ds9textregion('DSCI PA='+str(int(PA)),filename=regionfile)
@@ -2769,9 +5585,7 @@ class Application_z(Frame):
                 if os.path.exists(sexregion):
                     ds9cmd = ds9cmd+' -region '+sexregion+' '
 
-        self.pds9   = subprocess.Popen(ds9cmd,shell=True,executable=os.environ["SHELL"])
-        time.sleep(1.1)# sleep to make sure ds9 appear in PIDlist
-        self.ds9PID = vi.getPID('ds9',verbose=False) # get PID of DS9 process
+        self.pds9   = self.procs.start('ds9',ds9cmd)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def lockds9string(self):
         """
@@ -2799,9 +5613,50 @@ class Application_z(Frame):
         """
         update image in GUI
         """
-        img = ImageTk.PhotoImage(Image.open(self.GUIimage).resize((self.imgx,self.imgy),Image.ANTIALIAS))
+        if self.GUIimage in self.prefetchphotos: # PhotoImage already prepared in the background
+            img = self.prefetchphotos.pop(self.GUIimage)
+        elif self.prefetcher is not None:
+            img = ImageTk.PhotoImage(self.prefetcher.get(self.GUIimage,(self.imgx,self.imgy)))
+        else:
+            img = ImageTk.PhotoImage(vi.loadGUIimage(self.GUIimage,(self.imgx,self.imgy),thumbcache=self.thumbcache))
         self.imageframe.configure(image = img)
         self.imageframe.image = img
+        self.prefetchimages()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def prefetchimages(self):
+        """
+        Queue the in-GUI images of the next objects in objlist for decoding in the background
+        """
+        if self.prefetcher is None: return
+
+        objent   = np.where(self.objlist == self.currentobj)[0][0]
+        upcoming = []
+        for objid in self.objlist[objent+1:objent+1+self.prefetch]:
+            GUIimage = self.getpngs(objid)[2]
+            if GUIimage is not None:
+                self.prefetcher.request(GUIimage,(self.imgx,self.imgy))
+                upcoming.append(GUIimage)
+
+        for png in self.prefetchphotos.keys(): # drop PhotoImages no longer ahead of current object
+            if png not in upcoming: del self.prefetchphotos[png]
+        self.prefetchupcoming = upcoming
+
+        if self.prefetchafter is not None: self.after_cancel(self.prefetchafter)
+        self.prefetchafter = self.after(100,self.prefetchphotoimages)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def prefetchphotoimages(self):
+        """
+        Turn the images prepared by the prefetcher into PhotoImages while the GUI is idle
+        """
+        self.prefetchafter = None
+        pending = False
+        for png in self.prefetchupcoming:
+            if png in self.prefetchphotos: continue
+            if self.prefetcher.isready(png,(self.imgx,self.imgy)):
+                self.prefetchphotos[png] = ImageTk.PhotoImage(self.prefetcher.get(png,(self.imgx,self.imgy)))
+            elif self.prefetcher.ispending(png,(self.imgx,self.imgy)):
+                pending = True
+        if pending: self.prefetchafter = self.after(100,self.prefetchphotoimages)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def reset(self,skip=False):
         """
@@ -2809,7 +5664,7 @@ class Application_z(Frame):
 
         if skip=True nothing will be written to output file.
         """
-        if (self.autosaveplot) & (skip==False): self.dataPlot_savebutton_cmd() # saving plot before resetting
+        if (self.autosaveplot) & (skip==False): self.dataPlot_autosave() # saving plot before resetting
 
         try: # checking that the input can be converted to a float
             zbyhand      = str(float(self.byhandz.get()))+' '
@@ -2888,9 +5743,8 @@ class Application_z(Frame):
                 self.fout.write(str(resultstr))
             if resultstr == defaultstr: skip = skipin # restoring original skip value
 
-        # --- close and re-open output file so inspection is saved ---
-        self.fout.close()
-        self.fout = open(self.outfile,'a')
+        # --- make sure inspection is saved ---
+        self.fout.commit()
 
         # --- resetting widgets and closing windows ---
         self.comments.delete(0,END) # reset comment field
@@ -2915,27 +5769,14 @@ class Application_z(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def removeoutputduplicate(self,id,pa):
         """
-        Subtract continuum from science fram
+        Remove earlier entries of the object and PA from the output. The entries are flagged in the
+        output journal and removed from the file when it is compacted (on quit).
         """
-        self.fout.close()
         idstr       = str("%.5d" % id)
         pastr       = str("%.3d" % pa)
-        stringstart = ' '+idstr+' '+pastr
-        file        = open(self.outfile,'r')
-        lines       = file.readlines()
-        file.close()
-        file = open(self.outfile,"w")
-
-        Ndup        = 0
-        for line in lines:
-            if line[0:10] != stringstart:
-                file.write(line)
-            else:
-                if self.vb: print ' - Found dublicate entry for ID '+idstr+' PA '+pastr+' deleting it!'
-                Ndup = Ndup+1
-
-        file.close()
-        self.fout = open(self.outfile,'a')
+        Ndup        = self.fout.supersede((idstr,pastr))
+        if (Ndup > 0) & self.vb: print ' - Found '+str(Ndup)+' dublicate entries for ID '+idstr+' PA '+pastr+\
+                                       ' deleting them!'
         return Ndup
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def closewindows(self):
@@ -2945,17 +5786,13 @@ class Application_z(Frame):
         killsignal = 1     # see bash> man kill
         PIDkill    = True
         if PIDkill:
-            try:
-                os.kill(self.pngPID,killsignal)                  # close PNG window for currentobj
-            except:
+            if not self.procs.close('png',killsignal):        # close PNG window for currentobj
                 print '   WARNING error occurred while trying to close PNG window(s)'
 
             if np.logical_or(((self.ds9open == True) & (self.xpa == False)),
-                             ((self.xpa == True) & (self.quitting == True) & (self.ds9windowopen == True))):
-                try:
-                    os.kill(self.ds9PID,killsignal)                  # close DS9 window for currentobj
-                except:
-                    if self.vb: print ' - WARNING: Could not kill DS9 process id ',self.ds9PID
+                             ((self.xpa == True) & (self.quitting == True) & (self.ds9windowopen or self.ds9starting))):
+                if not self.procs.close('ds9',killsignal):     # close DS9 window for currentobj
+                    if self.vb: print ' - WARNING: Could not close DS9 window (already closed?)'
                 rmout = commands.getoutput('rm '+self.regiontemp.replace('.reg','*.reg')) # removing ds9 region file
         else:
             print '=== WHAT ARE YOU DOING HERE?? ==='
@@ -2986,7 +5823,7 @@ class Application_z(Frame):
 
             # load new data for plot and replot
             self.dataPlot_loaddata()
-            self.dataPlot_plot(refresh=True,newobj=True)
+            self.dataPlot_plot(newobj=True)
             self.DPxlow_full, self.DPxhigh_full, self.DPylow_full, self.DPyhigh_full = \
                 self.dataPlot_getwindowinfo() # store full window
 
@@ -3022,7 +5859,7 @@ class Application_z(Frame):
 
             # load new data for plot and replot
             self.dataPlot_loaddata()
-            self.dataPlot_plot(refresh=True,newobj=True)
+            self.dataPlot_plot(newobj=True)
             self.DPxlow_full, self.DPxhigh_full, self.DPylow_full, self.DPyhigh_full = \
                 self.dataPlot_getwindowinfo() # store full window
 
@@ -3056,7 +5893,7 @@ class Application_z(Frame):
 
             # load new data for plot and replot
             self.dataPlot_loaddata()
-            self.dataPlot_plot(refresh=True,newobj=True)
+            self.dataPlot_plot(newobj=True)
             self.DPxlow_full, self.DPxhigh_full, self.DPylow_full, self.DPyhigh_full = \
                 self.dataPlot_getwindowinfo() # store full window
 
@@ -3083,7 +5920,14 @@ class Application_z(Frame):
         self.quitting = True
         self.fout.close()
         self.closewindows()
-        self.dataPlotManager.destroy()
+        if self.prefetcher is not None: self.prefetcher.stop()
+        self.dataPlot_frame.destroy()
+        if self.plotwriter is not None: # let the background process finish the autosaved plots
+            vi.send_GiGz_plotwriter(self.plotwriter,None)
+            self.plotwriter.stdin.close()
+            self.plotwriter.wait()
+        if self.vb: print self.smoothcache.report()
+        if self.vb & (self.thumbcache is not None): print self.thumbcache.report()
         if self.outcheck: self.checkoutput()
         self.quit()
         if self.vb: print ' - Quit GiGz successfully'
@@ -3103,21 +5947,9 @@ class Application_z(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def subtractcontam(self,twodfits):
         """
-        Subtract continuum from science fram
+        Subtract continuum from science fram (see vi.precompute_subtractcontam to generate all files beforehand)
         """
-        filename, fileext =  os.path.splitext(twodfits)
-        output = filename+'_SCI-CONTAM'+fileext
-
-        if os.path.isfile(output): # check if file already exists
-            if self.vb: print ' - ',output,' already exists'
-        else:
-            if self.vb: print ' - Create ',output
-            hduimg  = pyfits.open(twodfits) # Load the FITS hdulist
-            hdrsci  = hduimg['SCI'].header    # extracting science header
-            sci     = hduimg['SCI'].data
-            contam  = hduimg['CONTAM'].data
-            pyfits.writeto(output, sci-contam, hdrsci, clobber=False)
-
+        output = vi.subtractcontam_fits(twodfits,verbose=self.vb)[0]
         return output
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def keyboard_cmd(self,event):
@@ -3173,6 +6005,12 @@ class Application_z(Frame):
                 else:
                     self.cbdic2[thiskey2].toggle()
 
+            elif cmd == 'j':
+                self.dataPlot_jumpzcandidate(1)
+
+            elif cmd == 'J':
+                self.dataPlot_jumpzcandidate(-1)
+
             elif cmd == 'l':
                 self.comments.focus_set()
 
@@ -3251,7 +6089,8 @@ class Application_m(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def __init__(self,pdir,outfile,master=None,infofile=None,objlist=None,clusters=None,verbose=True,iname='John Doe',
                  ACSinspection=False,clobber=False,ds9xpa=False,openfitsauto=False,outputcheck=False,skipempty=False,
-                 openpngseperately=False):
+                 openpngseperately=False,outputsync='flush',skipinspected=False,stampcache=20.0,prefetch=0,
+                 thumbcache=None,thumbcacheMB=200.0,gridshape=None,gridstampsize=160):
         """
         Intitialize the GUI
 
@@ -3283,6 +6122,32 @@ class Application_m(Frame):
                           will be written to the output
         openpngseperately By default the pngs are not opened in Preview/GThumb to avoid biasing the inspections
                           However, setting this keyword to true, will do that.
+        outputsync        How the output is made persistent after each saved object: 'flush' (default) to
+                          the operating system, 'fsync' to disk or 'none' (written when quitting).
+                          See vi.OutputJournal for details.
+        skipinspected     When appending to an existing output file, skip all objects already in the file
+                          instead of resuming after the last object in the file.
+        stampcache        Maximum memory in MB used for keeping the decoded and resized postage stamps
+                          (see vi.PhotoImageCache)
+        prefetch          Number of upcoming objects in objlist for which the postage stamps and Halpha maps
+                          are decoded and resized in the background by a pool of worker threads (together
+                          with the Halpha maps of the current object). Set to 0 to disable.
+        thumbcache        Directory of the on-disk cache of postage stamps resized to the display size
+                          (see vi.ThumbnailCache) so each image is only resampled once across sessions.
+                          Use 'DEFAULT' for vi.thumbcache_defaultdir(). If None no thumbnail cache is used.
+                          The cache can be filled beforehand with vi.precompute_thumbnails().
+        thumbcacheMB      Maximum size in MB of the thumbnail cache directory.
+        gridshape         To triage many objects quickly provide (Nrows,Ncolumns) to show the rgb stamps of
+                          Nrows*Ncolumns objects at once in a grid instead of one object at a time.
+                          The selected tile (moved with the arrow keys) is classified with the (a)-(h)
+                          keys, which also moves the selection to the next tile, (x) toggles 'Uncertain'
+                          and (p) edits its comment. Next/previous (8/7) save all objects on the page
+                          in one batch. No Halpha maps are shown, so the Ha and process columns are
+                          written as -1 (as for objects without Halpha maps). The stamps of the page and
+                          the next page are decoded in parallel by vi.ImagePrefetcher worker threads.
+        gridstampsize     Size in pixels of the stamps in the grid when gridshape is provided.
+                          To use pre-generated thumbnails (thumbcache) for the grid stamps, run
+                          vi.precompute_thumbnails() with GUI='GiGm' and size=(gridstampsize,gridstampsize)
         """
         pp    = subprocess.Popen('ds9 -version',shell=True,executable=os.environ["SHELL"],stdout=subprocess.PIPE)
         ppout = pp.communicate()[0]
@@ -3291,16 +6156,43 @@ class Application_m(Frame):
         self.now         = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.vb          = verbose
         self.pdir        = pdir
+        self.gridshape   = gridshape
+        self.gridstampsize = gridstampsize
+        self.thumbcache  = None
+        if thumbcache is not None:
+            if thumbcache == 'DEFAULT': thumbcache = vi.thumbcache_defaultdir()
+            self.thumbcache = vi.ThumbnailCache(thumbcache,maxMB=thumbcacheMB,verbose=self.vb)
+        self.stampcache  = vi.PhotoImageCache(maxMB=stampcache,thumbcache=self.thumbcache,verbose=verbose)
+        self.pstampwidgets = {} # (row,column,columnspan) -> Label reused for the postage stamps
+        self.pstampkeys  = {False:['_rgb.','_f475w.','_f140w.'],    # name keys of stamps shown without Ha maps
+                            True :['_f475w_ha','_f140w_ha','_ha']}  # name keys of stamps shown with Ha maps
+        self.prefetch    = prefetch
+        self.prefetcher  = None
+        self.prefetchupcoming = []
+        self.prefetchafter    = None
+        if self.gridshape is not None: # stamps of current and next page decoded in parallel
+            self.prefetcher = vi.ImagePrefetcher(Nworkers=4,Nkeep=2*self.gridshape[0]*self.gridshape[1],
+                                                 thumbcache=self.thumbcache,verbose=verbose)
+        elif self.prefetch > 0:
+            self.prefetcher = vi.ImagePrefetcher(Nworkers=2,Nkeep=6*(self.prefetch+1),
+                                                 thumbcache=self.thumbcache,verbose=verbose)
         self.master      = master
         self.infofile    = infofile
+        self.infoindex   = None
+        if self.infofile is not None: self.infoindex = vi.load_infofile(self.infofile,verbose=verbose)
         self.ds9open     = False # set ds9 indicator (used for ds9xpa = False)
         self.ds9windowopen = False # set ds9 indicator (used for ds9xpa = True)
+        self.ds9starting   = False # DS9 launched but not yet answering XPA requests (ds9xpa = True)
         self.ACSins      = ACSinspection
         self.quitting    = False
+        self.procs       = vi.ProcessManager(verbose=verbose) # keeps track of png and DS9 windows
+        self.ds9batch    = vi.DS9XPABatch(verbose=verbose)    # sends XPA commands to DS9
         self.xpa         = ds9xpa # check if user indacetd that xpa was available for ds9
         self.fitsauto    = openfitsauto # Open fits files automatically?
         self.outcheck    = outputcheck
         self.skipempty   = skipempty
+        self.outputsync  = outputsync
+        self.skipinspected = skipinspected
         self.openpngssep = openpngseperately
         if self.xpa:
             self.ds9windowopen = False
@@ -3310,11 +6202,13 @@ class Application_m(Frame):
         else:
             sys.exit(' - The directory '+self.pdir+' does not exist --> ABORTING')
 
+        self.dirindex = vi.build_dirindex(self.pdir,verbose=self.vb) # index of files to avoid globbing the dir
+
         # -------- GET OBJIDS --------
         if objlist == None:
             searchext = '_rgb.png'
 
-            self.file_2Dpng  = glob.glob(self.pdir+'*'+searchext)
+            self.file_2Dpng  = vi.glob_dirindex(self.dirindex,self.pdir+'*'+searchext)
             self.clusterlist = np.asarray([self.file_2Dpng[jj].split('/')[-1].split('_')[0]
                                            for jj in xrange(len(self.file_2Dpng))])
             self.objlist     = np.asarray([int(self.file_2Dpng[jj].split('/')[-1].split('_')[1])
@@ -3352,21 +6246,30 @@ class Application_m(Frame):
 
         if os.path.isfile(outfile):
             newfile   = False
-            self.fout = open(outfile,'r')                # open existing file
-            IDinspected = np.array([])                  # array to contain IDs in file
-            for line in self.fout.readlines():           # loop through file to last line
-                lsplit = line.split()
-                if lsplit[0] != '#':
-                    IDinspected = np.append(IDinspected,float(lsplit[0]))
-            if len(IDinspected) == 0:
+            self.fout = vi.OutputJournal(outfile,mode='a',sync=self.outputsync,verbose=self.vb) # indexes file
+            objinspected = set([(int(key[0]),key[1]) for key in self.fout.Nrecords.keys()]) # IDs and clusters
+            if len(objinspected) == 0:
                 sys.exit('Found no inspected objects in '+outfile)
-            lastline = line
-            self.fout.close()
 
-            lastID = lastline.split()[0]                     # get the last ID in file
-            lastCL = lastline.split()[1]                     # get the last cluster in file
-
-            if lastID != '#':
+            lastID = self.fout.lastline.split()[0]           # get the last ID in file
+            lastCL = self.fout.lastline.split()[1]           # get the last cluster in file
+
+            if self.skipinspected:
+                if self.vb: print ' - The file '+outfile+' already exists (Skipping all objects in output)'
+                notinspected = np.asarray([(int(self.objlist[oo]),self.clusterlist[oo]) not in objinspected
+                                           for oo in xrange(len(self.objlist))])
+                if not np.any(notinspected):
+                    sys.exit(' - All objects in "objlist" are already in the outputfile --> ABORTING ')
+                self.objlist     = self.objlist[notinspected]
+                self.clusterlist = self.clusterlist[notinspected]
+                self.currentobj  = self.objlist[0]           # change first id to look at
+                self.currentcl   = self.clusterlist[0]       # change cluster for first id
+                if self.vb:
+                    print ' - Info from existing output: '
+                    print '   '+str(len(self.objlist))+' of '+str(len(notinspected))+\
+                          ' objects still need to be expected'
+                    print '   Found '+str(len(objinspected))+' objects already inspected in file'
+            elif lastID != '#':
                 objent = np.where((self.objlist == float(lastID)) & (self.clusterlist == lastCL))[0]
                 if self.vb: print ' - The file '+outfile+' already exists (Resuming after last objects in output)'
                 try:
@@ -3375,17 +6278,16 @@ class Application_m(Frame):
                 except:
                     sys.exit(' - The last object in the outputfile is the last in "objlist" --> ABORTING ')
                 Nremaining = len(self.objlist[objent+1:])
-                Ninspected = len(np.sort(IDinspected))
+                Ninspected = np.sum(self.fout.Nrecords.values())
                 if self.vb:
                     print ' - Info from existing output: '
                     print '   '+str(Nremaining)+' of '+str(len(self.objlist))+' objects still need to be expected'
                     print '   Found '+str(Ninspected)+' objects already inspected in file'
             else:
                 if self.vb: print ' - The file '+outfile+' already exists (append as last row does not contain ID)'
-            self.fout     = open(outfile,'a')
         else:
             if self.vb: print ' - The file '+outfile+' was created (did not exist)'
-            self.fout     = open(outfile,'w')
+            self.fout     = vi.OutputJournal(outfile,mode='w',sync=self.outputsync,verbose=self.vb)
             self.fout.write('# Results from Visual Inspection initiated on '+self.now+' \n')
             self.fout.write('# Inspector: '+iname+' \n')
             newfile = True
@@ -3407,7 +6309,11 @@ class Application_m(Frame):
         self.create_widgets()
 
         # -------- ADD IMAGE WINDOWS --------
-        self.updatepstamps()
+        if self.gridshape is not None:
+            self.grid_build()
+            self.grid_showpage()
+        else:
+            self.updatepstamps()
 
         # -------- DRAW SEPERATORS --------
         self.drawsep(900,4,1  ,0,4,0, 2,899,4)
@@ -3437,7 +6343,7 @@ class Application_m(Frame):
 
         # -------- 1st PA --------
         self.cbpos = [5,0,1]
-        self.checkboxes(self.cbpos)
+        self.checkboxes(self.cbpos,disable=(self.gridshape is not None)) # only a legend of the keys in grid mode
         self.commentfield([self.cbpos[0]+6,2,1])
 
         self.openfits_but([65,3,1])
@@ -3623,7 +6529,7 @@ class Application_m(Frame):
         self.objhasHa = False # resetting Halpha flag
 
         idstr = str("%05d" % self.currentobj)
-        self.pstamplist = glob.glob(self.pdir+self.currentcl+'_'+idstr+'*.png')
+        self.pstamplist = vi.glob_dirindex(self.dirindex,self.pdir+self.currentcl+'_'+idstr+'*.png')
         self.Nstamps = len(self.pstamplist)
 
         self.Hamap = self.pdir+self.currentcl+'_'+idstr+'_ha.png'
@@ -3664,12 +6570,10 @@ class Application_m(Frame):
             elif self.plat == 'linux2' or 'Linux':
                 opencmd = 'gthumb '+' '.join(pngorderedlist)+' &'
 
-            self.pPNG = subprocess.Popen(opencmd,shell=True,executable=os.environ["SHELL"])
-            time.sleep(1.1)# sleep to make sure png appear in PIDlist
-            if self.plat == 'darwin':
-                self.pngPID = vi.getPID('Preview.app',verbose=False) # get PID of png process
-            elif self.plat == 'linux2' or 'Linux':
-                self.pngPID = vi.getPID('gthumb',verbose=False)      # get PID of png process
+            if self.plat == 'darwin': # Preview.app is not started as a child of 'open'; found when closing
+                self.pPNG = self.procs.start('png',opencmd,detachedsearch='Preview.app')
+            else:
+                self.pPNG = self.procs.start('png',opencmd)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openfits_but(self,position):
         """
@@ -3693,22 +6597,47 @@ class Application_m(Frame):
         lockstr = self.lockds9string()
         ds9cmd  = ' '
 
-        if not self.ds9windowopen:
+        if self.ds9starting:
+            if self.vb: print ' - DS9 is still starting up; the fits files are loaded once it is ready'
+        elif not self.ds9windowopen:
             ds9cmd = ds9cmd+'ds9 -geometry 1000x600 -scale zscale '+lockstr+' -tile grid layout 4 1'
-            self.pds9   = subprocess.Popen(ds9cmd,shell=True,executable=os.environ["SHELL"])
-            time.sleep(1.1)# sleep to make sure ds9 appear in PIDlist
-            self.ds9PID = vi.getPID('ds9',verbose=False) # get PID of DS9 process
-            self.ds9windowopen = True
-            time.sleep(1.0)
-            out = commands.getoutput('xpaset -p ds9 frame new rgb')
-            out = commands.getoutput('xpaset -p ds9 frame new')
-            out = commands.getoutput('xpaset -p ds9 frame new')
-            out = commands.getoutput('xpaset -p ds9 frame new')
-            out = commands.getoutput('xpaset -p ds9 frame 1')
-            out = commands.getoutput('xpaset -p ds9 frame hide')
-
-            out = commands.getoutput('xpaset -p ds9 tile')
-
+            ds9cmd = ds9cmd+' -frame new rgb -frame new -frame new -frame new -frame 1 -frame hide -tile yes'
+            self.pds9   = self.procs.start('ds9',ds9cmd)
+            self.ds9starting = True # ds9windowopen is set once DS9 answers XPA requests
+            self.waitfords9xpa(self.loadfits_xpa)
+        else:
+            self.loadfits_xpa()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def waitfords9xpa(self,loadcmd,waited=0,probe=None):
+        """
+        Run loadcmd once the newly launched DS9 window accepts XPA commands. The check is run by a
+        background xpaaccess process (vi.ds9xpaprobe) which is polled every 100 ms from the Tk event loop,
+        so the GUI stays responsive while DS9 starts up (also if the XPA name server is slow).
+        """
+        if self.quitting: return
+        if probe is None:
+            probe = vi.ds9xpaprobe()
+            if probe is None:
+                self.ds9starting = False
+                return
+        elif probe.poll() is not None: # probe finished
+            if probe.stdout.read().strip() == 'yes':
+                self.ds9starting   = False
+                self.ds9windowopen = True
+                loadcmd()
+                return
+            probe = None # DS9 not ready yet; probe again
+        if waited < 30000:
+            self.after(100,self.waitfords9xpa,loadcmd,waited+100,probe)
+        else:
+            if probe is not None: probe.kill()
+            self.ds9starting = False
+            print ' - WARNING DS9 did not respond to XPA commands within 30 seconds; not loading fits files'
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def loadfits_xpa(self):
+        """
+        Load the postage stamp fits files of the current object into the open DS9 window via XPA
+        """
         Fstart = 2
         for pstamp in self.pstamplist:
             pstampname = '_'.join(pstamp.split('.')[0].split('_')[2:])
@@ -3717,35 +6646,48 @@ class Application_m(Frame):
             if fitsstamp.endswith('_ha.fits'):
                 pass
             else:
-                out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+                self.ds9batch.add('frame '+str(Fstart))
                 if 'rgb' in fitsstamp:
-                    out = commands.getoutput('xpaset -p ds9 rgb red')
-                    out = commands.getoutput('xpaset -p ds9 file '+fitsstamp.replace('rgb','rgb_r')+'[0]')
-                    out = commands.getoutput('xpaset -p ds9 rgb green')
-                    out = commands.getoutput('xpaset -p ds9 file '+fitsstamp.replace('rgb','rgb_g')+'[0]')
-                    out = commands.getoutput('xpaset -p ds9 rgb blue')
-                    out = commands.getoutput('xpaset -p ds9 file '+fitsstamp.replace('rgb','rgb_b')+'[0]')
+                    self.ds9batch.add('rgb red')
+                    self.ds9batch.add('file '+fitsstamp.replace('rgb','rgb_r')+'[0]')
+                    self.ds9batch.add('rgb green')
+                    self.ds9batch.add('file '+fitsstamp.replace('rgb','rgb_g')+'[0]')
+                    self.ds9batch.add('rgb blue')
+                    self.ds9batch.add('file '+fitsstamp.replace('rgb','rgb_b')+'[0]')
                 else:
                     regionfile = self.regiontemp.replace('.reg',pstampname+'.reg')
                     self.ds9textregion(pstampname,filename=regionfile)
-                    out = commands.getoutput('xpaset -p ds9 file '+fitsstamp+'[0]')
-                    out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+                    self.ds9batch.add('file '+fitsstamp+'[0]')
+                    self.ds9batch.add('regions '+regionfile)
                 Fstart += 1
 
-        out = commands.getoutput('xpaset -p ds9 zoom to fit')
+        self.ds9batch.add('zoom to fit')
 
         if self.showingHamaps: # sho the Halpha map fits file
             pstampname = 'Halpha'
             fitsstamp  = self.Hamap.replace('.png','.fits')
-            out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
+            self.ds9batch.add('frame '+str(Fstart))
             regionfile = self.regiontemp.replace('.reg',pstampname+'.reg')
             self.ds9textregion(pstampname,filename=regionfile)
-            out = commands.getoutput('xpaset -p ds9 file '+fitsstamp+'[0]')
-            out = commands.getoutput('xpaset -p ds9 regions '+regionfile)
+            self.ds9batch.add('file '+fitsstamp+'[0]')
+            self.ds9batch.add('regions '+regionfile)
             Fstart += 1
         else:
-            out = commands.getoutput('xpaset -p ds9 frame '+str(Fstart))
-            out = commands.getoutput('xpaset -p ds9 frame clear')
+            self.ds9batch.add('frame '+str(Fstart))
+            self.ds9batch.add('frame clear')
+
+        batch = self.ds9batch.send()
+        self.reportds9load(batch,'object '+str("%05d" % self.currentobj))
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def reportds9load(self,batch,objstr):
+        """
+        Report the time DS9 spent loading the object once the XPA batch has finished
+        """
+        if batch != self.ds9batch.Nsent: return # superseded by batch for another object
+        if not self.ds9batch.isdone():
+            self.after(50,self.reportds9load,batch,objstr)
+        elif self.vb:
+            print ' - Loaded '+objstr+' into DS9 in '+str("%.2f" % self.ds9batch.loadtime)+' seconds'
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def openfits_but_cmd(self):
         """
@@ -3785,9 +6727,7 @@ class Application_m(Frame):
                      ' -frame '+str(Fstart)+' -region '+regionfile+' '
         ds9cmd = ds9cmd+' -tile yes -zoom to fit'
         print ds9cmd
-        self.pds9   = subprocess.Popen(ds9cmd,shell=True,executable=os.environ["SHELL"])
-        time.sleep(1.1)# sleep to make sure ds9 appear in PIDlist
-        self.ds9PID = vi.getPID('ds9',verbose=False) # get PID of DS9 process
+        self.pds9   = self.procs.start('ds9',ds9cmd)
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def lockds9string(self):
         """
@@ -3811,15 +6751,76 @@ class Application_m(Frame):
         fds9region.close()
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def set_imgmap(self,position,namekey):
-        imgname = self.pstamplist[0] # setting default imgname (just the first in list of images)
-        for pstamp in self.pstamplist:
-            if namekey in pstamp: imgname = pstamp
-        img = ImageTk.PhotoImage(Image.open(imgname).resize((self.imgx,self.imgy),Image.ANTIALIAS))
-        self.imageframe = Label(self, image=img)
+        """
+        Show the postage stamp matching namekey at position. The Label for each position is created once
+        and afterwards only has its image swapped. The PhotoImages are taken from the vi.PhotoImageCache.
+        """
+        imgname = self.pickpstamp(self.pstamplist,namekey)
+        img = self.stampcache.get(imgname,(self.imgx,self.imgy),prefetcher=self.prefetcher)
+
+        poskey = tuple(position)
+        if poskey in self.pstampwidgets:
+            self.imageframe = self.pstampwidgets[poskey]
+            self.imageframe.configure(image=img)
+        else:
+            self.imageframe = Label(self, image=img)
+            self.pstampwidgets[poskey] = self.imageframe
         self.imageframe.image = img
-        self.imageframe.grid(row = position[0], column = position[1], columnspan = position[2], sticky=N+W+E+S)
+        if self.imageframe.winfo_manager() == '': # (re)grid if new or removed with grid_forget
+            self.imageframe.grid(row = position[0], column = position[1], columnspan = position[2], sticky=N+W+E+S)
 
         return self.imageframe
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def pickpstamp(self,pstamplist,namekey):
+        """
+        Return the postage stamp in pstamplist to show for namekey
+        """
+        imgname = pstamplist[0] # setting default imgname (just the first in list of images)
+        for pstamp in pstamplist:
+            if namekey in pstamp: imgname = pstamp
+        return imgname
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def prefetchstamps(self):
+        """
+        Queue the Halpha maps of the current object and the postage stamps and Halpha maps of the next
+        objects in objlist for decoding in the background
+        """
+        if self.prefetcher is None: return
+
+        objent   = np.where((self.objlist == self.currentobj) & (self.clusterlist == self.currentcl))[0][0]
+        size     = (self.imgx,self.imgy)
+        upcoming = []
+        for ent in xrange(objent,min(objent+1+self.prefetch,len(self.objlist))):
+            idstr      = str("%05d" % self.objlist[ent])
+            pstamplist = vi.glob_dirindex(self.dirindex,self.pdir+self.clusterlist[ent]+'_'+idstr+'*.png')
+            if len(pstamplist) == 0: continue
+            hasHa      = (self.pdir+self.clusterlist[ent]+'_'+idstr+'_ha.png') in pstamplist
+            stages     = [True] if ent == objent else [False,True]
+            for ha in stages:
+                if ha and not hasHa: continue
+                for namekey in self.pstampkeys[ha]:
+                    imgname = self.pickpstamp(pstamplist,namekey)
+                    if (imgname in upcoming) or self.stampcache.iscached(imgname,size): continue
+                    self.prefetcher.request(imgname,size)
+                    upcoming.append(imgname)
+        self.prefetchupcoming = upcoming
+
+        if self.prefetchafter is not None: self.after_cancel(self.prefetchafter)
+        self.prefetchafter = self.after(100,self.prefetchphotoimages)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def prefetchphotoimages(self):
+        """
+        Move the stamps prepared by the prefetcher into the PhotoImage cache while the GUI is idle
+        """
+        self.prefetchafter = None
+        size    = (self.imgx,self.imgy)
+        pending = False
+        for png in self.prefetchupcoming:
+            if self.prefetcher.isready(png,size):
+                self.stampcache.add(png,size,self.prefetcher.get(png,size))
+            elif self.prefetcher.ispending(png,size):
+                pending = True
+        if pending: self.prefetchafter = self.after(100,self.prefetchphotoimages)
     # - - - - - - - - - - - - - - - - -  - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def updatepstamps(self,ha=False):
         """
@@ -3828,18 +6829,251 @@ class Application_m(Frame):
         self.imgx,self.imgy = 220, 220
         rownumberstart = 100
         if ha:
-            self.f475wHa_imgframe  = self.set_imgmap([rownumberstart + 0,1,1],'_f475w_ha')
-            self.f105wHa_imgframe  = self.set_imgmap([rownumberstart + 0,2,1],'_f140w_ha')
-            self.ha_imgframe       = self.set_imgmap([rownumberstart + 0,3,1],'_ha')
+            self.f475wHa_imgframe  = self.set_imgmap([rownumberstart + 0,1,1],self.pstampkeys[True][0])
+            self.f105wHa_imgframe  = self.set_imgmap([rownumberstart + 0,2,1],self.pstampkeys[True][1])
+            self.ha_imgframe       = self.set_imgmap([rownumberstart + 0,3,1],self.pstampkeys[True][2])
         else:
-            self.rgb_imgframe      = self.set_imgmap([rownumberstart + 0,0,1],'_rgb.')
-            self.f475w_imgframe    = self.set_imgmap([rownumberstart + 0,1,1],'_f475w.')
-            self.f105w_imgframe    = self.set_imgmap([rownumberstart + 0,2,1],'_f140w.')
+            self.rgb_imgframe      = self.set_imgmap([rownumberstart + 0,0,1],self.pstampkeys[False][0])
+            self.f475w_imgframe    = self.set_imgmap([rownumberstart + 0,1,1],self.pstampkeys[False][1])
+            self.f105w_imgframe    = self.set_imgmap([rownumberstart + 0,2,1],self.pstampkeys[False][2])
             try:
                 self.ha_imgframe.grid_forget()
             except:
                 pass
+            self.prefetchstamps()
+
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_build(self):
+        """
+        Create the tiles of the grid mode (gridshape). The tiles are created once and reused for all pages.
+        """
+        self.imgx,self.imgy = self.gridstampsize, self.gridstampsize
+        rownumberstart = 100
+        self.gridimgkeys = [key for key in self.keys if 'Img:' in key] # the classes set per tile
+        self.gridclasses = {} # (cluster,id) -> {'img':key of class,'uncertain':bool,'comment':str}
+        self.gridsel     = 0
+        self.grident0    = np.where((self.objlist == self.currentobj) & (self.clusterlist == self.currentcl))[0][0]
+        self.gridtiles   = []
+        for rr in xrange(self.gridshape[0]):
+            for cc in xrange(self.gridshape[1]):
+                tile = {}
+                tile['frame'] = Frame(self,highlightthickness=3,highlightbackground='white')
+                tile['frame'].grid(row=rownumberstart+rr,column=cc,columnspan=1,sticky=N+W+E+S)
+                tile['image'] = Label(tile['frame'])
+                tile['image'].pack()
+                tile['textvar'] = StringVar()
+                tile['text']  = Label(tile['frame'],textvariable=tile['textvar'])
+                tile['text'].pack(fill=X)
+                self.gridtiles.append(tile)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_pageents(self):
+        """
+        Return the entries in objlist of the objects on the current page
+        """
+        return range(self.grident0,min(self.grident0+len(self.gridtiles),len(self.objlist)))
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_objkey(self,ent):
+        """
+        Return the (cluster,id) key of the object at entry ent in objlist
+        """
+        return (str(self.clusterlist[ent]),int(self.objlist[ent]))
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_stamp(self,ent):
+        """
+        Return the rgb stamp of the object at entry ent in objlist (None if no stamps were found)
+        """
+        idstr      = str("%05d" % self.objlist[ent])
+        pstamplist = vi.glob_dirindex(self.dirindex,self.pdir+self.clusterlist[ent]+'_'+idstr+'*.png')
+        if len(pstamplist) == 0: return None
+        return self.pickpstamp(pstamplist,self.pstampkeys[False][0])
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_prefetch(self):
+        """
+        Queue the stamps of the current and the next page for decoding in parallel in the background
+        """
+        size     = (self.imgx,self.imgy)
+        upcoming = []
+        for ent in xrange(self.grident0,min(self.grident0+2*len(self.gridtiles),len(self.objlist))):
+            stamp = self.grid_stamp(ent)
+            if (stamp is None) or self.stampcache.iscached(stamp,size): continue
+            self.prefetcher.request(stamp,size)
+            upcoming.append(stamp)
+        self.prefetchupcoming = upcoming
+
+        if self.prefetchafter is not None: self.after_cancel(self.prefetchafter)
+        self.prefetchafter = self.after(100,self.prefetchphotoimages)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_showpage(self):
+        """
+        Show the stamps of the objects on the current page in the tiles
+        """
+        self.grid_prefetch()
+        pageents = self.grid_pageents()
+        for ii, tile in enumerate(self.gridtiles):
+            if ii < len(pageents):
+                stamp = self.grid_stamp(pageents[ii])
+                if stamp is None:
+                    img = ''
+                else:
+                    img = self.stampcache.get(stamp,(self.imgx,self.imgy),prefetcher=self.prefetcher)
+                tile['image'].configure(image=img)
+                tile['image'].image = img
+                if tile['frame'].winfo_manager() == '': tile['frame'].grid()
+                self.grid_updatetile(ii)
+            else:
+                tile['frame'].grid_remove()
+        self.gridsel = 0
+        self.grid_select(0,storecomment=False)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_updatetile(self,ii):
+        """
+        Update the text and color of tile ii with the classification of its object
+        """
+        ent     = self.grid_pageents()[ii]
+        objkey  = self.grid_objkey(ent)
+        objcls  = self.gridclasses.get(objkey,{})
+        textstr = objkey[0]+'_'+str("%.5d" % objkey[1])
+        color   = 'white'
+        if objcls.get('img') is not None:
+            textstr = textstr+': '+objcls['img'][:3]+' '+objcls['img'].split(': ')[-1]
+            color   = self.getcolors()[objcls['img'][1]]
+        if objcls.get('uncertain',False): textstr = textstr+' (x)'
+        self.gridtiles[ii]['textvar'].set(textstr)
+        self.gridtiles[ii]['text'].configure(background=color)
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_storecomment(self):
+        """
+        Store the content of the comment field for the object of the selected tile
+        """
+        objkey = self.grid_objkey(self.grid_pageents()[self.gridsel])
+        self.gridclasses.setdefault(objkey,{})['comment'] = self.comments.get()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_select(self,ii,storecomment=True):
+        """
+        Select tile ii (the object of the tile becomes currentobj, e.g., for opening its fits files)
+        """
+        pageents = self.grid_pageents()
+        ii       = max(0,min(ii,len(pageents)-1))
+        if storecomment: self.grid_storecomment()
+        self.gridtiles[self.gridsel]['frame'].configure(highlightbackground='white')
+        self.gridsel = ii
+        self.gridtiles[self.gridsel]['frame'].configure(highlightbackground='black')
+
+        self.currentobj = self.objlist[pageents[ii]]
+        self.currentcl  = self.clusterlist[pageents[ii]]
+        self.labelvar.set(self.infostring())
+        self.comments.delete(0,END)
+        self.comments.insert(0,self.gridclasses.get(self.grid_objkey(pageents[ii]),{}).get('comment',''))
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_savepage(self,skip=False):
+        """
+        Write the classifications of all objects on the current page to the output in one batch
+
+        if skip=True nothing will be written to output file.
+        """
+        self.grid_storecomment()
+        pageents = self.grid_pageents()
+        missing  = [ii for ii, ent in enumerate(pageents)
+                    if self.gridclasses.get(self.grid_objkey(ent),{}).get('img') is None]
+
+        self.goodformat = True
+        if (len(missing) > 0) & (not skip) & (not self.skipempty):
+            print ' WARNING: '+str(len(missing))+' objects on the page have no (a)-(h) class set - Fix before advancing.'
+            self.goodformat = False
+            self.grid_select(missing[0])
+            return
+
+        if not skip:
+            Nsaved = 0
+            for ii, ent in enumerate(pageents):
+                if ii in missing: continue # only with skipempty = True
+                objkey    = self.grid_objkey(ent)
+                objcls    = self.gridclasses[objkey]
+                idstr     = str("%.5d" % objkey[1])
+                resultstr = ' '+idstr+' '+objkey[0]
+                for key in self.keys:
+                    if (key[1] in self.empty) or (key[1] in self.Haboxes):
+                        keyval = '-1'
+                    elif key[1] == 'x':
+                        keyval = str(int(objcls.get('uncertain',False)))
+                    else:
+                        keyval = str(int(key == objcls['img']))
+                    resultstr = resultstr+' '+keyval
+                resultstr = resultstr+'  #C# '+objcls.get('comment','')+' \n'
+                self.fout.supersede((idstr,objkey[0])) # replace earlier saves of the object
+                self.fout.write(resultstr)
+                Nsaved = Nsaved + 1
+            if self.vb: print ' - Saved '+str(Nsaved)+' objects of the page'
 
+        # --- make sure inspections are saved (once per page) ---
+        self.fout.commit()
+
+        self.closewindows()
+        self.ds9open = False # resetting ds9 indicator
+        self.focus_set() # set focus to main window
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_nextpage(self,skip=False):
+        """
+        Save (unless skip=True) the current page and move on to the next page
+        """
+        self.reset(skip=skip)
+        if not (self.goodformat or skip): return
+        if self.grident0+len(self.gridtiles) >= len(self.objlist):
+            if self.vb: print ' - Page was the last in the list.\n   Quitting GUI.'
+            self.quitting = True
+            self.quit_but_cmd(skip=True)
+        else:
+            self.grident0 = self.grident0+len(self.gridtiles)
+            self.grid_showpage()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_prevpage(self):
+        """
+        Save the current page and move back to the previous page
+        """
+        self.reset()
+        if self.goodformat:
+            if self.grident0 == 0:
+                if self.vb: print ' - At first page of list...'
+            else:
+                self.grident0 = max(0,self.grident0-len(self.gridtiles))
+                self.grid_showpage()
+    # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
+    def grid_keyboard_cmd(self,event):
+        """
+        Keyboard shortcuts in grid mode
+        """
+        cmd     = event.char
+        objkey  = self.grid_objkey(self.grid_pageents()[self.gridsel])
+        imgcmds = [key[1] for key in self.gridimgkeys]
+        moves   = {'Left':-1,'Right':1,'Up':-self.gridshape[1],'Down':self.gridshape[1]}
+
+        if event.keysym in moves:
+            self.grid_select(self.gridsel+moves[event.keysym])
+        elif cmd in imgcmds:
+            objcls  = self.gridclasses.setdefault(objkey,{})
+            thiskey = self.gridimgkeys[imgcmds.index(cmd)]
+            if objcls.get('img') == thiskey: # toggle class off again
+                objcls['img'] = None
+                self.grid_updatetile(self.gridsel)
+            else:
+                objcls['img'] = thiskey
+                self.grid_updatetile(self.gridsel)
+                self.grid_select(self.gridsel+1)
+        elif cmd == 'x':
+            objcls = self.gridclasses.setdefault(objkey,{})
+            objcls['uncertain'] = not objcls.get('uncertain',False)
+            self.grid_updatetile(self.gridsel)
+        elif cmd == 'p':
+            self.comments.focus_set()
+        elif cmd == '0':
+            if self.xpa:
+                self.openfits_but_cmd_xpa()
+            else:
+                self.openfits_but_cmd()
+        elif cmd == '7':
+            self.prev_but_cmd()
+        elif cmd == '8':
+            self.next_but_cmd()
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def reset(self,skip=False):
         """
@@ -3847,6 +7081,8 @@ class Application_m(Frame):
 
         if skip=True nothing will be written to output file.
         """
+        if self.gridshape is not None: return self.grid_savepage(skip=skip)
+
         resultstr  = ' '+str("%.5d" % self.currentobj)+' '+str(self.currentcl)
         defaultstr = resultstr
         for key in self.keys:
@@ -3876,9 +7112,8 @@ class Application_m(Frame):
                 self.fout.write(str(resultstr))
             if resultstr == defaultstr: skip = skipin # restoring original skip value
 
-            # --- close and re-open output file so inspection is saved ---
-            self.fout.close()
-            self.fout = open(self.outfile,'a')
+            # --- make sure inspection is saved ---
+            self.fout.commit()
 
             # --- resetting widgets and closing windows ---
             self.comments.delete(0,END) # reset comment field
@@ -3894,26 +7129,12 @@ class Application_m(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def removeoutputduplicate(self,id):
         """
-        Subtract continuum from science fram
+        Remove earlier entries of the object (in the current cluster) from the output. The entries are
+        flagged in the output journal and removed from the file when it is compacted (on quit).
         """
-        self.fout.close()
         idstr       = str("%.5d" % id)
-        stringstart = ' '+idstr
-        file        = open(self.outfile,'r')
-        lines       = file.readlines()
-        file.close()
-        file = open(self.outfile,"w")
-
-        Ndup        = 0
-        for line in lines:
-            if line.startswith(stringstart):
-                file.write(line)
-            else:
-                if self.vb: print ' - Found dublicate entry for ID '+idstr+' deleting it!'
-                Ndup = Ndup+1
-
-        file.close()
-        self.fout = open(self.outfile,'a')
+        Ndup        = self.fout.supersede((idstr,self.currentcl))
+        if (Ndup > 0) & self.vb: print ' - Found '+str(Ndup)+' dublicate entries for ID '+idstr+' deleting them!'
         return Ndup
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
@@ -3925,17 +7146,13 @@ class Application_m(Frame):
         PIDkill    = True
         if PIDkill:
             if self.openpngssep:
-                try:
-                    os.kill(self.pngPID,killsignal)                  # close PNG window for currentobj
-                except:
+                if not self.procs.close('png',killsignal):        # close PNG window for currentobj
                     print '   WARNING error occurred while trying to close PNG window(s)'
 
             if np.logical_or(((self.ds9open == True) & (self.xpa == False)),
-                             ((self.xpa == True) & (self.quitting == True) & (self.ds9windowopen == True))):
-                try:
-                    os.kill(self.ds9PID,killsignal)                  # close DS9 window for currentobj
-                except:
-                    if self.vb: print ' - WARNING: Could not kill DS9 process id ',self.ds9PID
+                             ((self.xpa == True) & (self.quitting == True) & (self.ds9windowopen or self.ds9starting))):
+                if not self.procs.close('ds9',killsignal):     # close DS9 window for currentobj
+                    if self.vb: print ' - WARNING: Could not close DS9 window (already closed?)'
                 rmout = commands.getoutput('rm '+self.regiontemp.replace('.reg','*.reg')) # removing ds9 region file
         else:
             print '=== WHAT ARE YOU DOING HERE?? ==='
@@ -3950,6 +7167,7 @@ class Application_m(Frame):
         """
         Command for skip button
         """
+        if self.gridshape is not None: return self.grid_nextpage(skip=True)
         self.reset(skip=True)
 
         if self.currentobj == self.objlist[-1]:
@@ -3981,6 +7199,7 @@ class Application_m(Frame):
         """
         Command for next button
         """
+        if self.gridshape is not None: return self.grid_nextpage()
         if (self.currentobj == self.objlist[-1]) & (self.currentcl == self.clusterlist[-1]):
             if self.vb: print ' - Object '+self.currentcl+'_'+str("%.5d" % self.currentobj)+\
                               ' was the last in the list.\n   Quitting GUI.'
@@ -4022,6 +7241,7 @@ class Application_m(Frame):
         """
         Command for previous button
         """
+        if self.gridshape is not None: return self.grid_prevpage()
         self.reset()
         if self.goodformat:
             if (self.currentobj == self.objlist[0]) & (self.currentcl == self.clusterlist[0]):
@@ -4059,8 +7279,11 @@ class Application_m(Frame):
             self.quitting = True
             self.fout.close()
             self.closewindows()
+            if self.prefetcher is not None: self.prefetcher.stop()
             if self.outcheck: self.checkoutput()
             self.quit()
+            if self.vb: print self.stampcache.report()
+            if self.vb & (self.thumbcache is not None): print self.thumbcache.report()
             if self.vb: print ' - Quit GiG successfully'
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def checkoutput(self):
@@ -4075,21 +7298,9 @@ class Application_m(Frame):
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def subtractcontam(self,twodfits):
         """
-        Subtract continuum from science fram
+        Subtract continuum from science fram (see vi.precompute_subtractcontam to generate all files beforehand)
         """
-        filename, fileext =  os.path.splitext(twodfits)
-        output = filename+'_SCI-CONTAM'+fileext
-
-        if os.path.isfile(output): # check if file already exists
-            if self.vb: print ' - ',output,' already exists'
-        else:
-            if self.vb: print ' - Create ',output
-            hduimg  = pyfits.open(twodfits) # Load the FITS hdulist
-            hdrsci  = hduimg['SCI'].header    # extracting science header
-            sci     = hduimg['SCI'].data
-            contam  = hduimg['CONTAM'].data
-            pyfits.writeto(output, sci-contam, hdrsci, clobber=False)
-
+        output = vi.subtractcontam_fits(twodfits,verbose=self.vb)[0]
         return output
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     def keyboard_cmd(self,event):
@@ -4101,6 +7312,8 @@ class Application_m(Frame):
         focuson = self.focus_get() # check where the focus is
         if  (focuson == self.comments):
             pass
+        elif self.gridshape is not None:
+            self.grid_keyboard_cmd(event)
         else:
             keycmd    = []
             keynames  = []
@@ -4146,7 +7359,7 @@ class Application_m(Frame):
         """
         Return string with information to display in GUI window
         """
-        objinfo           = vi.get_objinfo(self.infofile,self.currentobj,self.currentcl)
+        objinfo           = vi.get_objinfo(self.infofile,self.currentobj,self.currentcl,infoindex=self.infoindex)
 
         if objinfo == None:
             infostr = "--- Currently looking at object "+self.currentcl+'_'+str("%.5d" % int(self.currentobj))+\